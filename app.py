@@ -3,13 +3,79 @@ Aplicação Flask para executar o script de busca de produtos
 e fornecer os dados via API.
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
-import subprocess
+from flask import Flask, Response, redirect, render_template, request, jsonify, send_file, stream_with_context
+import gzip
+import hashlib
 import json
 import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import metricas
+from cache_resultados import CacheResultados
+from armazem_resultados import ARQUIVO_ARMAZEM, ArmazemResultados
+from comparacao import ARQUIVO_COMPARACAO, consultar_pares
+from deltas import obter_execucoes
+from exportacao import (COLUNAS_HISTORICO, FORMATO_XLSX, FORMATOS, exportar, linhas_historico,
+                        linhas_produtos, validar_formato)
+from fila_jobs import FilaJobs, MAXIMO_JOBS, RETENCAO_JOBS, STATUS_CONCLUIDO, EVENTO_FIM
+from historico_precos import HistoricoPrecos
+from indice_dados import obter_indice, ler_parametros
+from marketplaces import MARKETPLACES
+from miniaturas import CacheMiniaturas, chave_miniatura
+from produto import COLUNAS_SAIDA
 
 app = Flask(__name__)
 
+# Threads trabalhadoras da fila de buscas (um navegador cada)
+WORKERS_BUSCA = int(os.environ.get('WORKERS_BUSCA', '2'))
+
+# Jobs terminados mantidos e por quantas horas (depois disso /jobs/<id> responde 404)
+JOBS_MANTIDOS = int(os.environ.get('MAXIMO_JOBS', MAXIMO_JOBS))
+HORAS_RETENCAO_JOBS = float(os.environ.get('RETENCAO_JOBS_HORAS', RETENCAO_JOBS / 3600))
+
+# Intervalo (segundos) dos comentários que mantêm o stream de eventos aberto
+INTERVALO_KEEPALIVE = 15
+
+# Respostas JSON menores que isso não compensam a compressão
+TAMANHO_MINIMO_GZIP = 1024
+
+# Parâmetros que ativam a resposta paginada de /dados
+PARAMETROS_CONSULTA = ('marketplace', 'termo', 'preco_min', 'preco_max', 'ordenar', 'pagina', 'por_pagina')
+
+# Validade das miniaturas no navegador (a imagem de um link não muda)
+MAX_AGE_MINIATURA = 30 * 24 * 3600
+
+_fila = None
+_lock_fila = threading.Lock()
+_miniaturas = None
+
+
+def obter_fila():
+    """
+    Retorna a fila de jobs, criando-a (e suas threads) no primeiro uso.
+    """
+    global _fila
+    with _lock_fila:
+        if _fila is None:
+            _fila = FilaJobs(workers=WORKERS_BUSCA, cache=CacheResultados(),
+                             historico=HistoricoPrecos(), maximo_jobs=JOBS_MANTIDOS,
+                             retencao=HORAS_RETENCAO_JOBS * 3600)
+        return _fila
+
+
+def obter_miniaturas():
+    """
+    Retorna o cache de miniaturas, criando-o no primeiro uso.
+    """
+    global _miniaturas
+    with _lock_fila:
+        if _miniaturas is None:
+            _miniaturas = CacheMiniaturas()
+        return _miniaturas
+
 
 @app.route('/')
 def index():
@@ -19,62 +85,131 @@ def index():
     return render_template('index.html')
 
 
+def extrair_termos(data):
+    """
+    Valida o corpo JSON e devolve a lista de termos.
+    
+    Returns:
+        Tupla (termos, resposta_de_erro); um dos dois é None
+    """
+    if not data or 'keywords' not in data:
+        return None, (jsonify({'status': 'erro', 'mensagem': 'Campo "keywords" não encontrado'}), 400)
+    
+    # Quebrar por vírgula e limpar espaços
+    termos = [termo.strip() for termo in data['keywords'].split(',') if termo.strip()]
+    
+    if not termos:
+        return None, (jsonify({'status': 'erro', 'mensagem': 'Nenhum termo válido fornecido'}), 400)
+    
+    return termos, None
+
+
+@app.route('/jobs', methods=['POST'])
+def criar_job():
+    """
+    Rota para enfileirar uma busca de produtos.
+    
+    Recebe um JSON com a estrutura:
+    { "keywords": "termo1, termo2", "forcar_atualizacao": false }
+    Retorna imediatamente o id do job; o andamento é consultado em /jobs/<id>.
+    """
+    try:
+        termos, erro = extrair_termos(request.get_json())
+        if erro:
+            return erro
+        
+        job = obter_fila().enviar(termos, forcar_atualizacao=bool(request.get_json().get('forcar_atualizacao')))
+        return jsonify({'status': 'ok', 'job_id': job.id}), 202
+        
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro interno: {str(e)}'
+        }), 500
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def status_job(job_id):
+    """
+    Rota para consultar status e progresso de um job.
+    """
+    job = obter_fila().obter(job_id)
+    if job is None:
+        return jsonify({'status': 'erro', 'mensagem': 'Job não encontrado'}), 404
+    return jsonify(job.para_dict())
+
+
+@app.route('/jobs/<job_id>/eventos', methods=['GET'])
+def eventos_job(job_id):
+    """
+    Rota de Server-Sent Events com os resultados parciais do job.
+    
+    Envia um evento "lote" (produtos no formato do resultado.json) a cada
+    termo/marketplace concluído e um evento "fim" com o status final.
+    Reconexões com o cabeçalho Last-Event-ID continuam de onde pararam.
+    """
+    job = obter_fila().obter(job_id)
+    if job is None:
+        return jsonify({'status': 'erro', 'mensagem': 'Job não encontrado'}), 404
+    
+    ultimo_id = request.headers.get('Last-Event-ID', '')
+    inicio = int(ultimo_id) + 1 if ultimo_id.isdigit() else 0
+    
+    def gerar():
+        indice = inicio
+        while True:
+            eventos = job.eventos_desde(indice, timeout=INTERVALO_KEEPALIVE)
+            if not eventos:
+                yield ': keepalive\n\n'
+                continue
+            
+            for evento in eventos:
+                dados = json.dumps(evento['dados'], ensure_ascii=False)
+                yield f"id: {indice}\nevent: {evento['tipo']}\ndata: {dados}\n\n"
+                indice += 1
+                if evento['tipo'] == EVENTO_FIM:
+                    return
+    
+    return Response(
+        stream_with_context(gerar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/executar', methods=['POST'])
 def executar():
     """
-    Rota para executar o script de busca de produtos.
+    Rota para executar a busca de produtos e aguardar o resultado.
     
-    Recebe um JSON com a estrutura: { "keywords": "termo1, termo2" }
-    Grava os termos no arquivo inputs.txt e executa o main.py
+    Recebe um JSON com a estrutura:
+    { "keywords": "termo1, termo2", "forcar_atualizacao": false }
+    Mantida por compatibilidade: enfileira um job e bloqueia até ele terminar.
+    Os dados ficam em /dados?job=<job_id> e /download?job=<job_id>.
     """
     try:
-        # Receber dados JSON
         data = request.get_json()
+        termos, erro = extrair_termos(data)
+        if erro:
+            return erro
         
-        if not data or 'keywords' not in data:
-            return jsonify({'status': 'erro', 'mensagem': 'Campo "keywords" não encontrado'}), 400
-        
-        keywords = data['keywords']
-        
-        # Quebrar por vírgula e limpar espaços
-        termos = [termo.strip() for termo in keywords.split(',') if termo.strip()]
-        
-        if not termos:
-            return jsonify({'status': 'erro', 'mensagem': 'Nenhum termo válido fornecido'}), 400
-        
-        # Gravar termos no arquivo inputs.txt
-        with open('inputs.txt', 'w', encoding='utf-8') as f:
-            for termo in termos:
-                f.write(f"{termo}\n")
+        job = obter_fila().enviar(termos, forcar_atualizacao=bool(data.get('forcar_atualizacao')))
         
-        # Executar o script main.py
-        try:
-            result = subprocess.run(
-                ['python', 'main.py'],
-                capture_output=True,
-                text=True,
-                timeout=600  # Timeout de 10 minutos
-            )
-            
-            if result.returncode != 0:
-                return jsonify({
-                    'status': 'erro',
-                    'mensagem': 'Erro ao executar o script',
-                    'detalhes': result.stderr
-                }), 500
-            
-        except subprocess.TimeoutExpired:
+        if not job.aguardar(timeout=600):  # Timeout de 10 minutos
             return jsonify({
                 'status': 'erro',
-                'mensagem': 'Timeout ao executar o script'
+                'mensagem': 'Timeout ao executar a busca',
+                'job_id': job.id
             }), 500
-        except Exception as e:
+        
+        if job.status != STATUS_CONCLUIDO:
             return jsonify({
                 'status': 'erro',
-                'mensagem': f'Erro ao executar: {str(e)}'
+                'mensagem': 'Erro ao executar a busca',
+                'detalhes': job.erro
             }), 500
         
-        return jsonify({'status': 'ok'})
+        return jsonify({'status': 'ok', 'job_id': job.id})
         
     except Exception as e:
         return jsonify({
@@ -83,24 +218,185 @@ def executar():
         }), 500
 
 
+def arquivo_resultado(extensao):
+    """
+    Resolve o arquivo de resultado pedido: o do job (?job=<id>) ou o global.
+    
+    Args:
+        extensao: 'json', 'xlsx' ou 'comparacao' (pares entre marketplaces)
+    
+    Returns:
+        Tupla (caminho, resposta_de_erro); um dos dois é None
+    """
+    job_id = request.args.get('job')
+    if not job_id:
+        if extensao == 'comparacao':
+            return ARQUIVO_COMPARACAO, None
+        return f'resultado.{extensao}', None
+    
+    job = obter_fila().obter(job_id)
+    if job is None:
+        return None, (jsonify({'status': 'erro', 'mensagem': 'Job não encontrado'}), 404)
+    if job.status != STATUS_CONCLUIDO:
+        return None, (jsonify({'status': 'erro', 'mensagem': 'Job ainda não concluído'}), 409)
+    if extensao == 'xlsx':
+        # Excel gerado só no primeiro download, a partir dos lotes gravados
+        return job.garantir_excel(), None
+    if extensao == 'comparacao':
+        return job.arquivo_comparacao, None
+    return job.arquivo_json, None
+
+
 @app.route('/dados', methods=['GET'])
 def dados():
     """
-    Rota para retornar os dados do resultado.json.
+    Rota para retornar os dados do resultado.json (ou do job em ?job=<id>).
+    
+    Parâmetros opcionais: marketplace, termo, preco_min, preco_max,
+    ordenar (posicao, preco, titulo; "-" inverte), pagina e por_pagina.
+    Com qualquer um deles a resposta é paginada:
+    { "produtos": [...], "total", "pagina", "paginas", "por_pagina", "termos", "marketplaces", "execucao" }
+    
+    Com ?since=<execução> devolve só o que mudou desde aquela execução
+    (novos, removidos, precos, posicoes; ver deltas.py), ou 410 se ela já
+    saiu do registro. O cabeçalho X-Execucao traz a execução atual.
     """
     try:
+        arquivo, erro = arquivo_resultado('json')
+        if erro:
+            return erro
+        
         # Verificar se o arquivo existe
-        if not os.path.exists('resultado.json'):
+        if not os.path.exists(arquivo):
             return jsonify({
                 'status': 'erro',
                 'mensagem': 'Arquivo resultado.json não encontrado. Execute a busca primeiro.'
             }), 404
         
-        # Ler e retornar o conteúdo do JSON
-        with open('resultado.json', 'r', encoding='utf-8') as f:
-            dados = json.load(f)
+        # Índice em memória, recarregado só quando o arquivo muda
+        indice = obter_indice(arquivo)
+        execucoes = obter_execucoes(arquivo)
+        execucao = execucoes.ultima if execucoes else None
+        
+        # A ETag depende da versão do arquivo, da execução e da consulta pedida
+        etag = hashlib.md5(f'{indice.etag}:{execucao}?{request.query_string.decode()}'.encode()).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            resposta = Response(status=304)
+            resposta.set_etag(etag, weak=True)
+            return resposta
+        
+        if 'since' in request.args:
+            resposta = resposta_delta(indice, execucoes, etag)
+        elif not any(parametro in request.args for parametro in PARAMETROS_CONSULTA):
+            # Sem parâmetros de consulta: lista completa (formato antigo)
+            resposta = resposta_json(indice.produtos, etag)
+        else:
+            parametros, mensagem = ler_parametros(request.args)
+            if mensagem:
+                return jsonify({'status': 'erro', 'mensagem': mensagem}), 400
+            resposta = resposta_json(dict(indice.consultar(**parametros), execucao=execucao), etag)
         
-        return jsonify(dados)
+        if execucao is not None and isinstance(resposta, Response):
+            resposta.headers['X-Execucao'] = str(execucao)
+        return resposta
+        
+    except json.JSONDecodeError:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': 'Erro ao ler o arquivo JSON'
+        }), 500
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro interno: {str(e)}'
+        }), 500
+
+
+def resposta_delta(indice, execucoes, etag: str):
+    """
+    Resposta de /dados?since=<execução>: só as diferenças desde ela.
+    """
+    if execucoes is None:
+        return jsonify({'status': 'erro', 'mensagem': 'Nenhuma execução registrada para este resultado'}), 404
+    try:
+        desde = int(request.args['since'])
+    except ValueError:
+        return jsonify({'status': 'erro', 'mensagem': '"since" deve ser um número de execução'}), 400
+    try:
+        delta = execucoes.delta(desde, indice.produtos, indice.posicoes)
+    except ValueError as e:
+        return jsonify({'status': 'erro', 'mensagem': str(e)}), 400
+    if delta is None:
+        # Cliente atrasado demais: recarregar a lista completa
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Execução {desde} não está mais no registro; recarregue os dados',
+            'execucao': execucoes.ultima,
+        }), 410
+    delta.update(termos=indice.termos, marketplaces=indice.marketplaces)
+    return resposta_json(delta, etag)
+
+
+def resposta_json(dados, etag: str):
+    """
+    Monta uma resposta JSON com ETag e compressão gzip quando aceita.
+    
+    Args:
+        dados: Conteúdo serializável
+        etag: Identificador da versão do conteúdo
+    """
+    corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+    resposta = Response(corpo, mimetype='application/json')
+    # ETag fraca: o mesmo conteúdo pode ir com ou sem gzip
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Vary'] = 'Accept-Encoding'
+    resposta.headers['Cache-Control'] = 'no-cache'
+    
+    if len(corpo) >= TAMANHO_MINIMO_GZIP and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        resposta.set_data(gzip.compress(corpo, compresslevel=6))
+        resposta.headers['Content-Encoding'] = 'gzip'
+    
+    return resposta
+
+
+@app.route('/comparacao', methods=['GET'])
+def comparacao():
+    """
+    Rota para listar os pares do mesmo produto no Mercado Livre e na Amazon BR
+    (do comparacao.json ou do job em ?job=<id>), com a diferença de preço.
+    
+    Parâmetros opcionais: termo, ordenar (similaridade, diferenca,
+    diferenca_percentual; "-" inverte; padrão -similaridade) e limite.
+    """
+    try:
+        arquivo, erro = arquivo_resultado('comparacao')
+        if erro:
+            return erro
+        
+        if not os.path.exists(arquivo):
+            return jsonify({
+                'status': 'erro',
+                'mensagem': 'Arquivo comparacao.json não encontrado. Execute a busca primeiro.'
+            }), 404
+        
+        try:
+            limite = int(request.args['limite']) if request.args.get('limite') else None
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                pares = consultar_pares(
+                    json.load(f),
+                    termo=request.args.get('termo') or None,
+                    ordenar=request.args.get('ordenar') or '-similaridade',
+                    limite=limite,
+                )
+        except ValueError as e:
+            if isinstance(e, json.JSONDecodeError):
+                raise
+            return jsonify({'status': 'erro', 'mensagem': str(e)}), 400
+        
+        etag = hashlib.md5(
+            f'{os.stat(arquivo).st_mtime_ns}?{request.query_string.decode()}'.encode()
+        ).hexdigest()
+        return resposta_json({'total': len(pares), 'pares': pares}, etag)
         
     except json.JSONDecodeError:
         return jsonify({
@@ -117,18 +413,62 @@ def dados():
 @app.route('/download', methods=['GET'])
 def download():
     """
-    Rota para fazer download do arquivo resultado.xlsx.
+    Rota para fazer download do resultado (ou do job em ?job=<id>).
+    
+    Parâmetros opcionais: formato (xlsx, csv ou parquet; padrão xlsx),
+    termo e marketplace (vários separados por vírgula), desde e ate (epoch
+    ou ISO 8601). Com desde/ate o arquivo traz o histórico de preços do
+    período, uma linha por coleta. Sem nenhum filtro, o Excel pronto da
+    última execução é enviado; nos demais casos o arquivo é gerado linha a
+    linha e enviado em streaming.
     """
+    formato = request.args.get('formato') or FORMATO_XLSX
+    termos = ler_lista(request.args.get('termo'))
+    marketplaces = ler_lista(request.args.get('marketplace'))
     try:
-        # Verificar se o arquivo existe
-        if not os.path.exists('resultado.xlsx'):
+        validar_formato(formato)
+        desde = ler_instante(request.args.get('desde'), None)
+        ate = ler_instante(request.args.get('ate'), None)
+    except ValueError as e:
+        return jsonify({'status': 'erro', 'mensagem': str(e)}), 400
+    
+    try:
+        if desde is not None or ate is not None:
+            if request.args.get('job'):
+                return jsonify({
+                    'status': 'erro',
+                    'mensagem': 'desde/ate exportam o histórico e não podem ser usados com job'
+                }), 400
+            linhas = linhas_historico(HistoricoPrecos(), desde, ate, termos, marketplaces)
+            return resposta_exportacao(linhas, COLUNAS_HISTORICO, formato, 'historico')
+        
+        if formato == FORMATO_XLSX and not termos and not marketplaces:
+            arquivo, erro = arquivo_resultado('xlsx')
+            if erro:
+                return erro
+            
+            # Verificar se o arquivo existe
+            if not os.path.exists(arquivo):
+                return jsonify({
+                    'status': 'erro',
+                    'mensagem': 'Arquivo resultado.xlsx não encontrado. Execute a busca primeiro.'
+                }), 404
+            
+            # Retornar o arquivo para download
+            return send_file(os.path.abspath(arquivo), as_attachment=True, download_name='resultado.xlsx')
+        
+        armazem, ordem_termos, erro = armazem_resultado()
+        if erro:
+            return erro
+        if not os.path.exists(armazem.caminho):
             return jsonify({
                 'status': 'erro',
-                'mensagem': 'Arquivo resultado.xlsx não encontrado. Execute a busca primeiro.'
+                'mensagem': f'Arquivo {ARQUIVO_ARMAZEM} não encontrado. Execute a busca primeiro.'
             }), 404
         
-        # Retornar o arquivo para download
-        return send_file('resultado.xlsx', as_attachment=True)
+        ordem_marketplaces = list(MARKETPLACES)
+        linhas = linhas_produtos(armazem.produtos(ordem_termos, ordem_marketplaces), termos, marketplaces)
+        return resposta_exportacao(linhas, COLUNAS_SAIDA, formato, 'resultado')
         
     except Exception as e:
         return jsonify({
@@ -137,5 +477,222 @@ def download():
         }), 500
 
 
+def ler_lista(valor: Optional[str]) -> Optional[List[str]]:
+    """
+    Converte "a, b" em ['a', 'b'] (None se vazio).
+    """
+    itens = [item.strip() for item in (valor or '').split(',') if item.strip()]
+    return itens or None
+
+
+def armazem_resultado():
+    """
+    Resolve os lotes gravados pedidos: os do job (?job=<id>) ou os globais.
+    
+    Returns:
+        Tupla (armazem, ordem_termos, resposta_de_erro); sem erro, o último é None
+    """
+    job_id = request.args.get('job')
+    if not job_id:
+        return ArmazemResultados(), None, None
+    
+    job = obter_fila().obter(job_id)
+    if job is None:
+        return None, None, (jsonify({'status': 'erro', 'mensagem': 'Job não encontrado'}), 404)
+    if job.status != STATUS_CONCLUIDO:
+        return None, None, (jsonify({'status': 'erro', 'mensagem': 'Job ainda não concluído'}), 409)
+    return job.armazem, job.termos, None
+
+
+def resposta_exportacao(linhas, colunas, formato: str, nome: str):
+    """
+    Envia as linhas no formato pedido, em pedaços, como anexo.
+    
+    Args:
+        linhas: Tuplas na ordem de `colunas`
+        colunas: COLUNAS_SAIDA ou COLUNAS_HISTORICO
+        formato: Formato já validado
+        nome: Nome do arquivo baixado, sem a extensão
+    """
+    return Response(
+        stream_with_context(exportar(linhas, colunas, formato)),
+        mimetype=FORMATOS[formato],
+        headers={
+            'Content-Disposition': f'attachment; filename={nome}.{formato}',
+            'Cache-Control': 'no-store',
+            'X-Accel-Buffering': 'no',
+        }
+    )
+
+
+@app.route('/cache/estatisticas', methods=['GET'])
+def estatisticas_cache():
+    """
+    Rota para consultar acertos/falhas do cache de resultados por marketplace.
+    """
+    try:
+        return jsonify(CacheResultados().estatisticas())
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro ao ler o cache: {str(e)}'
+        }), 500
+
+
+@app.route('/miniatura', methods=['GET'])
+def miniatura():
+    """
+    Rota para a miniatura da imagem de um produto (?url=<link da imagem>).
+    
+    A imagem é baixada da CDN do marketplace só na primeira vez; depois sai
+    do cache em disco. Se não puder ser baixada, redireciona para a original.
+    """
+    url = request.args.get('url', '')
+    etag = chave_miniatura(url)
+    
+    # A miniatura de um link nunca muda: o navegador pode reaproveitar a sua
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+        resposta.set_etag(etag)
+        resposta.cache_control.public = True
+        resposta.cache_control.max_age = MAX_AGE_MINIATURA
+        return resposta
+    
+    try:
+        resultado = obter_miniaturas().obter(url)
+    except ValueError as e:
+        return jsonify({'status': 'erro', 'mensagem': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro ao obter a miniatura: {str(e)}'
+        }), 500
+    
+    if resultado is None:
+        return redirect(url)
+    
+    dados, mimetype = resultado
+    resposta = Response(dados, mimetype=mimetype)
+    resposta.set_etag(etag)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = MAX_AGE_MINIATURA
+    resposta.cache_control.immutable = True
+    return resposta
+
+
+@app.route('/miniatura/estatisticas', methods=['GET'])
+def estatisticas_miniaturas():
+    """
+    Rota para consultar acertos, falhas e ocupação do cache de miniaturas.
+    """
+    return jsonify(obter_miniaturas().estatisticas())
+
+
+@app.route('/seletores', methods=['GET'])
+def estatisticas_seletores():
+    """
+    Rota para consultar quantas vezes cada seletor alternativo resolveu cada
+    campo dos cards, por marketplace, e quais já saíram da frente da cadeia.
+    """
+    return jsonify({nome: marketplace.extrator.estatisticas() for nome, marketplace in MARKETPLACES.items()})
+
+
+@app.route('/metrics', methods=['GET'])
+def metricas_prometheus():
+    """
+    Rota com a duração de cada etapa das buscas feitas por este servidor,
+    no formato de exposição do Prometheus.
+    """
+    return Response(metricas.registro.exportar_prometheus(),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+
+def ler_instante(valor, padrao: Optional[float]) -> Optional[float]:
+    """
+    Converte ?desde= (epoch em segundos ou data ISO 8601) em epoch.
+    
+    Raises:
+        ValueError: Se o valor não estiver em nenhum dos dois formatos
+    """
+    if not valor:
+        return padrao
+    try:
+        return float(valor)
+    except ValueError:
+        return datetime.fromisoformat(valor).timestamp()
+
+
+@app.route('/historico/precos', methods=['GET'])
+def historico_precos():
+    """
+    Rota para listar produtos cujo preço mudou desde um instante.
+    
+    Parâmetros: desde (epoch ou ISO 8601; padrão: últimas 24h),
+    marketplace e limite (padrão 100).
+    """
+    try:
+        desde = ler_instante(request.args.get('desde'), time.time() - 24 * 3600)
+        limite = int(request.args.get('limite', 100))
+    except ValueError:
+        return jsonify({'status': 'erro', 'mensagem': 'Parâmetros "desde" ou "limite" inválidos'}), 400
+    
+    try:
+        mudancas = HistoricoPrecos().mudancas_preco(
+            desde, marketplace=request.args.get('marketplace') or None, limite=limite
+        )
+        return jsonify({'desde': desde, 'mudancas': mudancas})
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro ao consultar o histórico: {str(e)}'
+        }), 500
+
+
+@app.route('/historico/ranking', methods=['GET'])
+def historico_ranking():
+    """
+    Rota para listar quem subiu/desceu no ranking de um termo.
+    
+    Parâmetros: termo (obrigatório), marketplace, desde (compara com a
+    última execução anterior a este instante) e limite (padrão 100).
+    """
+    termo = request.args.get('termo', '').strip()
+    if not termo:
+        return jsonify({'status': 'erro', 'mensagem': 'Parâmetro "termo" não informado'}), 400
+    
+    try:
+        desde = ler_instante(request.args.get('desde'), None)
+        limite = int(request.args.get('limite', 100))
+    except ValueError:
+        return jsonify({'status': 'erro', 'mensagem': 'Parâmetros "desde" ou "limite" inválidos'}), 400
+    
+    try:
+        return jsonify(HistoricoPrecos().movimentos_ranking(
+            termo, marketplace=request.args.get('marketplace') or None, desde=desde, limite=limite
+        ))
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro ao consultar o histórico: {str(e)}'
+        }), 500
+
+
+@app.route('/historico/produto/<marketplace>/<produto_id>', methods=['GET'])
+def historico_produto(marketplace, produto_id):
+    """
+    Rota para a série de preço e posição de um produto.
+    """
+    try:
+        serie = HistoricoPrecos().serie(marketplace, produto_id)
+        if not serie:
+            return jsonify({'status': 'erro', 'mensagem': 'Produto sem histórico'}), 404
+        return jsonify({'marketplace': marketplace, 'produto_id': produto_id, 'serie': serie})
+    except Exception as e:
+        return jsonify({
+            'status': 'erro',
+            'mensagem': f'Erro ao consultar o histórico: {str(e)}'
+        }), 500
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,252 @@
+"""
+Armazenamento incremental (append-only) dos resultados de uma execução.
+
+Cada busca concluída (termo, marketplace) vira uma linha JSON no arquivo
+resultado.jsonl, gravada e sincronizada com o disco assim que termina. Uma
+queda no meio da execução perde no máximo a busca em andamento, e a execução
+seguinte pode retomar a partir dos pares já gravados. O Excel e o JSON do
+dashboard são gerados a partir deste arquivo, lendo um lote por vez.
+
+No monitoramento contínuo o mesmo par é regravado a cada atualização; vale
+sempre o lote mais recente, e compactar() reescreve o arquivo só com eles
+quando as linhas substituídas passam a ser a maioria.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cache_resultados import normalizar_termo
+from produto import Produto, como_dicts
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_ARMAZEM = 'resultado.jsonl'
+
+
+class ArmazemResultados:
+    """
+    Arquivo JSON Lines com um lote de produtos por linha.
+
+    Uso:
+        armazem = ArmazemResultados('resultado.jsonl')
+        if armazem.obter('Mercado Livre', 'brigadeiro') is None:
+            armazem.gravar_lote('brigadeiro', 'Mercado Livre', produtos)
+        for produto in armazem.produtos(ordem_termos=['brigadeiro']):
+            ...
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_ARMAZEM):
+        """
+        Args:
+            caminho: Arquivo .jsonl (criado na primeira gravação)
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        # (marketplace, termo normalizado) -> (termo, posição da linha no arquivo)
+        self._indice: Optional[Dict[Tuple[str, str], Tuple[str, int]]] = None
+        # Fim da última linha válida; o que vier depois é descartado na próxima gravação
+        self._fim = 0
+        # Linhas válidas no arquivo, incluindo lotes já substituídos
+        self._linhas = 0
+
+    def limpar(self):
+        """
+        Descarta os lotes gravados (início de uma execução nova).
+        """
+        with self._lock:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
+            self._indice = {}
+            self._fim = 0
+            self._linhas = 0
+
+    def _carregar_indice(self) -> Dict[Tuple[str, str], Tuple[str, int]]:
+        """
+        Lê a posição de cada lote no arquivo, ignorando uma última linha
+        truncada por queda do processo. Deve ser chamado com o lock.
+        """
+        if self._indice is not None:
+            return self._indice
+
+        self._indice = {}
+        self._fim = 0
+        self._linhas = 0
+        if not os.path.exists(self.caminho):
+            return self._indice
+
+        with open(self.caminho, 'rb') as f:
+            while True:
+                posicao = f.tell()
+                linha = f.readline()
+                if not linha:
+                    break
+                try:
+                    lote = json.loads(linha)
+                except ValueError:
+                    logger.warning(f"Linha incompleta em {self.caminho} (posição {posicao}) ignorada")
+                    break
+                chave = (lote['marketplace'], normalizar_termo(lote['termo']))
+                # Se o par aparecer duas vezes, vale o lote mais recente
+                self._indice[chave] = (lote['termo'], posicao)
+                self._fim = f.tell()
+                self._linhas += 1
+        return self._indice
+
+    def gravar_lote(self, termo: str, marketplace: str, produtos: List[Produto],
+                    gravado_em: Optional[float] = None):
+        """
+        Acrescenta um lote ao arquivo e força a gravação em disco.
+
+        Args:
+            termo: Termo de busca
+            marketplace: Marketplace do lote
+            produtos: Produtos encontrados (lista vazia também é registrada)
+            gravado_em: Instante (epoch) da coleta, se o lote vem de outro
+                armazém; padrão: agora
+        """
+        linha = json.dumps(
+            {'termo': termo, 'marketplace': marketplace, 'produtos': como_dicts(produtos),
+             'gravado_em': gravado_em if gravado_em is not None else time.time()},
+            ensure_ascii=False
+        ) + '\n'
+
+        with self._lock:
+            indice = self._carregar_indice()
+            with open(self.caminho, 'ab') as f:
+                if f.tell() != self._fim:
+                    # Descartar a linha truncada por uma queda anterior
+                    f.truncate(self._fim)
+                posicao = self._fim
+                f.write(linha.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                self._fim = f.tell()
+            self._linhas += 1
+            indice[(marketplace, normalizar_termo(termo))] = (termo, posicao)
+
+    def precisa_compactar(self) -> bool:
+        """
+        Se a maioria das linhas do arquivo são lotes já substituídos.
+        """
+        with self._lock:
+            return self._linhas > 2 * len(self._carregar_indice())
+
+    def compactar(self):
+        """
+        Reescreve o arquivo só com o lote mais recente de cada par.
+
+        O arquivo novo é gravado ao lado e trocado de uma vez: uma queda no
+        meio mantém o arquivo anterior inteiro.
+        """
+        with self._lock:
+            indice = self._carregar_indice()
+            if not indice:
+                return
+            linhas_antes = self._linhas
+            temporario = self.caminho + '.tmp'
+            novo_indice = {}
+            with open(self.caminho, 'rb') as origem, open(temporario, 'wb') as destino:
+                for chave, (termo, posicao) in sorted(indice.items(), key=lambda item: item[1][1]):
+                    origem.seek(posicao)
+                    novo_indice[chave] = (termo, destino.tell())
+                    destino.write(origem.readline())
+                destino.flush()
+                os.fsync(destino.fileno())
+                fim = destino.tell()
+            os.replace(temporario, self.caminho)
+            self._indice = novo_indice
+            self._fim = fim
+            self._linhas = len(novo_indice)
+        logger.info(f"{self.caminho} compactado: {linhas_antes} -> {len(novo_indice)} linhas")
+
+    def _ler_lote(self, posicao: int) -> Dict:
+        with open(self.caminho, 'rb') as f:
+            return _ler_linha(f, posicao)
+
+    def obter(self, marketplace: str, termo: str) -> Optional[List[Produto]]:
+        """
+        Retorna os produtos já gravados para o par, ou None se ainda não existir.
+
+        Args:
+            marketplace: Marketplace do lote
+            termo: Termo de busca
+        """
+        lote = self.obter_lote(marketplace, termo)
+        return lote[0] if lote is not None else None
+
+    def obter_lote(self, marketplace: str, termo: str) -> Optional[Tuple[List[Produto], Optional[float]]]:
+        """
+        Como obter(), junto com o instante em que o lote foi gravado.
+
+        Returns:
+            Tupla (produtos, gravado_em), ou None se o par ainda não existir;
+            gravado_em é None em linhas gravadas antes de o campo existir
+        """
+        with self._lock:
+            entrada = self._carregar_indice().get((marketplace, normalizar_termo(termo)))
+            if entrada is None:
+                return None
+            lote = self._ler_lote(entrada[1])
+        return [Produto.de_dict(produto) for produto in lote['produtos']], lote.get('gravado_em')
+
+    def quantidade_lotes(self) -> int:
+        with self._lock:
+            return len(self._carregar_indice())
+
+    def produtos(self, ordem_termos: Optional[List[str]] = None,
+                 ordem_marketplaces: Optional[List[str]] = None) -> Iterator[Produto]:
+        """
+        Percorre os produtos gravados, um lote por vez.
+
+        Args:
+            ordem_termos: Ordem desejada dos termos (os demais vêm depois, na
+                ordem de gravação)
+            ordem_marketplaces: Ordem desejada dos marketplaces dentro do termo
+
+        O arquivo é aberto uma vez, junto com a leitura das posições: se
+        compactar() ou limpar() o substituírem ou apagarem no meio da leitura
+        (monitoramento, modo serviço), os lotes continuam vindo do arquivo
+        original, para o qual as posições valem.
+
+        Yields:
+            Produtos com o termo como digitado na busca
+        """
+        with self._lock:
+            entradas = [
+                (marketplace, chave_termo, termo, posicao)
+                for (marketplace, chave_termo), (termo, posicao) in self._carregar_indice().items()
+            ]
+            if not entradas:
+                return
+            arquivo = open(self.caminho, 'rb')
+
+        posicao_termo: Dict[str, int] = {}
+        for i, termo in enumerate(ordem_termos or []):
+            posicao_termo.setdefault(normalizar_termo(termo), i)
+        posicao_marketplace = {m: i for i, m in enumerate(ordem_marketplaces or [])}
+        entradas.sort(key=lambda e: (
+            posicao_termo.get(e[1], len(posicao_termo)),
+            posicao_marketplace.get(e[0], len(posicao_marketplace)),
+            e[3],
+        ))
+
+        with arquivo:
+            for _, _, termo, posicao in entradas:
+                for produto in _ler_linha(arquivo, posicao)['produtos']:
+                    yield Produto.de_dict(produto, termo=termo)
+
+    def modificado_em(self) -> float:
+        """
+        mtime do arquivo (0 se ainda não existir), para decidir se uma
+        exportação gerada antes está desatualizada.
+        """
+        return os.path.getmtime(self.caminho) if os.path.exists(self.caminho) else 0.0
+
+
+def _ler_linha(arquivo, posicao: int) -> Dict:
+    arquivo.seek(posicao)
+    return json.loads(arquivo.readline())
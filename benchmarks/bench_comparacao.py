@@ -0,0 +1,103 @@
+"""
+Benchmark: pareamento de anúncios entre marketplaces em listas grandes.
+
+Gera um catálogo sintético de produtos (marca, tipo, variante e
+quantidade) e, para cada um, um anúncio no Mercado Livre e outro na Amazon
+com o título escrito de outro jeito (ordem das palavras, acentos, caixa,
+unidade por extenso, palavras de propaganda). Parte dos produtos só existe
+em um dos marketplaces, e há produtos que só diferem na quantidade.
+
+Mostra o tempo de parear_produtos, quantos pares foram formados e a
+precisão e a cobertura em relação aos pares verdadeiros.
+
+Uso:
+    python benchmarks/bench_comparacao.py [anuncios_por_marketplace]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comparacao import parear_produtos  # noqa: E402
+from produto import Produto  # noqa: E402
+
+MARCAS = ['Nestlé', 'Garoto', 'Lacta', 'Hershey\'s', 'Arcor', 'Dori', 'Fini', 'Melken', 'Mavalério',
+          'Harald', 'Sicao', 'Callebaut', 'Kopenhagen', 'Cacau Show', 'Ferrero', 'Milka',
+          'Toblerone', 'Ritter', 'Lindt', 'Bauducco']
+TIPOS = ['Chocolate em Pó', 'Granulado', 'Confeito', 'Cobertura', 'Gotas de Chocolate', 'Bombom',
+         'Tablete', 'Barra', 'Achocolatado', 'Leite Condensado', 'Creme de Leite', 'Doce de Leite',
+         'Brigadeiro', 'Wafer', 'Pasta Cremosa', 'Biscoito']
+VARIANTES = ['ao Leite', 'Meio Amargo', 'Branco', '70% Cacau', 'Zero Açúcar', 'Crocante', 'com Avelã',
+             'Morango', 'Intenso', 'Diet', 'Vegano', 'Tradicional', 'Premium', 'Belga', 'Cookies']
+QUANTIDADES = [('100g', '100 gramas'), ('200g', '200 g'), ('500g', '500 g'), ('1kg', '1 Kg'),
+               ('2kg', '2 kilos'), ('1,01kg', '1.01 kg'), ('395g', '395 g'), ('800g', '800 gr')]
+PROPAGANDA = ['Original', 'Promoção', 'Frete Grátis', 'Oferta', 'Kit', 'Envio Imediato', 'Novo']
+
+
+def sem_acentos(texto: str) -> str:
+    return texto.translate(str.maketrans('áàâãéêíóôõúçÁÉÍÓÚÇ', 'aaaaeeioooucAEIOUC'))
+
+
+def gerar_anuncios(quantidade: int, semente: int = 42):
+    """
+    Gera os anúncios dos dois marketplaces e os pares verdadeiros (links).
+    """
+    aleatorio = random.Random(semente)
+    catalogo = set()
+    while len(catalogo) < quantidade:
+        catalogo.add((aleatorio.choice(MARCAS), aleatorio.choice(TIPOS),
+                      aleatorio.choice(VARIANTES), aleatorio.randrange(len(QUANTIDADES))))
+    catalogo = sorted(catalogo)
+
+    produtos = []
+    verdadeiros = set()
+    for n, (marca, tipo, variante, q) in enumerate(catalogo):
+        forma_ml, forma_amazon = QUANTIDADES[q]
+        termo = f'termo {n % 300}'
+        # 80% dos produtos nos dois marketplaces; o resto em só um
+        sorteio = aleatorio.random()
+        link_ml = f'https://produto.mercadolivre.com.br/MLB{n}'
+        link_amazon = f'https://www.amazon.com.br/dp/B{n:09d}'
+
+        if sorteio < 0.9:
+            titulo = f'{tipo} {marca} {variante} {forma_ml}'
+            if aleatorio.random() < 0.5:
+                titulo = f'{aleatorio.choice(PROPAGANDA)} {titulo}'
+            produtos.append(Produto(termo, 'Mercado Livre', n % 30 + 1, titulo,
+                                    round(aleatorio.uniform(5, 200), 2), link_ml, '', 'http'))
+        if sorteio < 0.8 or sorteio >= 0.9:
+            titulo = f'{marca} - {tipo} {variante}, {forma_amazon}'
+            if aleatorio.random() < 0.5:
+                titulo = sem_acentos(titulo).upper()
+            produtos.append(Produto(termo, 'Amazon BR', n % 30 + 1, titulo,
+                                    round(aleatorio.uniform(5, 200), 2), link_amazon, '', 'http'))
+        if sorteio < 0.8:
+            verdadeiros.add((link_ml, link_amazon))
+
+    aleatorio.shuffle(produtos)
+    return produtos, verdadeiros
+
+
+def main_benchmark():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    produtos, verdadeiros = gerar_anuncios(quantidade)
+    por_marketplace = {m: sum(1 for p in produtos if p.marketplace == m)
+                       for m in ('Mercado Livre', 'Amazon BR')}
+
+    inicio = time.perf_counter()
+    pares = parear_produtos(produtos)
+    tempo = time.perf_counter() - inicio
+
+    encontrados = {(par['mercado_livre']['link'], par['amazon']['link']) for par in pares}
+    corretos = len(encontrados & verdadeiros)
+    print(f"Anúncios: {por_marketplace['Mercado Livre']} Mercado Livre + "
+          f"{por_marketplace['Amazon BR']} Amazon BR | pares verdadeiros: {len(verdadeiros)}")
+    print(f'Tempo: {tempo:.2f}s | pares formados: {len(pares)} | '
+          f'precisão: {corretos / max(1, len(pares)):.1%} | cobertura: {corretos / len(verdadeiros):.1%}')
+
+
+if __name__ == '__main__':
+    main_benchmark()
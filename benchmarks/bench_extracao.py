@@ -0,0 +1,145 @@
+"""
+Micro-benchmark: extração elemento a elemento vs. extração em lote.
+
+Carrega as páginas salvas em benchmarks/fixtures e compara, para cada
+marketplace, o caminho antigo (query_selector/inner_text/get_attribute por
+card) com o caminho atual (um único page.evaluate + normalização no Python).
+Mostra o número de idas ao navegador e a latência média por página, e
+confere que os dois caminhos produzem os mesmos produtos.
+
+Uso:
+    python benchmarks/bench_extracao.py [repeticoes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright  # noqa: E402
+
+from http_rapido import FONTE_NAVEGADOR  # noqa: E402
+from marketplaces import obter_marketplace  # noqa: E402
+from servidor_fixtures import ler_fixture  # noqa: E402
+
+
+class Contador:
+    """
+    Conta as chamadas ao navegador feitas pelo caminho antigo.
+    """
+
+    def __init__(self):
+        self.idas = 0
+
+    def primeiro(self, elemento, *seletores):
+        for seletor in seletores:
+            self.idas += 1
+            encontrado = elemento.query_selector(seletor)
+            if encontrado:
+                return encontrado
+        return None
+
+    def texto(self, elemento):
+        if elemento is None:
+            return None
+        self.idas += 1
+        return elemento.inner_text()
+
+    def atributo(self, elemento, nome):
+        if elemento is None:
+            return None
+        self.idas += 1
+        return elemento.get_attribute(nome)
+
+
+def extrair_por_elemento_ml(page, contador):
+    """
+    Reproduz as consultas por card do extrator antigo do Mercado Livre.
+    """
+    contador.idas += 1
+    cards = []
+    for elemento in page.query_selector_all('div.poly-card, li.ui-search-layout__item'):
+        container = contador.primeiro(elemento, '.andes-money-amount')
+        cards.append({
+            'titulo': contador.texto(contador.primeiro(
+                elemento, 'h2.poly-box', '.poly-component__title', '.ui-search-item__title')),
+            'link': contador.atributo(contador.primeiro(
+                elemento, 'a.poly-component__title', 'a.ui-search-link'), 'href'),
+            'preco_inteiro': contador.texto(
+                contador.primeiro(container, '.andes-money-amount__fraction')) if container else None,
+            'preco_centavos': contador.texto(
+                contador.primeiro(container, '.andes-money-amount__cents')) if container else None,
+            'preco_texto': contador.texto(contador.primeiro(
+                elemento, '.poly-price__current', '.ui-search-price__part')),
+            'imagem': contador.atributo(contador.primeiro(
+                elemento, 'img.ui-search-result-image__element', 'img'), 'src'),
+        })
+    return cards
+
+
+def extrair_por_elemento_amazon(page, contador):
+    """
+    Reproduz as consultas por card do extrator antigo da Amazon.
+    """
+    contador.idas += 1
+    cards = []
+    for elemento in page.query_selector_all('div[data-component-type="s-search-result"]'):
+        cards.append({
+            'titulo': contador.texto(contador.primeiro(elemento, 'h2 span')),
+            'link': contador.atributo(contador.primeiro(
+                elemento, 'a.a-link-normal.s-no-outline', 'h2 a'), 'href'),
+            'preco_texto': contador.texto(contador.primeiro(elemento, 'span.a-offscreen')),
+            'preco_inteiro': contador.texto(contador.primeiro(elemento, 'span.a-price-whole')),
+            'preco_centavos': contador.texto(contador.primeiro(elemento, 'span.a-price-fraction')),
+            'imagem': contador.atributo(contador.primeiro(elemento, 'img.s-image', 'img'), 'src'),
+        })
+    return cards
+
+
+def medir(funcao, repeticoes):
+    """
+    Executa a função várias vezes e devolve (último resultado, ms médio).
+    """
+    resultado = None
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return resultado, (time.perf_counter() - inicio) * 1000 / repeticoes
+
+
+def main_benchmark():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    casos = [
+        ('Mercado Livre', 'mercado_livre.html', extrair_por_elemento_ml),
+        ('Amazon BR', 'amazon.html', extrair_por_elemento_amazon),
+    ]
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+
+        for nome, fixture, antigo in casos:
+            marketplace = obter_marketplace(nome)
+            page.set_content(ler_fixture(fixture).decode('utf-8'), wait_until='domcontentloaded')
+
+            contador = Contador()
+            cards_antigo, ms_antigo = medir(lambda: antigo(page, contador), repeticoes)
+            idas_antigo = contador.idas // repeticoes
+
+            cards_lote, ms_lote = medir(lambda: marketplace.extrator.extrair_navegador(page), repeticoes)
+
+            iguais = (marketplace.normalizar(cards_antigo, 'benchmark', fonte=FONTE_NAVEGADOR)
+                      == marketplace.normalizar(cards_lote, 'benchmark', fonte=FONTE_NAVEGADOR))
+
+            print(f'{nome} ({len(cards_lote)} cards):')
+            print(f'  Elemento a elemento: {idas_antigo} idas ao navegador | {ms_antigo:.1f} ms/página')
+            print(f'  Em lote:             1 ida ao navegador | {ms_lote:.1f} ms/página')
+            print(f'  Ganho: {ms_antigo / ms_lote:.1f}x | Resultados idênticos: {"sim" if iguais else "NÃO"}')
+
+        browser.close()
+
+
+if __name__ == '__main__':
+    main_benchmark()
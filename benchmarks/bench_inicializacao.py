@@ -0,0 +1,135 @@
+"""
+Benchmark: custo de importação dos módulos de entrada (python -X importtime).
+
+Cada módulo é importado em um processo novo, várias vezes, com
+-X importtime. Para cada um são mostrados a mediana do tempo de importação
+do próprio módulo (acumulado, com tudo o que ele importa), a mediana do
+processo inteiro (inicialização do Python incluída), os módulos importados
+diretamente que mais pesaram e quais dos módulos pesados (pandas, numpy,
+Playwright, openpyxl) foram carregados só pela importação: eles devem
+aparecer apenas nos caminhos que os usam.
+
+Uso:
+    python benchmarks/bench_inicializacao.py [--modulos main,app] [--repeticoes 5]
+    python benchmarks/bench_inicializacao.py --sem-pesados   # código 1 se algum for carregado
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+PASTA_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos de entrada medidos por padrão
+MODULOS = ('main', 'app', 'fila_jobs', 'monitoramento', 'servico')
+
+# Pacotes que não devem ser carregados só por importar os módulos de entrada
+PESADOS = ('pandas', 'numpy', 'playwright', 'openpyxl', 'pyarrow')
+
+# Linha do -X importtime: "import time: <próprio> | <acumulado> | <indentação><módulo>"
+_LINHA = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def ler_importtime(saida: str) -> List[Tuple[str, int, int]]:
+    """
+    Entradas (módulo, profundidade, acumulado em µs) da saída do -X importtime.
+    """
+    entradas = []
+    for linha in saida.splitlines():
+        encontrado = _LINHA.match(linha)
+        if encontrado:
+            _, acumulado, indentacao, modulo = encontrado.groups()
+            entradas.append((modulo, (len(indentacao) - 1) // 2, int(acumulado)))
+    return entradas
+
+
+def medir_importacao(modulo: str) -> Dict:
+    """
+    Importa o módulo uma vez em um processo novo.
+
+    Returns:
+        Tempo de importação do módulo e do processo, importações diretas e
+        pacotes pesados carregados
+    """
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+                              cwd=PASTA_REPOSITORIO, capture_output=True, text=True)
+    processo_s = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise RuntimeError(f'import {modulo} falhou:\n{processo.stderr[-2000:]}')
+
+    entradas = ler_importtime(processo.stderr)
+    # O -X importtime lista os filhos antes do pai: os diretos do módulo são
+    # as entradas de profundidade 1 desde a última de profundidade 0
+    proprio = 0
+    diretos: List[Tuple[str, int]] = []
+    pendentes: List[Tuple[str, int]] = []
+    for nome, profundidade, acumulado in entradas:
+        if profundidade == 1:
+            pendentes.append((nome, acumulado))
+        elif profundidade == 0:
+            if nome == modulo:
+                proprio = acumulado
+                diretos = pendentes
+            pendentes = []
+
+    carregados = {nome.split('.')[0] for nome, _, _ in entradas}
+    return {
+        'importacao_ms': proprio / 1000,
+        'processo_ms': processo_s * 1000,
+        'diretos': diretos,
+        'pesados': sorted(carregados.intersection(PESADOS)),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description='Tempo de importação dos módulos de entrada')
+    parser.add_argument('--modulos', default=','.join(MODULOS),
+                        help=f"Módulos separados por vírgula (padrão: {', '.join(MODULOS)})")
+    parser.add_argument('--repeticoes', type=int, default=5,
+                        help='Importações (processos) por módulo')
+    parser.add_argument('--saida', default=None, help='Grava o resultado em um arquivo JSON')
+    parser.add_argument('--sem-pesados', action='store_true',
+                        help='Termina com código 1 se algum módulo carregar um pacote pesado')
+    args = parser.parse_args()
+
+    resultado = {}
+    com_pesados = []
+    for modulo in [nome.strip() for nome in args.modulos.split(',') if nome.strip()]:
+        medicoes = [medir_importacao(modulo) for _ in range(args.repeticoes)]
+        importacao = statistics.median(m['importacao_ms'] for m in medicoes)
+        processo = statistics.median(m['processo_ms'] for m in medicoes)
+        pesados = medicoes[-1]['pesados']
+        diretos = sorted(medicoes[-1]['diretos'], key=lambda item: -item[1])[:5]
+        resultado[modulo] = {
+            'importacao_ms': round(importacao, 1),
+            'processo_ms': round(processo, 1),
+            'pesados': pesados,
+            'maiores_diretos': {nome: round(acumulado / 1000, 1) for nome, acumulado in diretos},
+        }
+        if pesados:
+            com_pesados.append(modulo)
+
+        print(f"{modulo:<14} importação {importacao:7.1f} ms | processo {processo:7.1f} ms | "
+              f"pesados: {', '.join(pesados) or 'nenhum'}")
+        for nome, acumulado in diretos:
+            print(f"    {nome:<24} {acumulado / 1000:7.1f} ms")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f'\nResultado gravado em {args.saida}')
+
+    if args.sem_pesados and com_pesados:
+        print(f"\nPacotes pesados carregados na importação de: {', '.join(com_pesados)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,104 @@
+"""
+Benchmark: ritmo fixo x limitador adaptativo contra um marketplace que limita.
+
+Sobe o marketplace falso de servidor_limitado.py (rajada curta e depois uma
+requisição por `intervalo` segundos em cada marketplace) e roda
+processar_termos duas vezes sobre os mesmos termos, pela camada HTTP:
+
+    fixo       -> intervalo constante entre requisições (como os antigos 2 a 5 s,
+                  em escala), sem adaptação
+    adaptativo -> LimitadorAdaptativo partindo do mesmo intervalo
+
+Para cada um mostra o tempo total, as requisições atendidas e barradas pelo
+servidor, as buscas que terminaram sem produtos e o intervalo final
+aprendido por domínio.
+
+Uso:
+    python benchmarks/bench_limitador.py [quantidade_de_termos] [intervalo_do_servidor]
+"""
+
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from limitador import LimitadorAdaptativo, PoliticaRetentativa  # noqa: E402
+from servidor_limitado import iniciar_servidor_limitado  # noqa: E402
+
+
+class PoolAusente:
+    """
+    Substitui o navegador: o benchmark mede só a camada HTTP, e uma busca que
+    precisasse do navegador falha na hora (e conta como erro).
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def pagina(self):
+        raise RuntimeError('navegador desativado no benchmark')
+
+
+def rodar(nome: str, termos, intervalo_servidor: float, limitador: LimitadorAdaptativo):
+    # Um servidor por marketplace: domínios distintos, como nos sites reais
+    servidores = {}
+    for marketplace in ('ml', 'amazon'):
+        servidores[marketplace] = iniciar_servidor_limitado(intervalo=intervalo_servidor, rajada=3)
+    main.obter_marketplace('Mercado Livre').url_base = f"{servidores['ml'][1]}/ml"
+    main.obter_marketplace('Amazon BR').url_base = f"{servidores['amazon'][1]}/amazon"
+    politica = PoliticaRetentativa(espera_base=intervalo_servidor, espera_maxima=10 * intervalo_servidor)
+
+    inicio = time.perf_counter()
+    try:
+        lotes = []
+        main.processar_termos(
+            termos, pool=PoolAusente(), limitador=limitador, politica=politica,
+            ao_concluir_lote=lambda termo, marketplace, produtos: lotes.append(produtos)
+        )
+    finally:
+        for servidor, _ in servidores.values():
+            servidor.shutdown()
+    tempo = time.perf_counter() - inicio
+
+    contagens = [
+        contagem
+        for servidor, _ in servidores.values()
+        for contagem in servidor.RequestHandlerClass.estatisticas().values()
+    ]
+    atendidas = sum(c['atendidas'] for c in contagens)
+    barradas = sum(c['barradas'] for c in contagens)
+    vazias = sum(1 for lote in lotes if not lote)
+    intervalos = ', '.join(f'{d}: {i:.2f}s' for d, i in limitador.intervalos().items())
+
+    print(f'{nome:<11} {tempo:7.2f}s | {atendidas:3d} atendidas | {barradas:3d} barradas (429) | '
+          f'{politica.retentativas:2d} retentativas | {vazias} buscas sem produtos')
+    print(f'{"":<11} intervalo final: {intervalos}')
+
+
+def main_benchmark():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    intervalo_servidor = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    termos = [f'termo benchmark {i}' for i in range(quantidade)]
+
+    # O log por busca atrapalha a leitura do resultado
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # Ritmo inicial 4x mais lento que o servidor permite, como os 2 a 5 s fixos
+    inicial = 4 * intervalo_servidor
+    print(f'Termos: {quantidade} (2 buscas por termo) | servidor: 1 requisição a cada '
+          f'{intervalo_servidor}s por marketplace, rajada de 3')
+
+    rodar('fixo', termos, intervalo_servidor,
+          LimitadorAdaptativo(inicial, inicial, intervalo_piso=inicial, intervalo_teto=inicial, jitter=0))
+    rodar('adaptativo', termos, intervalo_servidor,
+          LimitadorAdaptativo(inicial, inicial, intervalo_piso=intervalo_servidor / 4))
+
+
+if __name__ == '__main__':
+    main_benchmark()
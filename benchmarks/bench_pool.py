@@ -0,0 +1,64 @@
+"""
+Benchmark: custo de inicialização do navegador por termo, com e sem pool.
+
+Roda buscar_mercado_livre e buscar_amazon contra as fixtures locais, primeiro
+lançando um Chromium por chamada (comportamento antigo) e depois reaproveitando
+um único PoolNavegador para todos os termos. A camada HTTP fica desligada
+para que toda busca passe pelo navegador.
+
+Uso:
+    python benchmarks/bench_pool.py [quantidade_de_termos]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from navegador import PoolNavegador  # noqa: E402
+from servidor_fixtures import iniciar_servidor, apontar_para_fixtures  # noqa: E402
+
+
+def rodar(termos, pool=None) -> float:
+    """
+    Executa as duas buscas para cada termo e devolve o tempo total em segundos.
+    """
+    inicio = time.perf_counter()
+    for termo in termos:
+        main.buscar_mercado_livre(termo, pool=pool, usar_http=False)
+        main.buscar_amazon(termo, pool=pool, usar_http=False)
+    return time.perf_counter() - inicio
+
+
+def main_benchmark():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    termos = [f'termo benchmark {i}' for i in range(quantidade)]
+
+    servidor, url_base = iniciar_servidor()
+    apontar_para_fixtures(main, url_base)
+
+    try:
+        tempo_sem_pool = rodar(termos)
+
+        with PoolNavegador() as pool:
+            tempo_com_pool = rodar(termos, pool=pool)
+            lancamentos = pool.lancamentos
+    finally:
+        servidor.shutdown()
+
+    por_termo_sem = tempo_sem_pool / quantidade
+    por_termo_com = tempo_com_pool / quantidade
+
+    print(f'Termos: {quantidade} (2 buscas por termo)')
+    print(f'Sem pool: {tempo_sem_pool:.2f}s total | {por_termo_sem:.3f}s por termo | '
+          f'{2 * quantidade} lançamentos')
+    print(f'Com pool: {tempo_com_pool:.2f}s total | {por_termo_com:.3f}s por termo | '
+          f'{lancamentos} lançamento(s)')
+    print(f'Overhead de inicialização economizado por termo: '
+          f'{por_termo_sem - por_termo_com:.3f}s')
+
+
+if __name__ == '__main__':
+    main_benchmark()
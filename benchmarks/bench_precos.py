@@ -0,0 +1,129 @@
+"""
+Benchmark: conversão de textos de preço, um a um e em lote.
+
+Primeiro confere limpar_preco, limpar_precos e limpar_precos_series contra o
+corpus de referência (fixtures/precos_golden.json, gerado com a
+implementação original); qualquer diferença encerra com código 1. Depois
+mede a vazão (textos por segundo) da implementação original, reproduzida
+abaixo, e de cada versão nova sobre o corpus repetido até o tamanho pedido.
+
+Uso:
+    python benchmarks/bench_precos.py [quantidade_de_textos]
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from precos import limpar_preco, limpar_precos, limpar_precos_series  # noqa: E402
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def limpar_preco_original(texto: str) -> float:
+    """
+    Implementação anterior (padrões recompilados a cada chamada), mantida
+    só como referência de desempenho.
+    """
+    if not texto:
+        return 0.0
+    try:
+        matches = re.findall(r'[\d\.,]+', texto)
+        if not matches:
+            return 0.0
+        valor_preco = None
+        if 'R$' in texto:
+            match_rs = re.search(r'R\$\s*([\d\.,]+)', texto)
+            if match_rs:
+                valor_preco = match_rs.group(1)
+        if not valor_preco:
+            valor_preco = matches[-1]
+        if ',' in valor_preco:
+            partes = valor_preco.split(',')
+            parte_inteira = partes[0].replace('.', '')
+            parte_decimal = partes[1] if len(partes) > 1 else '00'
+            valor_limpo = f"{parte_inteira}.{parte_decimal}"
+        else:
+            if '.' in valor_preco:
+                partes_ponto = valor_preco.split('.')
+                if len(partes_ponto) == 2 and len(partes_ponto[1]) <= 2:
+                    valor_limpo = valor_preco
+                else:
+                    valor_limpo = valor_preco.replace('.', '')
+            else:
+                valor_limpo = valor_preco
+        return float(valor_limpo)
+    except (ValueError, AttributeError, IndexError):
+        return 0.0
+
+
+def carregar_corpus():
+    with open(os.path.join(PASTA_FIXTURES, 'precos_golden.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def conferir(corpus) -> int:
+    """
+    Compara as três versões com os valores de referência; devolve o número de divergências.
+    """
+    textos = [texto for texto, _ in corpus]
+    esperados = [esperado for _, esperado in corpus]
+    resultados = {
+        'limpar_preco': [limpar_preco(texto) for texto in textos],
+        'limpar_precos': limpar_precos(textos),
+        'limpar_precos_series': limpar_precos_series(pd.Series(textos, dtype=object)).tolist(),
+    }
+
+    divergencias = 0
+    for nome, obtidos in resultados.items():
+        for texto, esperado, obtido in zip(textos, esperados, obtidos):
+            if obtido != esperado:
+                divergencias += 1
+                print(f'DIVERGÊNCIA {nome}: {texto!r} -> {obtido!r} (esperado {esperado!r})')
+    print(f'Corpus de referência: {len(corpus)} textos, {divergencias} divergências')
+    return divergencias
+
+
+def medir(nome: str, funcao, quantidade: int):
+    inicio = time.perf_counter()
+    funcao()
+    tempo = time.perf_counter() - inicio
+    print(f'{nome:<28} {tempo:7.3f}s | {quantidade / tempo:>12,.0f} textos/s')
+    return tempo
+
+
+def main_benchmark():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    corpus = carregar_corpus()
+    if conferir(corpus):
+        sys.exit(1)
+
+    base = [texto for texto, _ in corpus]
+    textos = (base * (quantidade // len(base) + 1))[:quantidade]
+    serie = pd.Series(textos, dtype=object)
+
+    # Pior caso para as versões em lote: nenhum texto se repete
+    distintos = [f'{textos[i]} {i}' for i in range(quantidade)]
+    serie_distintos = pd.Series(distintos, dtype=object)
+
+    for titulo, amostra, amostra_serie in [
+        (f'{quantidade:,} textos com repetição ({len(base)} distintos)', textos, serie),
+        (f'{quantidade:,} textos distintos', distintos, serie_distintos),
+    ]:
+        print(f'\nVazão com {titulo}:')
+        tempo_original = medir('original (um a um)', lambda: [limpar_preco_original(t) for t in amostra], quantidade)
+        tempo_novo = medir('limpar_preco (um a um)', lambda: [limpar_preco(t) for t in amostra], quantidade)
+        tempo_lote = medir('limpar_precos (lote)', lambda: limpar_precos(amostra), quantidade)
+        tempo_series = medir('limpar_precos_series', lambda: limpar_precos_series(amostra_serie), quantidade)
+        print(f'Ganho sobre o original: um a um {tempo_original / tempo_novo:.1f}x | '
+              f'lote {tempo_original / tempo_lote:.1f}x | series {tempo_original / tempo_series:.1f}x')
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,380 @@
+"""
+Suíte de benchmarks offline do pipeline, para comparar commits.
+
+Roda cada caso contra as páginas salvas em benchmarks/fixtures, servidas
+pelo servidor local de servidor_fixtures.py (sem acesso à internet):
+
+    buscar_mercado_livre -> uma busca por repetição (camada HTTP, ou o
+                            navegador com --navegador)
+    buscar_amazon        -> idem, na Amazon
+    limpar_preco         -> lotes de 1000 textos do corpus de preços
+    salvar_excel         -> Excel + JSON com os produtos das fixtures, pelo
+                            mesmo caminho das execuções (exportar_armazem)
+    dados                -> rota /dados do Flask (lista completa e consultas
+                            paginadas), com gzip
+
+Cada caso roda em um processo separado, para que o pico de memória (RSS)
+medido seja só dele. Para cada um são gravados a vazão (itens por segundo)
+e a latência p50/p95 por repetição, depois de uma primeira repetição sem
+aquecimento (medida à parte), e o pico de RSS em um arquivo JSON, por padrão
+benchmarks/resultados/<commit>.json. Com --comparar, os números são
+confrontados com os de outro arquivo e o script termina com código 1 se
+algum caso piorou além da tolerância.
+
+Uso:
+    python benchmarks/bench_suite.py [--repeticoes 30] [--casos dados,salvar_excel]
+    python benchmarks/bench_suite.py --comparar benchmarks/resultados/<commit_anterior>.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+PASTA_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PASTA_REPOSITORIO = os.path.dirname(PASTA_BENCHMARKS)
+
+sys.path.insert(0, PASTA_REPOSITORIO)
+
+from produto import Produto  # noqa: E402
+from servidor_fixtures import PASTA_FIXTURES, iniciar_servidor, apontar_para_fixtures  # noqa: E402
+
+# Textos por lote no caso limpar_preco (uma chamada isolada é rápida demais para medir)
+TEXTOS_POR_LOTE = 1000
+
+# Consultas à rota /dados, repetidas em rodízio
+CONSULTAS_DADOS = [
+    '/dados',
+    '/dados?pagina=2',
+    '/dados?marketplace=Amazon BR&ordenar=preco',
+    '/dados?ordenar=-titulo&por_pagina=200',
+    '/dados?preco_min=50&preco_max=500&ordenar=-preco',
+]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """
+    Percentil pelo método do posto mais próximo.
+
+    Args:
+        valores: Amostras (não precisam estar ordenadas)
+        p: Percentil entre 0 e 100
+    """
+    ordenados = sorted(valores)
+    posto = max(1, -(-len(ordenados) * p // 100))
+    return ordenados[int(posto) - 1]
+
+
+def pico_rss_mb() -> float:
+    """
+    Pico de memória residente do processo atual, em MB.
+    """
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def medir_repeticoes(executar: Callable[[int], int], repeticoes: int) -> Dict:
+    """
+    Executa `executar(i)` uma vez sem aquecimento e depois `repeticoes`
+    vezes, e resume as latências.
+
+    Args:
+        executar: Função que roda a repetição i e devolve quantos itens processou
+        repeticoes: Quantidade de repetições medidas depois da primeira
+
+    Returns:
+        Dicionário com vazão, p50 e p95 (sem a primeira repetição), duração
+        da primeira repetição e total de itens
+    """
+    inicio = time.perf_counter()
+    executar(0)
+    primeira = time.perf_counter() - inicio
+
+    latencias = []
+    itens = 0
+    for i in range(1, repeticoes + 1):
+        inicio = time.perf_counter()
+        itens += executar(i)
+        latencias.append(time.perf_counter() - inicio)
+
+    total = sum(latencias)
+    return {
+        'repeticoes': repeticoes,
+        'itens': itens,
+        'vazao': round(itens / total, 2) if total else 0.0,
+        'p50_s': round(percentil(latencias, 50), 6),
+        'p95_s': round(percentil(latencias, 95), 6),
+        'primeira_s': round(primeira, 6),
+        'total_s': round(total, 4),
+    }
+
+
+def produtos_fixtures(main) -> List[Produto]:
+    """
+    Produtos extraídos das fixtures dos dois marketplaces (servidor já no ar).
+    """
+    return (main.buscar_mercado_livre('produtos fixture', pool=None)
+            + main.buscar_amazon('produtos fixture', pool=None))
+
+
+def replicar(produtos: List[Produto], quantidade: int) -> List[Produto]:
+    """
+    Repete os produtos até `quantidade`, variando termo e link para que
+    pareçam buscas distintas.
+    """
+    replicados = []
+    for i in range(quantidade):
+        produto = produtos[i % len(produtos)]
+        lote = i // len(produtos)
+        replicados.append(replace(produto, termo=f"termo benchmark {lote}", link=f"{produto.link}#{lote}"))
+    return replicados
+
+
+def caso_busca(marketplace: str, repeticoes: int, navegador: bool, **_) -> Tuple[Dict, str]:
+    import main
+
+    servidor, url_base = iniciar_servidor()
+    apontar_para_fixtures(main, url_base)
+    buscar = main.buscar_mercado_livre if marketplace == 'ml' else main.buscar_amazon
+    try:
+        if navegador:
+            from navegador import PoolNavegador
+            with PoolNavegador() as pool:
+                resultado = medir_repeticoes(
+                    lambda i: len(buscar(f'termo benchmark {i}', pool=pool, usar_http=False)),
+                    repeticoes)
+        else:
+            resultado = medir_repeticoes(lambda i: len(buscar(f'termo benchmark {i}')), repeticoes)
+    finally:
+        servidor.shutdown()
+    return resultado, 'produtos/s'
+
+
+def caso_limpar_preco(repeticoes: int, **_) -> Tuple[Dict, str]:
+    from precos import limpar_preco
+
+    with open(os.path.join(PASTA_FIXTURES, 'precos_golden.json'), 'r', encoding='utf-8') as f:
+        corpus = [texto for texto, _ in json.load(f)]
+    lote = (corpus * (TEXTOS_POR_LOTE // len(corpus) + 1))[:TEXTOS_POR_LOTE]
+
+    def executar(_i: int) -> int:
+        for texto in lote:
+            limpar_preco(texto)
+        return len(lote)
+
+    return medir_repeticoes(executar, repeticoes), 'textos/s'
+
+
+def caso_salvar_excel(repeticoes: int, produtos: int, pasta: str, **_) -> Tuple[Dict, str]:
+    import main
+
+    servidor, url_base = iniciar_servidor()
+    apontar_para_fixtures(main, url_base)
+    try:
+        lista = replicar(produtos_fixtures(main), produtos)
+    finally:
+        servidor.shutdown()
+
+    # Os produtos vão para o armazenamento incremental, um lote por
+    # (termo, marketplace), como numa execução
+    from armazem_resultados import ArmazemResultados
+
+    armazem = ArmazemResultados(os.path.join(pasta, 'resultado.jsonl'))
+    armazem.limpar()
+    lotes: Dict[Tuple[str, str], List[Produto]] = {}
+    for produto in lista:
+        lotes.setdefault((produto.termo, produto.marketplace), []).append(produto)
+    for (termo, marketplace), produtos_lote in lotes.items():
+        armazem.gravar_lote(termo, marketplace, produtos_lote)
+
+    excel = os.path.join(pasta, 'resultado.xlsx')
+    arquivo_json = os.path.join(pasta, 'resultado.json')
+
+    def executar(_i: int) -> int:
+        main.exportar_armazem(armazem, excel, arquivo_json)
+        return len(lista)
+
+    return medir_repeticoes(executar, repeticoes), 'produtos/s'
+
+
+def caso_dados(repeticoes: int, produtos: int, pasta: str, **_) -> Tuple[Dict, str]:
+    import main
+
+    servidor, url_base = iniciar_servidor()
+    apontar_para_fixtures(main, url_base)
+    try:
+        lista = replicar(produtos_fixtures(main), produtos)
+    finally:
+        servidor.shutdown()
+
+    # A rota lê resultado.json da pasta atual
+    os.chdir(pasta)
+    main.salvar_json(lista, 'resultado.json')
+
+    import app
+    cliente = app.app.test_client()
+
+    def executar(i: int) -> int:
+        resposta = cliente.get(CONSULTAS_DADOS[i % len(CONSULTAS_DADOS)],
+                               headers={'Accept-Encoding': 'gzip'})
+        if resposta.status_code != 200:
+            raise RuntimeError(f'/dados respondeu {resposta.status_code}: {resposta.data[:200]!r}')
+        return 1
+
+    return medir_repeticoes(executar, repeticoes), 'requisições/s'
+
+
+CASOS = {
+    'buscar_mercado_livre': lambda **opcoes: caso_busca('ml', **opcoes),
+    'buscar_amazon': lambda **opcoes: caso_busca('amazon', **opcoes),
+    'limpar_preco': caso_limpar_preco,
+    'salvar_excel': caso_salvar_excel,
+    'dados': caso_dados,
+}
+
+
+def executar_caso(nome: str, repeticoes: int, produtos: int, navegador: bool) -> Dict:
+    """
+    Roda um caso no processo atual (chamado no subprocesso de cada caso).
+    """
+    # O log de cada busca e arquivo salvo atrapalharia a leitura do resultado
+    logging.getLogger().setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as pasta:
+        resultado, unidade = CASOS[nome](
+            repeticoes=repeticoes, produtos=produtos, navegador=navegador, pasta=pasta
+        )
+        os.chdir(PASTA_REPOSITORIO)
+    resultado['unidade'] = unidade
+    resultado['rss_pico_mb'] = round(pico_rss_mb(), 1)
+    return resultado
+
+
+def rodar_em_subprocesso(nome: str, args) -> Dict:
+    comando = [sys.executable, os.path.abspath(__file__), '--caso', nome,
+               '--repeticoes', str(args.repeticoes), '--produtos', str(args.produtos)]
+    if args.navegador:
+        comando.append('--navegador')
+    processo = subprocess.run(comando, capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise RuntimeError(f'caso {nome} falhou:\n{processo.stderr}')
+    # A última linha da saída é o resultado do caso
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def commit_atual() -> Optional[str]:
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PASTA_REPOSITORIO,
+                               capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual: Dict, anterior: Dict, tolerancia: float) -> List[str]:
+    """
+    Confronta dois resultados da suíte.
+
+    Args:
+        atual: Resultado desta execução
+        anterior: Resultado gravado de outra execução
+        tolerancia: Piora relativa aceita (0.10 = 10%)
+
+    Returns:
+        Lista de descrições dos casos que pioraram além da tolerância
+    """
+    pioras = []
+    print(f"\nComparação com {anterior.get('commit') or 'arquivo anterior'} "
+          f"(tolerância {tolerancia:.0%}):")
+    for nome, caso in atual['casos'].items():
+        base = anterior.get('casos', {}).get(nome)
+        if base is None:
+            print(f'  {nome:<21} sem referência')
+            continue
+        variacoes = []
+        for campo, maior_e_pior in (('vazao', False), ('p50_s', True), ('p95_s', True),
+                                    ('rss_pico_mb', True)):
+            if not base.get(campo):
+                continue
+            variacao = caso[campo] / base[campo] - 1
+            variacoes.append(f'{campo} {variacao:+.1%}')
+            if (variacao if maior_e_pior else -variacao) > tolerancia:
+                pioras.append(f'{nome}: {campo} {base[campo]} -> {caso[campo]}')
+        print(f"  {nome:<21} {' | '.join(variacoes)}")
+    return pioras
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description='Suíte de benchmarks offline do pipeline')
+    parser.add_argument('--casos', default=','.join(CASOS),
+                        help=f"Casos separados por vírgula (padrão: todos: {', '.join(CASOS)})")
+    parser.add_argument('--repeticoes', type=int, default=30,
+                        help='Repetições medidas por caso')
+    parser.add_argument('--produtos', type=int, default=2000,
+                        help='Produtos usados em salvar_excel e dados')
+    parser.add_argument('--navegador', action='store_true',
+                        help='Buscas pelo navegador (Playwright) em vez da camada HTTP')
+    parser.add_argument('--saida', default=None,
+                        help='Arquivo JSON de saída (padrão: benchmarks/resultados/<commit>.json)')
+    parser.add_argument('--comparar', metavar='ARQUIVO', default=None,
+                        help='Resultado anterior para comparar')
+    parser.add_argument('--tolerancia', type=float, default=0.10,
+                        help='Piora relativa aceita na comparação (padrão: 0.10)')
+    parser.add_argument('--caso', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        print(json.dumps(executar_caso(args.caso, args.repeticoes, args.produtos, args.navegador)))
+        return
+
+    nomes = [nome.strip() for nome in args.casos.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in nomes if nome not in CASOS]
+    if desconhecidos:
+        parser.error(f"casos desconhecidos: {', '.join(desconhecidos)}")
+
+    commit = commit_atual()
+    resultado = {
+        'commit': commit,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'camada': 'navegador' if args.navegador else 'http',
+        'casos': {},
+    }
+
+    print(f"{'caso':<21} {'vazão':>23} {'p50':>10} {'p95':>10} {'1ª':>10} {'RSS pico':>10}")
+    for nome in nomes:
+        caso = rodar_em_subprocesso(nome, args)
+        resultado['casos'][nome] = caso
+        print(f"{nome:<21} {caso['vazao']:>9.1f} {caso['unidade']:<13} "
+              f"{caso['p50_s'] * 1000:>8.2f}ms {caso['p95_s'] * 1000:>8.2f}ms "
+              f"{caso['primeira_s'] * 1000:>8.2f}ms {caso['rss_pico_mb']:>8.1f}MB")
+
+    saida = args.saida or os.path.join(PASTA_BENCHMARKS, 'resultados', f"{commit or 'sem-commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f'\nResultado gravado em {saida}')
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        pioras = comparar(resultado, anterior, args.tolerancia)
+        if pioras:
+            print('\nPioras além da tolerância:')
+            for piora in pioras:
+                print(f'  {piora}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_benchmark()
@@ -0,0 +1,157 @@
+"""
+Servidor HTTP local que serve páginas de resultado salvas dos marketplaces.
+
+Permite medir o pipeline de scraping sem acesso à internet. As rotas imitam
+o formato das URLs reais:
+
+    /ml/<termo-com-hifens>        -> fixtures/mercado_livre.html
+    /amazon/s?k=<termo+com+mais>  -> fixtures/amazon.html
+    /img/<qualquer>               -> imagem pequena
+    /assets/<qualquer>            -> CSS/JS vazios
+
+As páginas 2 e 3 (_Desde_<n> no Mercado Livre, &page=<n> na Amazon) são
+variantes da mesma fixture com links diferentes, para exercitar a coleta de
+várias páginas; da página 4 em diante a resposta não tem produtos.
+"""
+
+import os
+import re
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Tuple
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# GIF 1x1 transparente (suficiente para o navegador baixar e decodificar algo)
+IMAGEM_FIXTURE = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00'
+    b'\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+# Páginas com produtos distintos por marketplace
+PAGINAS_FIXTURE = 3
+
+_DESDE_ML = re.compile(r'_Desde_(\d+)')
+_PAGINA_AMAZON = re.compile(r'[?&]page=(\d+)')
+
+
+def variante_pagina(html: bytes, pagina: int) -> bytes:
+    """
+    Gera a página n da fixture trocando os links, para que cada página
+    tenha produtos distintos (a página 1 é a fixture original).
+
+    Args:
+        html: Conteúdo da fixture
+        pagina: Página pedida (a partir de 1)
+    """
+    if pagina == 1:
+        return html
+    if pagina > PAGINAS_FIXTURE:
+        return b'<html><body><p>Nenhum resultado</p></body></html>'
+    return (html
+            .replace(b'href="https://', f'href="https://p{pagina}-'.encode())
+            .replace(b'href="/', f'href="/p{pagina}/'.encode()))
+
+
+def ler_fixture(nome: str) -> bytes:
+    """
+    Lê o conteúdo de um arquivo da pasta de fixtures.
+
+    Args:
+        nome: Nome do arquivo (ex.: 'amazon.html')
+
+    Returns:
+        Conteúdo do arquivo em bytes
+    """
+    with open(os.path.join(PASTA_FIXTURES, nome), 'rb') as f:
+        return f.read()
+
+
+class HandlerFixtures(BaseHTTPRequestHandler):
+    """
+    Responde cada rota com a fixture correspondente.
+    """
+
+    paginas = {
+        'ml': [variante_pagina(ler_fixture('mercado_livre.html'), n) for n in range(1, PAGINAS_FIXTURE + 2)],
+        'amazon': [variante_pagina(ler_fixture('amazon.html'), n) for n in range(1, PAGINAS_FIXTURE + 2)],
+    }
+
+    def _pagina(self, marketplace: str, numero: int) -> bytes:
+        variantes = self.paginas[marketplace]
+        return variantes[min(numero, len(variantes)) - 1]
+
+    def do_GET(self):
+        caminho = self.path.split('?', 1)[0]
+
+        if caminho.startswith('/ml/'):
+            # _Desde_<n>: deslocamento do primeiro item (48 por página)
+            desde = _DESDE_ML.search(caminho)
+            numero = 1 + (int(desde.group(1)) - 1) // 48 if desde else 1
+            self._responder(200, 'text/html; charset=utf-8', self._pagina('ml', numero))
+        elif caminho.startswith('/amazon/s'):
+            pagina = _PAGINA_AMAZON.search(self.path)
+            numero = int(pagina.group(1)) if pagina else 1
+            self._responder(200, 'text/html; charset=utf-8', self._pagina('amazon', numero))
+        elif caminho.startswith('/img/'):
+            self._responder(200, 'image/gif', IMAGEM_FIXTURE)
+        elif caminho.endswith('.css'):
+            self._responder(200, 'text/css', b'')
+        elif caminho.endswith('.js'):
+            self._responder(200, 'application/javascript', b'')
+        else:
+            self._responder(404, 'text/plain', b'not found')
+
+    def _responder(self, status: int, tipo: str, corpo: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        # Silenciar o log padrão de cada requisição
+        pass
+
+
+def iniciar_servidor(porta: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Sobe o servidor de fixtures em uma thread daemon.
+
+    Args:
+        porta: Porta TCP (0 escolhe uma porta livre)
+
+    Returns:
+        Tupla (servidor, url_base), ex.: (srv, 'http://127.0.0.1:54321')
+    """
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), HandlerFixtures)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    host, porta_real = servidor.server_address[:2]
+    return servidor, f'http://{host}:{porta_real}'
+
+
+def apontar_para_fixtures(modulo_main, url_base: str):
+    """
+    Redireciona as URLs base dos marketplaces para o servidor de fixtures.
+
+    Args:
+        modulo_main: Módulo main já importado
+        url_base: URL devolvida por iniciar_servidor
+    """
+    modulo_main.obter_marketplace('Mercado Livre').url_base = f'{url_base}/ml'
+    modulo_main.obter_marketplace('Amazon BR').url_base = f'{url_base}/amazon'
+
+
+if __name__ == '__main__':
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    servidor, url = iniciar_servidor(porta)
+    print(f'Servindo fixtures em {url} (Ctrl+C para encerrar)')
+    print(f'  URL_MERCADO_LIVRE={url}/ml')
+    print(f'  URL_AMAZON={url}/amazon')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,127 @@
+"""
+Marketplace falso que limita o ritmo de requisições, como os sites reais.
+
+Serve as mesmas fixtures de servidor_fixtures.py, mas cada marketplace tem
+um balde de fichas no servidor: até `rajada` requisições seguidas passam, e
+depois só uma a cada `intervalo` segundos. Requisições acima do ritmo
+recebem, conforme o modo:
+
+    '429'     -> status 429 Too Many Requests
+    'captcha' -> status 200 com uma página de captcha (sem produtos)
+
+Uso (ver bench_limitador.py):
+    servidor, url = iniciar_servidor_limitado(intervalo=0.5, rajada=3)
+    apontar_para_fixtures(main, url)
+    ...
+    servidor.RequestHandlerClass.estatisticas()
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from typing import Dict, Tuple, Type
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from servidor_fixtures import HandlerFixtures, apontar_para_fixtures  # noqa: E402,F401
+
+PAGINA_CAPTCHA = (
+    b'<html><body><form action="/errors/validateCaptcha">'
+    b'<p>Digite os caracteres que voc\xc3\xaa v\xc3\xaa abaixo</p>'
+    b'<img src="/img/captcha.jpg"></form></body></html>'
+)
+
+
+class HandlerLimitado(HandlerFixtures):
+    """
+    HandlerFixtures com limite de ritmo por marketplace.
+
+    Os parâmetros ficam na classe (criada por iniciar_servidor_limitado),
+    porque o servidor instancia um handler por requisição.
+    """
+
+    intervalo = 1.0
+    rajada = 3
+    modo = '429'
+    # marketplace -> [fichas, instante da última atualização]
+    baldes: Dict[str, list] = {}
+    contagem: Dict[str, Dict[str, int]] = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def _admitir(cls, marketplace: str) -> bool:
+        with cls.lock:
+            agora = time.monotonic()
+            balde = cls.baldes.setdefault(marketplace, [float(cls.rajada), agora])
+            balde[0] = min(cls.rajada, balde[0] + (agora - balde[1]) / cls.intervalo)
+            balde[1] = agora
+            contagem = cls.contagem.setdefault(marketplace, {'atendidas': 0, 'barradas': 0})
+            if balde[0] >= 1:
+                balde[0] -= 1
+                contagem['atendidas'] += 1
+                return True
+            contagem['barradas'] += 1
+            return False
+
+    @classmethod
+    def estatisticas(cls) -> Dict[str, Dict[str, int]]:
+        with cls.lock:
+            return {marketplace: dict(contagem) for marketplace, contagem in cls.contagem.items()}
+
+    def do_GET(self):
+        caminho = self.path.split('?', 1)[0]
+        marketplace = 'ml' if caminho.startswith('/ml/') else 'amazon' if caminho.startswith('/amazon/s') else None
+
+        if marketplace is not None and not self._admitir(marketplace):
+            if self.modo == 'captcha':
+                self._responder(200, 'text/html; charset=utf-8', PAGINA_CAPTCHA)
+            else:
+                self._responder(429, 'text/plain', b'Too Many Requests')
+            return
+
+        super().do_GET()
+
+
+def iniciar_servidor_limitado(intervalo: float = 1.0, rajada: int = 3, modo: str = '429',
+                              porta: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Sobe o marketplace falso em uma thread daemon.
+
+    Args:
+        intervalo: Segundos por requisição admitida, depois da rajada
+        rajada: Requisições seguidas admitidas antes de limitar
+        modo: '429' ou 'captcha' (resposta às requisições acima do ritmo)
+        porta: Porta TCP (0 escolhe uma porta livre)
+
+    Returns:
+        Tupla (servidor, url_base)
+    """
+    # Uma classe por servidor, para que os baldes não sejam compartilhados
+    handler: Type[HandlerLimitado] = type('HandlerLimitadoInstancia', (HandlerLimitado,), {
+        'intervalo': intervalo,
+        'rajada': rajada,
+        'modo': modo,
+        'baldes': {},
+        'contagem': {},
+        'lock': threading.Lock(),
+    })
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    host, porta_real = servidor.server_address[:2]
+    return servidor, f'http://{host}:{porta_real}'
+
+
+if __name__ == '__main__':
+    intervalo = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    modo = sys.argv[2] if len(sys.argv) > 2 else '429'
+    servidor, url = iniciar_servidor_limitado(intervalo, modo=modo, porta=8766)
+    print(f'Marketplace limitado em {url} (1 requisição a cada {intervalo}s, modo {modo})')
+    print(f'  URL_MERCADO_LIVRE={url}/ml')
+    print(f'  URL_AMAZON={url}/amazon')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,349 @@
+"""
+Motor de busca concorrente baseado em playwright.async_api.
+
+Roda várias páginas em paralelo, com limite de concorrência global e por
+marketplace. O ritmo por domínio e as retentativas usam o mesmo limitador
+adaptativo do caminho sequencial, mas as esperas não bloqueiam as buscas
+em outros domínios. O resultado final mantém exatamente a mesma ordem de
+processar_termos: para cada termo, os marketplaces na ordem de main.BUSCADORES.
+"""
+
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import main
+from armazem_resultados import ArmazemResultados
+from cache_resultados import CacheResultados
+from historico_precos import HistoricoPrecos
+from http_rapido import buscar_cards_http, BloqueioHttp, FONTE_HTTP, FONTE_NAVEGADOR
+from interceptacao import InterceptadorRecursos
+from marketplaces import Marketplace, obter_marketplace
+from limitador import (LimitadorAdaptativo, PoliticaRetentativa, RESULTADO_BLOQUEIO,
+                       RESULTADO_ERRO, RESULTADO_OK, RESULTADO_VAZIO)
+from metricas import contexto_busca, medir, registro
+from navegador import PoolNavegadorAsync
+from paginacao import ErroBusca, MAX_PAGINAS, precisa_proxima_pagina
+from produto import Produto
+from seletores import SCRIPT_NAVEGADOR
+
+logger = logging.getLogger(__name__)
+
+
+async def cards_navegador_async(marketplace: Marketplace, pool: PoolNavegadorAsync, url_busca: str,
+                                termo: str) -> List[Dict]:
+    """
+    Versão assíncrona de main.cards_navegador.
+    """
+    async with pool.pagina() as page:
+
+        # Bloquear imagens, fontes, mídia e scripts de terceiros
+        interceptador = InterceptadorRecursos(marketplace.nome)
+        await interceptador.instalar_async(page)
+
+        logger.info(f"Acessando {marketplace.nome} para '{termo}'...")
+        interceptador.iniciar_carregamento()
+        with medir('navegacao'):
+            await page.goto(url_busca, wait_until="domcontentloaded", timeout=60000)
+
+        # Aguardar carregamento dos produtos - tentar cada seletor esperado
+        with medir('espera_seletor'):
+            for indice, seletor in enumerate(marketplace.seletores_espera, 1):
+                try:
+                    await page.wait_for_selector(seletor, timeout=10000)
+                    break
+                except Exception:
+                    if marketplace.espera_obrigatoria and indice == len(marketplace.seletores_espera):
+                        raise
+        interceptador.finalizar_carregamento()
+
+        # Extrair todos os cards em uma única ida ao navegador
+        with medir('extracao'):
+            extrator = marketplace.extrator
+            cards = extrator.concluir_navegador(
+                await page.evaluate(SCRIPT_NAVEGADOR, extrator.argumento_navegador())
+            )
+
+        logger.info(interceptador.resumo())
+
+    return cards
+
+
+async def baixar_pagina_async(marketplace: str, url: str,
+                              limitador: Optional[LimitadorAdaptativo] = None) -> Optional[List[Dict]]:
+    """
+    Versão assíncrona de paginacao.baixar_pagina.
+    """
+    if limitador is None:
+        return await asyncio.to_thread(buscar_cards_http, marketplace, url)
+    dominio = obter_marketplace(marketplace).dominio
+    await limitador.aguardar_async(dominio)
+    try:
+        return await asyncio.to_thread(buscar_cards_http, marketplace, url)
+    except BloqueioHttp:
+        limitador.registrar(dominio, RESULTADO_BLOQUEIO)
+        raise
+
+
+async def coletar_paginas_async(marketplace: str, termo: str, limite: int,
+                                url_pagina: Callable[[int], str],
+                                normalizar: Callable[..., List[Produto]],
+                                cards_navegador: Callable[[PoolNavegadorAsync, str, str], Awaitable[List[Dict]]],
+                                pool: PoolNavegadorAsync,
+                                usar_http: bool = True,
+                                limitador: Optional[LimitadorAdaptativo] = None) -> List[Produto]:
+    """
+    Versão assíncrona de paginacao.coletar_paginas.
+
+    A próxima página é baixada por uma task em paralelo com o processamento
+    da atual, nas mesmas condições do caminho síncrono.
+    """
+    produtos: List[Produto] = []
+    vistos = set()
+    fontes = set()
+    paginas_lidas = 0
+    itens_por_pagina = obter_marketplace(marketplace).itens_por_pagina
+    dominio = obter_marketplace(marketplace).dominio
+    proxima: Optional[asyncio.Task] = None
+
+    try:
+        for pagina in range(1, MAX_PAGINAS + 1):
+            url = url_pagina(pagina)
+
+            cards = None
+            if usar_http:
+                try:
+                    if proxima is not None:
+                        cards = await proxima
+                    elif pagina == 1:
+                        cards = await asyncio.to_thread(buscar_cards_http, marketplace, url)
+                    else:
+                        cards = await baixar_pagina_async(marketplace, url, limitador)
+                except BloqueioHttp as e:
+                    # Bloqueio em qualquer página: refazer a busca inteira mais tarde
+                    raise ErroBusca(marketplace, termo, RESULTADO_BLOQUEIO, f"{e} (página {pagina})",
+                                    registrado=pagina > 1 and limitador is not None) from e
+            proxima = None
+
+            # Pedir a próxima página já, se esta não deve bastar
+            if usar_http and pagina < MAX_PAGINAS and precisa_proxima_pagina(
+                    marketplace, len(produtos), limite, len(cards) if cards is not None else None):
+                proxima = asyncio.create_task(
+                    baixar_pagina_async(marketplace, url_pagina(pagina + 1), limitador)
+                )
+
+            fonte = FONTE_HTTP
+            if cards is None and pagina > 1 and fontes == {FONTE_HTTP}:
+                # A camada HTTP atendeu a primeira página: sem cards aqui
+                # é o fim dos resultados, não um HTML que precise do navegador
+                break
+            if cards is None:
+                if pagina > 1 and limitador is not None:
+                    await limitador.aguardar_async(dominio)
+                try:
+                    cards = await cards_navegador(pool, url, termo)
+                except Exception as e:
+                    if pagina == 1:
+                        raise ErroBusca(marketplace, termo, RESULTADO_ERRO, str(e)) from e
+                    logger.error(f"Erro ao buscar no {marketplace} para '{termo}' (página {pagina}): {e}")
+                    break
+                fonte = FONTE_NAVEGADOR
+
+            with medir('parsing', marketplace):
+                novos = normalizar(cards, termo, limite - len(produtos), fonte=fonte,
+                                   vistos=vistos, posicao_inicial=len(produtos) + 1)
+            produtos.extend(novos)
+            fontes.add(fonte)
+            paginas_lidas = pagina
+
+            # Fim dos resultados: página curta ou sem nenhum produto novo
+            if len(produtos) >= limite or not novos or len(cards) < itens_por_pagina:
+                break
+    finally:
+        # Uma página pedida à toa é descartada
+        if proxima is not None:
+            proxima.cancel()
+
+    camadas = ' + '.join(sorted('camada HTTP' if f == FONTE_HTTP else 'navegador' for f in fontes))
+    logger.info(
+        f"{marketplace} - {termo}: {len(produtos)} produtos encontrados "
+        f"({paginas_lidas} página(s), {camadas or 'nenhuma camada'})"
+    )
+    return produtos
+
+
+async def buscar_marketplace_async(nome: str, termo: str, pool: PoolNavegadorAsync,
+                                   limite: int = 30, usar_http: bool = True,
+                                   limitador: Optional[LimitadorAdaptativo] = None) -> List[Produto]:
+    """
+    Versão assíncrona de main.buscar_marketplace (mesmo extrator e normalização).
+
+    Args:
+        nome: Nome do marketplace (ex.: 'Mercado Livre')
+        termo: Termo de busca
+        pool: Pool assíncrono de navegador
+        limite: Número máximo de produtos a retornar
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        limitador: Ritmo por domínio para as páginas seguintes
+
+    Returns:
+        Lista de produtos
+    """
+    marketplace = obter_marketplace(nome)
+    return await coletar_paginas_async(
+        nome, termo, limite,
+        url_pagina=lambda pagina: marketplace.url_pagina(termo, pagina),
+        normalizar=marketplace.normalizar,
+        cards_navegador=partial(cards_navegador_async, marketplace),
+        pool=pool,
+        usar_http=usar_http,
+        limitador=limitador
+    )
+
+
+async def processar_termos_async(termos: List[str],
+                                 concorrencia_global: int = 6,
+                                 concorrencia_por_marketplace: int = 3,
+                                 intervalo_min: float = 2.0,
+                                 intervalo_max: float = 5.0,
+                                 max_usos_navegador: int = 50,
+                                 usar_http: bool = True,
+                                 cache: Optional[CacheResultados] = None,
+                                 forcar_atualizacao: bool = False,
+                                 armazem: Optional[ArmazemResultados] = None,
+                                 historico: Optional[HistoricoPrecos] = None,
+                                 limite: int = main.LIMITE_PADRAO,
+                                 limitador: Optional[LimitadorAdaptativo] = None,
+                                 politica: Optional[PoliticaRetentativa] = None) -> List[Produto]:
+    """
+    Processa todos os termos com buscas concorrentes nos dois marketplaces.
+
+    Args:
+        termos: Lista de termos de busca
+        concorrencia_global: Máximo de páginas abertas ao mesmo tempo
+        concorrencia_por_marketplace: Máximo de páginas abertas por marketplace
+        intervalo_min: Limite inferior do intervalo inicial entre requisições ao
+            mesmo domínio (segundos); depois o ritmo se adapta às respostas
+        intervalo_max: Limite superior do intervalo inicial (segundos)
+        max_usos_navegador: Buscas atendidas pelo navegador antes de ser relançado
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        cache: Cache de resultados; se omitido, toda busca vai aos marketplaces
+        forcar_atualizacao: Ignora o cache na leitura (o resultado novo é gravado)
+        armazem: Armazenamento incremental; pares já gravados nele são
+            reaproveitados (retomada) e cada busca nova é gravada ao terminar
+        historico: Histórico de preços; cada busca real vira uma observação
+        limite: Produtos por termo e marketplace (acima de uma página de
+            resultados, as páginas seguintes também são lidas)
+        limitador: Ritmo por domínio (criado a partir dos intervalos se omitido)
+        politica: Tentativas e orçamento de retentativas
+
+    Returns:
+        Lista completa de produtos, na mesma ordem do caminho sequencial
+
+    Raises:
+        ValueError: Se intervalo_min ou intervalo_max não for positivo
+    """
+    marketplaces = [nome for nome, _ in main.BUSCADORES]
+    limite_global = asyncio.Semaphore(concorrencia_global)
+    limites_marketplace = {
+        nome: asyncio.Semaphore(concorrencia_por_marketplace) for nome in marketplaces
+    }
+    if limitador is None:
+        limitador = LimitadorAdaptativo(intervalo_min, intervalo_max)
+    if politica is None:
+        politica = PoliticaRetentativa()
+    execucao_historico = historico.iniciar_execucao() if historico is not None else None
+
+    async with PoolNavegadorAsync(max_usos=max_usos_navegador) as pool:
+
+        async def executar(termo: str, marketplace: str) -> List[Produto]:
+            if armazem is not None:
+                produtos = armazem.obter(marketplace, termo)
+                if produtos is not None:
+                    logger.info(f"{marketplace} - {termo}: já gravado em {armazem.caminho}, retomando")
+                    return produtos
+
+            if cache is not None and not forcar_atualizacao:
+                produtos = main.obter_do_cache(cache, marketplace, termo, limite)
+                if produtos is not None:
+                    logger.info(f"{marketplace} - {termo}: {len(produtos)} produtos vindos do cache")
+                    if armazem is not None:
+                        armazem.gravar_lote(termo, marketplace, produtos)
+                    return produtos
+
+            dominio = main.dominio_marketplace(marketplace)
+            politica.registrar_busca()
+            tentativas = 0
+            while True:
+                async with limites_marketplace[marketplace]:
+                    await limitador.aguardar_async(dominio)
+                    async with limite_global:
+                        inicio = time.perf_counter()
+                        with contexto_busca(termo, marketplace), medir('busca', marketplace):
+                            try:
+                                produtos = await buscar_marketplace_async(marketplace, termo, pool,
+                                                                    limite=limite, usar_http=usar_http,
+                                                                    limitador=limitador)
+                                resultado = RESULTADO_OK if produtos else RESULTADO_VAZIO
+                                registrado = False
+                            except ErroBusca as e:
+                                logger.warning(str(e))
+                                produtos = None
+                                resultado = e.motivo
+                                registrado = e.registrado
+                if not registrado:
+                    limitador.registrar(dominio, resultado, time.perf_counter() - inicio)
+                registro.contar_busca(marketplace, resultado)
+                tentativas += 1
+
+                if resultado == RESULTADO_OK or not politica.pode_repetir(tentativas):
+                    break
+                # Esperar fora dos semáforos, liberando a vaga para outras buscas
+                espera = politica.espera(tentativas)
+                logger.info(f"{marketplace} - {termo}: {resultado}, nova tentativa em {espera:.1f}s")
+                await asyncio.sleep(espera)
+
+            if produtos is None:
+                logger.error(f"{marketplace} - {termo}: desistindo após {tentativas} tentativa(s)")
+                produtos = []
+            else:
+                if cache is not None:
+                    cache.gravar(marketplace, termo, produtos, limite=limite)
+                if historico is not None:
+                    historico.registrar(execucao_historico, produtos)
+            if armazem is not None:
+                with medir('gravacao', marketplace):
+                    armazem.gravar_lote(termo, marketplace, produtos)
+            return produtos
+
+        tarefas = [
+            executar(termo, marketplace)
+            for termo in termos
+            for marketplace in marketplaces
+        ]
+        lotes = await asyncio.gather(*tarefas)
+
+    todos_produtos = []
+    for lote in lotes:
+        todos_produtos.extend(lote)
+
+    main.registrar_taxa_http(lotes)
+    if cache is not None:
+        main.registrar_estatisticas_cache(cache)
+    return todos_produtos
+
+
+def processar_termos_concorrente(termos: List[str], **opcoes) -> List[Produto]:
+    """
+    Ponto de entrada síncrono para processar_termos_async.
+
+    Args:
+        termos: Lista de termos de busca
+        **opcoes: Repassadas para processar_termos_async
+
+    Returns:
+        Lista completa de produtos encontrados
+    """
+    return asyncio.run(processar_termos_async(termos, **opcoes))
@@ -0,0 +1,318 @@
+"""
+Cache persistente (SQLite) das listas de produtos por (marketplace, termo).
+
+Evita raspar de novo um termo buscado há poucos minutos. Cada marketplace
+tem seu próprio TTL, ajustável pelas variáveis de ambiente CACHE_TTL (todos
+os marketplaces) e CACHE_TTL_<MARKETPLACE> (ex.: CACHE_TTL_MERCADO_LIVRE,
+CACHE_TTL_AMAZON_BR), em minutos. O arquivo tem um tamanho máximo: quando ele é
+ultrapassado, as entradas acessadas há mais tempo são removidas (LRU).
+Acertos, falhas e expirações ficam gravados no próprio banco, para que o
+dashboard consiga consultá-los mesmo com a busca rodando em outro processo.
+
+Cada entrada guarda quantos produtos tem e se a busca esgotou as páginas
+do termo (trouxe menos que o limite pedido). Uma consulta que precisa de
+mais produtos do que a entrada tem só é atendida se as páginas se
+esgotaram; senão conta como falha e a busca é refeita.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import unicodedata
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from produto import Produto, como_dicts
+
+logger = logging.getLogger(__name__)
+
+FONTE_CACHE = 'cache'
+
+CAMINHO_CACHE = 'cache_resultados.sqlite3'
+
+# TTL padrão por marketplace (segundos)
+TTL_PADRAO = {
+    'Mercado Livre': 30 * 60,
+    'Amazon BR': 30 * 60,
+}
+
+TAMANHO_MAXIMO_PADRAO = 50 * 1024 * 1024
+
+# Variável de ambiente com o TTL (minutos) de todos os marketplaces; a de um
+# marketplace é esta seguida do nome (ver variavel_ttl)
+VARIAVEL_TTL = 'CACHE_TTL'
+
+
+def normalizar_termo(termo: str) -> str:
+    """
+    Normaliza o termo para a chave do cache (minúsculas, espaços simples).
+
+    Args:
+        termo: Termo de busca como digitado
+
+    Returns:
+        Termo normalizado
+    """
+    return ' '.join(termo.lower().split())
+
+
+def variavel_ttl(marketplace: str) -> str:
+    """
+    Nome da variável de ambiente do TTL de um marketplace.
+
+    Ex.: 'Mercado Livre' -> 'CACHE_TTL_MERCADO_LIVRE'
+    """
+    nome = unicodedata.normalize('NFKD', marketplace).encode('ascii', 'ignore').decode('ascii')
+    return f"{VARIAVEL_TTL}_{'_'.join(nome.upper().split())}"
+
+
+def ttl_do_ambiente() -> Dict[str, float]:
+    """
+    TTL de cada marketplace (segundos): TTL_PADRAO com CACHE_TTL e
+    CACHE_TTL_<MARKETPLACE> aplicados, nessa ordem.
+
+    Valores inválidos são ignorados com um aviso no log.
+    """
+    ttl = dict(TTL_PADRAO)
+    for marketplace in ttl:
+        for variavel in (VARIAVEL_TTL, variavel_ttl(marketplace)):
+            valor = os.environ.get(variavel)
+            if not valor:
+                continue
+            try:
+                minutos = float(valor)
+            except ValueError:
+                minutos = -1
+            if minutos < 0:
+                logger.warning(f"{variavel}={valor} ignorado: informe o TTL em minutos")
+                continue
+            ttl[marketplace] = minutos * 60
+    return ttl
+
+
+class CacheResultados:
+    """
+    Cache em disco com TTL por marketplace e remoção LRU por tamanho.
+
+    Uso:
+        cache = CacheResultados()
+        produtos = cache.obter('Mercado Livre', 'brigadeiro')
+        if produtos is None:
+            produtos = buscar_mercado_livre('brigadeiro')
+            cache.gravar('Mercado Livre', 'brigadeiro', produtos)
+    """
+
+    def __init__(self, caminho: str = CAMINHO_CACHE,
+                 ttl_por_marketplace: Optional[Dict[str, float]] = None,
+                 tamanho_maximo: int = TAMANHO_MAXIMO_PADRAO):
+        """
+        Args:
+            caminho: Arquivo SQLite do cache
+            ttl_por_marketplace: TTL em segundos por marketplace (sobrescreve
+                o de ttl_do_ambiente())
+            tamanho_maximo: Soma máxima, em bytes, das listas armazenadas
+        """
+        self.caminho = caminho
+        self.ttl = ttl_do_ambiente()
+        if ttl_por_marketplace:
+            self.ttl.update(ttl_por_marketplace)
+        self.tamanho_maximo = tamanho_maximo
+        self._criar_tabelas()
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """
+        Abre uma conexão, faz commit ao final do bloco e a fecha.
+        """
+        conexao = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def _criar_tabelas(self):
+        with self._conectar() as conexao:
+            # WAL permite leituras do dashboard enquanto a busca grava
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS resultados (
+                    marketplace TEXT NOT NULL,
+                    termo TEXT NOT NULL,
+                    produtos TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL,
+                    quantidade INTEGER NOT NULL DEFAULT 0,
+                    esgotado INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (marketplace, termo)
+                )
+            ''')
+            # Caches criados antes das colunas: as entradas antigas (quantidade
+            # 0) só atendem consultas sem mínimo até serem regravadas
+            colunas = {linha[1] for linha in conexao.execute('PRAGMA table_info(resultados)')}
+            for coluna in ('quantidade', 'esgotado'):
+                if coluna not in colunas:
+                    conexao.execute(f'ALTER TABLE resultados ADD COLUMN {coluna} INTEGER NOT NULL DEFAULT 0')
+            conexao.execute(
+                'CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (acessado_em)'
+            )
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS estatisticas (
+                    marketplace TEXT PRIMARY KEY,
+                    acertos INTEGER NOT NULL DEFAULT 0,
+                    falhas INTEGER NOT NULL DEFAULT 0,
+                    expirados INTEGER NOT NULL DEFAULT 0,
+                    remocoes INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+
+    def _contar(self, conexao: sqlite3.Connection, marketplace: str, campo: str, quantidade: int = 1):
+        conexao.execute(
+            'INSERT OR IGNORE INTO estatisticas (marketplace) VALUES (?)', (marketplace,)
+        )
+        conexao.execute(
+            f'UPDATE estatisticas SET {campo} = {campo} + ? WHERE marketplace = ?',
+            (quantidade, marketplace)
+        )
+
+    def obter(self, marketplace: str, termo: str, minimo: int = 0) -> Optional[List[Produto]]:
+        """
+        Retorna os produtos em cache, se ainda estiverem dentro do TTL.
+
+        Args:
+            marketplace: 'Mercado Livre' ou 'Amazon BR'
+            termo: Termo de busca
+            minimo: Produtos necessários; uma entrada menor só é aceita se a
+                busca que a gravou esgotou as páginas do termo
+
+        Returns:
+            Lista de produtos (com "fonte" = 'cache'), ou None em caso de falha
+        """
+        chave = normalizar_termo(termo)
+        agora = time.time()
+
+        with self._conectar() as conexao:
+            linha = conexao.execute(
+                'SELECT produtos, criado_em, quantidade, esgotado FROM resultados '
+                'WHERE marketplace = ? AND termo = ?',
+                (marketplace, chave)
+            ).fetchone()
+
+            if linha is None:
+                self._contar(conexao, marketplace, 'falhas')
+                return None
+
+            produtos_json, criado_em, quantidade, esgotado = linha
+            if agora - criado_em > self.ttl.get(marketplace, 0):
+                conexao.execute(
+                    'DELETE FROM resultados WHERE marketplace = ? AND termo = ?',
+                    (marketplace, chave)
+                )
+                self._contar(conexao, marketplace, 'falhas')
+                self._contar(conexao, marketplace, 'expirados')
+                return None
+
+            if quantidade < minimo and not esgotado:
+                # Curta demais para o pedido: a busca vai regravar a entrada
+                self._contar(conexao, marketplace, 'falhas')
+                return None
+
+            conexao.execute(
+                'UPDATE resultados SET acessado_em = ? WHERE marketplace = ? AND termo = ?',
+                (agora, marketplace, chave)
+            )
+            self._contar(conexao, marketplace, 'acertos')
+
+        # Manter o termo exatamente como foi digitado nesta busca
+        return [Produto.de_dict(produto, termo=termo, fonte=FONTE_CACHE)
+                for produto in json.loads(produtos_json)]
+
+    def gravar(self, marketplace: str, termo: str, produtos: List[Produto],
+               limite: Optional[int] = None):
+        """
+        Armazena a lista de produtos e aplica a remoção LRU se necessário.
+
+        Listas vazias não são gravadas: normalmente indicam falha na busca.
+
+        Args:
+            marketplace: 'Mercado Livre' ou 'Amazon BR'
+            termo: Termo de busca
+            produtos: Produtos retornados pela busca
+            limite: Produtos pedidos na busca; menos que isso significa que
+                as páginas do termo se esgotaram (omitido: não se sabe)
+        """
+        if not produtos:
+            return
+
+        produtos_json = json.dumps(como_dicts(produtos), ensure_ascii=False)
+        tamanho = len(produtos_json.encode('utf-8'))
+        esgotado = limite is not None and len(produtos) < limite
+        agora = time.time()
+
+        with self._conectar() as conexao:
+            conexao.execute(
+                'INSERT OR REPLACE INTO resultados '
+                '(marketplace, termo, produtos, tamanho, criado_em, acessado_em, quantidade, esgotado) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (marketplace, normalizar_termo(termo), produtos_json, tamanho, agora, agora,
+                 len(produtos), int(esgotado))
+            )
+            self._remover_excedente(conexao)
+
+    def _remover_excedente(self, conexao: sqlite3.Connection):
+        """
+        Remove as entradas menos usadas até o total caber no tamanho máximo.
+        """
+        total = conexao.execute('SELECT COALESCE(SUM(tamanho), 0) FROM resultados').fetchone()[0]
+        if total <= self.tamanho_maximo:
+            return
+
+        linhas = conexao.execute(
+            'SELECT marketplace, termo, tamanho FROM resultados ORDER BY acessado_em ASC'
+        ).fetchall()
+        for marketplace, termo, tamanho in linhas:
+            if total <= self.tamanho_maximo:
+                break
+            conexao.execute(
+                'DELETE FROM resultados WHERE marketplace = ? AND termo = ?', (marketplace, termo)
+            )
+            self._contar(conexao, marketplace, 'remocoes')
+            total -= tamanho
+
+    def estatisticas(self) -> Dict:
+        """
+        Retorna contadores de acertos/falhas por marketplace e ocupação do cache.
+
+        Returns:
+            Dicionário com 'marketplaces' (acertos, falhas, expirados, remoções,
+            taxa_acerto e ttl de cada um), 'entradas' e 'tamanho_bytes'
+        """
+        with self._conectar() as conexao:
+            linhas = conexao.execute(
+                'SELECT marketplace, acertos, falhas, expirados, remocoes FROM estatisticas'
+            ).fetchall()
+            entradas, tamanho = conexao.execute(
+                'SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM resultados'
+            ).fetchone()
+
+        marketplaces = {}
+        for marketplace, acertos, falhas, expirados, remocoes in linhas:
+            consultas = acertos + falhas
+            marketplaces[marketplace] = {
+                'acertos': acertos,
+                'falhas': falhas,
+                'expirados': expirados,
+                'remocoes': remocoes,
+                'taxa_acerto': round(acertos / consultas, 3) if consultas else 0.0,
+                'ttl': self.ttl.get(marketplace),
+            }
+
+        return {
+            'marketplaces': marketplaces,
+            'entradas': entradas,
+            'tamanho_bytes': tamanho,
+            'tamanho_maximo_bytes': self.tamanho_maximo,
+        }
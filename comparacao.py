@@ -0,0 +1,345 @@
+"""
+Pareamento do mesmo produto entre Mercado Livre e Amazon BR.
+
+Os títulos são normalizados (sem acentos, caixa e pontuação; quantidades
+como "500 g" viram um único token "500g") e representados por vetores
+TF-IDF das palavras, com o IDF calculado sobre todos os anúncios. Os
+vetores da Amazon vão para um índice invertido ((termo de busca, token) ->
+anúncios que o contêm); cada anúncio do Mercado Livre só é comparado com os
+anúncios do mesmo termo de busca que compartilham algum token raro com
+ele, então o custo cresce com o número de candidatos e não com o produto
+das duas listas. Tokens presentes em boa parte dos anúncios (ex.:
+"chocolate" numa busca por chocolate) ficam fora do índice sempre que não
+podem decidir se o par alcança o limiar.
+
+Pares com similaridade do cosseno acima do limiar e quantidades compatíveis
+(1 kg x 1000 g; 500 g x 1 kg não) são escolhidos do mais parecido para o
+menos parecido, cada anúncio em no máximo um par. Para cada par é calculada
+a diferença de preço.
+
+Uso:
+    pares = parear_produtos(produtos)
+    salvar_comparacao(pares, 'comparacao.json')
+"""
+
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache_resultados import normalizar_termo
+from produto import Produto
+
+ARQUIVO_COMPARACAO = 'comparacao.json'
+
+MARKETPLACE_A = 'Mercado Livre'
+MARKETPLACE_B = 'Amazon BR'
+
+# Similaridade do cosseno mínima para considerar dois anúncios o mesmo produto
+LIMIAR_SIMILARIDADE = 0.5
+
+PALAVRAS_VAZIAS = frozenset(
+    'a o as os de da do das dos e em no na nos nas com sem para por pra um uma '
+    'ou ao aos que kit original novo nova promocao oferta frete gratis envio'.split()
+)
+
+# Unidades de quantidade e o fator para a unidade base
+UNIDADES = {
+    'mg': ('g', 0.001), 'g': ('g', 1), 'gr': ('g', 1), 'grs': ('g', 1), 'gramas': ('g', 1),
+    'kg': ('g', 1000), 'kilo': ('g', 1000), 'kilos': ('g', 1000),
+    'ml': ('ml', 1), 'l': ('ml', 1000), 'lt': ('ml', 1000), 'litro': ('ml', 1000), 'litros': ('ml', 1000),
+    'un': ('un', 1), 'und': ('un', 1), 'unid': ('un', 1), 'unidades': ('un', 1),
+    'mm': ('mm', 1), 'cm': ('mm', 10), 'm': ('mm', 1000),
+    'gb': ('gb', 1), 'tb': ('gb', 1024), 'w': ('w', 1), 'v': ('v', 1), 'mah': ('mah', 1),
+}
+
+_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9,.]+')
+_QUANTIDADE = re.compile(
+    r'(?<![\w.,])(\d+(?:[.,]\d+)?)\s*(' + '|'.join(sorted(UNIDADES, key=len, reverse=True)) + r')\b'
+)
+_TOKEN_QUANTIDADE = re.compile(r'^(\d+(?:\.\d+)?)([a-z]+)$')
+_PONTUACAO_SOLTA = re.compile(r'(?<!\d)[.,]|[.,](?!\d)')
+
+
+def normalizar_titulo(titulo: str) -> List[str]:
+    """
+    Tokens do título sem acentos, caixa, pontuação e palavras vazias.
+
+    Args:
+        titulo: Título do anúncio
+
+    Returns:
+        Lista de tokens, com quantidades juntas à unidade (ex.: '500g', '1.5l')
+    """
+    texto = unicodedata.normalize('NFKD', titulo.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = _NAO_ALFANUMERICO.sub(' ', texto)
+    texto = _QUANTIDADE.sub(lambda m: f" {m.group(1).replace(',', '.')}{m.group(2)} ", texto)
+    texto = _PONTUACAO_SOLTA.sub(' ', texto)
+    return [
+        token for token in texto.split()
+        if token not in PALAVRAS_VAZIAS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+def quantidades(tokens: List[str]) -> set:
+    """
+    Quantidades do título na unidade base, ex.: {('g', 1000.0)} para '1kg'.
+    """
+    encontradas = set()
+    for token in tokens:
+        m = _TOKEN_QUANTIDADE.match(token)
+        if m and m.group(2) in UNIDADES:
+            unidade, fator = UNIDADES[m.group(2)]
+            encontradas.add((unidade, round(float(m.group(1)) * fator, 3)))
+    return encontradas
+
+
+def quantidades_compativeis(a: set, b: set) -> bool:
+    """
+    Falso só quando os dois títulos informam quantidades da mesma grandeza
+    e nenhuma coincide (500 g x 1 kg).
+    """
+    unidades_comuns = {u for u, _ in a} & {u for u, _ in b}
+    return all(
+        {v for u, v in a if u == unidade} & {v for u, v in b if u == unidade}
+        for unidade in unidades_comuns
+    )
+
+
+class IndiceTitulos:
+    """
+    Vetores TF-IDF dos títulos de um conjunto de anúncios e o índice
+    invertido de uma parte deles, separado por bloco (termo de busca).
+
+    Só os tokens mais raros de cada título indexado entram no índice (o
+    "prefixo"), até que o peso dos tokens que ficaram de fora não alcance o
+    limiar: um par que não compartilha nenhum token do prefixo não pode ter
+    similaridade acima do limiar, então nenhum par é perdido, e os tokens
+    comuns a muitos anúncios quase nunca aparecem no índice.
+
+    Uso:
+        indice = IndiceTitulos(tokens_a + tokens_b, blocos_a + blocos_b, limiar=0.5)
+        indice.indexar(range(len(tokens_a), len(tokens_a) + len(tokens_b)))
+        for j, similaridade in indice.candidatos(0):
+            ...
+    """
+
+    def __init__(self, tokens_por_titulo: List[List[str]], blocos: List[str],
+                 limiar: float = LIMIAR_SIMILARIDADE):
+        """
+        Args:
+            tokens_por_titulo: Tokens de cada título (normalizar_titulo)
+            blocos: Bloco de cada título; só títulos do mesmo bloco são comparados
+            limiar: Similaridade mínima procurada por candidatos()
+        """
+        self.limiar = limiar
+        self.blocos = blocos
+        contagens = [Counter(tokens) for tokens in tokens_por_titulo]
+        total = len(contagens)
+
+        self.df: Counter = Counter()
+        for contagem in contagens:
+            self.df.update(contagem.keys())
+
+        # Vetores normalizados (norma L2 = 1): {termo: peso}
+        self.vetores: List[Dict[str, float]] = []
+        for contagem in contagens:
+            vetor = {
+                termo: (1 + math.log(tf)) * (math.log((1 + total) / (1 + self.df[termo])) + 1)
+                for termo, tf in contagem.items()
+            }
+            norma = math.sqrt(sum(peso * peso for peso in vetor.values())) or 1.0
+            self.vetores.append({termo: peso / norma for termo, peso in vetor.items()})
+
+        self._invertido: Dict[Tuple[str, str], List[Tuple[int, float]]] = defaultdict(list)
+        # Tokens de cada título indexado que ficaram fora do índice e a norma deles
+        self._sufixos: Dict[int, List[Tuple[str, float]]] = {}
+        self._norma_sufixo: Dict[int, float] = {}
+
+    def indexar(self, indices: Iterable[int]):
+        """
+        Coloca o prefixo dos títulos informados no índice invertido.
+        """
+        limiar_quadrado = self.limiar * self.limiar
+        for i in indices:
+            vetor = self.vetores[i]
+            # Do token mais raro para o mais comum (desempate alfabético)
+            ordem = sorted(vetor, key=lambda termo: (self.df[termo], termo))
+            restante = 1.0
+            for posicao, termo in enumerate(ordem):
+                # Peso (ao quadrado) dos tokens ainda não indexados
+                if restante < limiar_quadrado:
+                    break
+                self._invertido[(self.blocos[i], termo)].append((i, vetor[termo]))
+                restante -= vetor[termo] * vetor[termo]
+            else:
+                posicao = len(ordem)
+            self._sufixos[i] = [(termo, vetor[termo]) for termo in ordem[posicao:]]
+            self._norma_sufixo[i] = math.sqrt(max(0.0, restante))
+
+    def candidatos(self, i: int) -> List[Tuple[int, float]]:
+        """
+        Títulos indexados do mesmo bloco com similaridade do cosseno >= limiar
+        com o título i.
+
+        O produto escalar é acumulado pelo índice; o dos tokens fora do
+        índice só é calculado quando ainda pode levar o par ao limiar.
+
+        Returns:
+            Lista de (índice, similaridade)
+        """
+        vetor = self.vetores[i]
+        bloco = self.blocos[i]
+        parciais: Dict[int, float] = defaultdict(float)
+        for termo, peso in vetor.items():
+            for j, peso_j in self._invertido.get((bloco, termo), ()):
+                parciais[j] += peso * peso_j
+
+        encontrados = []
+        for j, parcial in parciais.items():
+            # Cauchy-Schwarz: o resto do produto escalar não passa da norma do sufixo
+            if parcial + self._norma_sufixo[j] < self.limiar:
+                continue
+            similaridade = parcial + sum(peso * vetor.get(termo, 0.0) for termo, peso in self._sufixos[j])
+            if similaridade >= self.limiar:
+                encontrados.append((j, similaridade))
+        return encontrados
+
+
+def _resumo(produto: Produto) -> Dict:
+    return {
+        'termo': produto.termo,
+        'titulo': produto.titulo,
+        'preco': produto.preco,
+        'link': produto.link,
+        'imagem': produto.imagem,
+        'posicao': produto.posicao,
+    }
+
+
+def _par(a: Produto, b: Produto, similaridade: float) -> Dict:
+    diferenca = diferenca_percentual = mais_barato = None
+    # Preço 0 indica que o preço não foi encontrado na página
+    if a.preco and b.preco:
+        diferenca = round(b.preco - a.preco, 2)
+        diferenca_percentual = round(100 * (b.preco - a.preco) / a.preco, 1)
+        if diferenca:
+            mais_barato = MARKETPLACE_A if diferenca > 0 else MARKETPLACE_B
+    return {
+        'similaridade': round(similaridade, 3),
+        'mercado_livre': _resumo(a),
+        'amazon': _resumo(b),
+        'diferenca': diferenca,
+        'diferenca_percentual': diferenca_percentual,
+        'mais_barato': mais_barato,
+    }
+
+
+def parear_produtos(produtos: Iterable[Produto],
+                    limiar: float = LIMIAR_SIMILARIDADE,
+                    mesmo_termo: bool = True) -> List[Dict]:
+    """
+    Encontra o mesmo produto anunciado nos dois marketplaces.
+
+    Args:
+        produtos: Produtos dos dois marketplaces, em qualquer ordem
+        limiar: Similaridade mínima entre os títulos (0 a 1)
+        mesmo_termo: Só compara anúncios vindos do mesmo termo de busca; com
+            False, um anúncio pode ser pareado com outro de qualquer termo
+            (cada anúncio entra uma vez só, com o primeiro termo em que apareceu)
+
+    Returns:
+        Pares, do mais parecido para o menos parecido, cada um com
+        similaridade, o resumo de cada anúncio ('mercado_livre' e 'amazon'),
+        diferenca (Amazon - Mercado Livre, em reais), diferenca_percentual e
+        mais_barato (None se empatados ou sem preço)
+    """
+    lados: Dict[str, List[Produto]] = {MARKETPLACE_A: [], MARKETPLACE_B: []}
+    vistos = set()
+    for produto in produtos:
+        bloco = normalizar_termo(produto.termo) if mesmo_termo else ''
+        chave = (produto.marketplace, bloco, produto.link or produto.titulo)
+        if produto.marketplace in lados and chave not in vistos:
+            vistos.add(chave)
+            lados[produto.marketplace].append(produto)
+
+    lado_a, lado_b = lados[MARKETPLACE_A], lados[MARKETPLACE_B]
+    if not lado_a or not lado_b:
+        return []
+
+    todos = lado_a + lado_b
+    tokens = [normalizar_titulo(p.titulo) for p in todos]
+    blocos = [normalizar_termo(p.termo) if mesmo_termo else '' for p in todos]
+    indice = IndiceTitulos(tokens, blocos, limiar)
+    deslocamento = len(lado_a)
+    indice.indexar(range(deslocamento, len(tokens)))
+
+    candidatos = []
+    for i in range(deslocamento):
+        for j, similaridade in indice.candidatos(i):
+            candidatos.append((similaridade, i, j))
+
+    # Atribuição gulosa: os pares mais parecidos primeiro, um par por anúncio
+    candidatos.sort(key=lambda c: (-c[0], c[1], c[2]))
+    usados_a, usados_b = set(), set()
+    pares = []
+    cache_quantidades: Dict[int, set] = {}
+    for similaridade, i, j in candidatos:
+        if i in usados_a or j in usados_b:
+            continue
+        qa = cache_quantidades.setdefault(i, quantidades(tokens[i]))
+        qb = cache_quantidades.setdefault(j, quantidades(tokens[j]))
+        if not quantidades_compativeis(qa, qb):
+            continue
+        usados_a.add(i)
+        usados_b.add(j)
+        pares.append(_par(lado_a[i], lado_b[j - deslocamento], similaridade))
+    return pares
+
+
+def salvar_comparacao(pares: List[Dict], arquivo: str = ARQUIVO_COMPARACAO):
+    """
+    Grava os pares em JSON (temporário renomeado no final, como o resultado.json).
+    """
+    temporario = arquivo + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(pares, f, ensure_ascii=False)
+    os.replace(temporario, arquivo)
+
+
+def consultar_pares(pares: List[Dict], termo: Optional[str] = None,
+                    ordenar: str = '-similaridade', limite: Optional[int] = None) -> List[Dict]:
+    """
+    Filtra e ordena os pares gravados, para a rota /comparacao.
+
+    Args:
+        pares: Pares lidos do comparacao.json
+        termo: Só pares em que algum dos anúncios veio deste termo
+        ordenar: similaridade, diferenca ou diferenca_percentual; "-" na
+            frente inverte (pares sem preço vão sempre para o fim)
+        limite: Quantidade máxima de pares
+
+    Raises:
+        ValueError: Se a ordenação não for conhecida
+    """
+    campo = ordenar.lstrip('-')
+    if campo not in ('similaridade', 'diferenca', 'diferenca_percentual'):
+        raise ValueError(f'Ordenação desconhecida: {ordenar}')
+
+    if termo:
+        chave = normalizar_termo(termo)
+        pares = [
+            par for par in pares
+            if chave in (normalizar_termo(par['mercado_livre']['termo']),
+                         normalizar_termo(par['amazon']['termo']))
+        ]
+
+    com_valor = [par for par in pares if par[campo] is not None]
+    sem_valor = [par for par in pares if par[campo] is None]
+    com_valor.sort(key=lambda par: par[campo], reverse=ordenar.startswith('-'))
+    resultado = com_valor + sem_valor
+    return resultado[:limite] if limite is not None else resultado
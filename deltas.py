@@ -0,0 +1,351 @@
+"""
+Diferenças entre execuções sucessivas do mesmo resultado.json.
+
+Cada vez que o resultado.json é regravado (main.py, monitoramento, modo
+serviço ou um job), a execução recebe um número e uma linha compacta no
+arquivo <resultado>.execucoes.jsonl: só os anúncios que entraram, saíram ou
+mudaram de preço ou de posição desde a execução anterior, com os valores
+anteriores. Os anúncios são identificados por termo, marketplace e id do
+produto (o mesmo id do histórico de preços). O estado completo da última
+execução (preço e posição por anúncio) fica em <resultado>.execucao.json,
+para calcular a linha da execução seguinte sem reler o resultado.json.
+
+A rota /dados?since=<execução> junta as linhas posteriores à execução que o
+cliente já tem e devolve só o que mudou desde ela:
+
+    {"execucao": 12, "desde": 9,
+     "novos": [{...produto...}], "removidos": ["brigadeiro|Amazon BR|B0..."],
+     "precos": [{"chave": ..., "anterior": 19.9, "preco": 17.5}],
+     "posicoes": [{"chave": ..., "anterior": 3, "posicao": 1}], ...}
+
+Só as últimas MAXIMO_EXECUCOES execuções são mantidas; um cliente mais
+atrasado que isso precisa recarregar a lista completa. Se o estado se perder
+(arquivo apagado ou gravação interrompida), a numeração continua da última
+linha registrada, mas as execuções anteriores saem do registro: sem o estado
+não dá para calcular as diferenças para elas.
+
+Uso:
+    registro = RegistroExecucoes('resultado.json')
+    salvar_json(registro.acompanhar(produtos), 'resultado.json')
+    execucao = registro.registrar()
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cache_resultados import normalizar_termo
+from historico_precos import extrair_id_produto
+from produto import Produto
+
+logger = logging.getLogger(__name__)
+
+# Execuções mantidas no arquivo (o dobro disso dispara a compactação)
+MAXIMO_EXECUCOES = 100
+
+# Registros de resultados diferentes (um por job) mantidos em memória
+MAXIMO_REGISTROS = 16
+
+# Valores de um anúncio guardados por execução: [preço, posição]
+Valores = List
+
+
+def chave_produto(termo: str, marketplace: str, link: Optional[str], titulo: Optional[str]) -> str:
+    """
+    Identificador de um anúncio entre execuções: "<termo>|<marketplace>|<id>".
+
+    O termo entra normalizado, como no cache; o id é o do histórico de
+    preços (MLB..., ASIN ou o hash do título quando o link não traz id).
+    """
+    return f'{normalizar_termo(termo)}|{marketplace}|{extrair_id_produto(marketplace, link, titulo)}'
+
+
+def chave_saida(produto: Dict) -> str:
+    """
+    chave_produto() de um produto no formato do resultado.json.
+    """
+    return chave_produto(produto['Termo Pesquisado'], produto['Marketplace'],
+                         produto.get('Link do Produto'), produto.get('Título do Produto'))
+
+
+def caminhos_registro(arquivo_json: str) -> Tuple[str, str]:
+    """
+    Arquivos do registro de um resultado: (execuções .jsonl, estado .json).
+    """
+    base = os.path.splitext(arquivo_json)[0]
+    return base + '.execucoes.jsonl', base + '.execucao.json'
+
+
+class RegistroExecucoes:
+    """
+    Grava a linha de diferenças de cada execução de um resultado.json.
+
+    Uso:
+        registro = RegistroExecucoes('resultado.json')
+        salvar_json(registro.acompanhar(produtos), 'resultado.json')
+        execucao = registro.registrar()
+    """
+
+    def __init__(self, arquivo_json: str):
+        """
+        Args:
+            arquivo_json: resultado.json cujas execuções são registradas
+        """
+        self.arquivo_execucoes, self.arquivo_estado = caminhos_registro(arquivo_json)
+        self._atual: Dict[str, Valores] = {}
+
+    def acompanhar(self, produtos: Iterable[Produto]) -> Iterator[Produto]:
+        """
+        Repassa os produtos guardando preço e posição de cada anúncio, para
+        registrar a execução enquanto o resultado.json é gravado.
+        """
+        for produto in produtos:
+            # Anúncio repetido no mesmo termo e marketplace: vale o mais bem posicionado
+            self._atual.setdefault(chave_produto(produto.termo, produto.marketplace, produto.link,
+                                                 produto.titulo),
+                                   [produto.preco, produto.posicao])
+            yield produto
+
+    def _ler_estado(self) -> Tuple[int, Dict[str, Valores]]:
+        try:
+            with open(self.arquivo_estado, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+        except FileNotFoundError:
+            return 0, {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Estado da última execução ilegível ({self.arquivo_estado}): {e}")
+            return 0, {}
+        return estado['execucao'], estado['produtos']
+
+    def _ultima_registrada(self) -> int:
+        """
+        Número da última execução no arquivo de execuções (0 se não houver).
+        """
+        ultima = 0
+        try:
+            with open(self.arquivo_execucoes, 'r', encoding='utf-8') as f:
+                for linha in f:
+                    try:
+                        ultima = json.loads(linha)['execucao']
+                    except (ValueError, KeyError, TypeError):
+                        # Linha interrompida no meio da gravação
+                        continue
+        except FileNotFoundError:
+            pass
+        return ultima
+
+    def registrar(self, atual: Optional[Dict[str, Valores]] = None) -> int:
+        """
+        Registra a execução com os produtos repassados por acompanhar().
+
+        Uma execução sem nenhuma diferença para a anterior não ganha número
+        novo: o cliente já está em dia.
+
+        Args:
+            atual: Preço e posição por chave_produto() (padrão: o que passou
+                por acompanhar())
+
+        Returns:
+            Número da execução que corresponde ao resultado.json gravado
+        """
+        atual = self._atual if atual is None else atual
+        execucao, anterior = self._ler_estado()
+
+        reinicio = False
+        if not execucao:
+            ultima = self._ultima_registrada()
+            if ultima:
+                # Estado perdido: continuar a numeração, para que nenhum cliente
+                # receba um delta calculado a partir de outra execução
+                logger.warning(f"Estado da última execução ausente ({self.arquivo_estado}); "
+                               f"numeração retomada depois da execução {ultima}")
+                execucao, reinicio = ultima, True
+
+        alteracoes: Dict[str, Optional[Valores]] = {}
+        for chave, valores in anterior.items():
+            if atual.get(chave) != valores:
+                alteracoes[chave] = valores
+        for chave in atual.keys() - anterior.keys():
+            alteracoes[chave] = None
+
+        if execucao and not alteracoes and not reinicio:
+            return execucao
+
+        execucao += 1
+        linha = {'execucao': execucao, 'criada_em': time.time(), 'anteriores': alteracoes}
+        if reinicio:
+            # As linhas anteriores dependem do estado perdido: o registro
+            # recomeça nesta execução e quem estiver antes dela recarrega tudo
+            linha['reinicio'] = True
+            temporario = self.arquivo_execucoes + '.tmp'
+            with open(temporario, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(linha, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporario, self.arquivo_execucoes)
+        else:
+            with open(self.arquivo_execucoes, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(linha, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+        temporario = self.arquivo_estado + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({'execucao': execucao, 'produtos': atual}, f, ensure_ascii=False)
+        os.replace(temporario, self.arquivo_estado)
+
+        self._compactar_se_preciso()
+        logger.info(f"Execução {execucao} registrada com {len(alteracoes)} anúncio(s) alterado(s)")
+        return execucao
+
+    def _compactar_se_preciso(self):
+        """
+        Reescreve o arquivo só com as últimas MAXIMO_EXECUCOES linhas quando
+        ele passa do dobro disso.
+        """
+        with open(self.arquivo_execucoes, 'rb') as f:
+            linhas = f.readlines()
+        if len(linhas) <= 2 * MAXIMO_EXECUCOES:
+            return
+        temporario = self.arquivo_execucoes + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.writelines(linhas[-MAXIMO_EXECUCOES:])
+        os.replace(temporario, self.arquivo_execucoes)
+
+
+class ExecucoesCarregadas:
+    """
+    Linhas do <resultado>.execucoes.jsonl em memória, para a rota /dados.
+    """
+
+    def __init__(self, arquivo_execucoes: str):
+        estado = os.stat(arquivo_execucoes)
+        self.versao = (estado.st_mtime_ns, estado.st_size)
+        self.linhas: List[Tuple[int, Dict[str, Optional[Valores]]]] = []
+        # Primeira linha gravada sem o estado anterior: não serve de base para ninguém
+        self.reiniciada = False
+        with open(arquivo_execucoes, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    dados = json.loads(linha)
+                except ValueError:
+                    # Linha sendo gravada neste momento
+                    continue
+                if dados.get('reinicio'):
+                    self.linhas = []
+                    self.reiniciada = True
+                self.linhas.append((dados['execucao'], dados['anteriores']))
+
+    @property
+    def ultima(self) -> int:
+        return self.linhas[-1][0] if self.linhas else 0
+
+    @property
+    def primeira(self) -> int:
+        return self.linhas[0][0] if self.linhas else 0
+
+    def delta(self, desde: int, produtos: List[Dict], posicoes: Dict[str, int]) -> Optional[Dict]:
+        """
+        Diferenças entre a execução `desde` e o resultado.json atual.
+
+        Os valores atuais vêm do arquivo (e não das linhas), então o delta
+        nunca adianta nada que o cliente ainda não poderia ver em /dados.
+
+        Args:
+            desde: Última execução que o cliente tem
+            produtos: Produtos do resultado.json
+            posicoes: chave_saida() -> índice em `produtos`
+
+        Returns:
+            Dicionário com 'execucao', 'desde', 'novos' (produtos completos),
+            'removidos' (chaves), 'precos' e 'posicoes' (chave, anterior e
+            atual); None se `desde` já saiu do registro ou é anterior a um
+            reinício do registro
+
+        Raises:
+            ValueError: Se `desde` for negativa ou posterior à última execução
+        """
+        if not 0 <= desde <= self.ultima:
+            raise ValueError(f'"since" deve estar entre 0 e {self.ultima}')
+        if desde < self.primeira - (0 if self.reiniciada else 1):
+            return None
+
+        # Valor de cada anúncio na execução `desde`: o anterior da primeira
+        # linha posterior que o alterou
+        anteriores: Dict[str, Optional[Valores]] = {}
+        for execucao, alteracoes in self.linhas:
+            if execucao > desde:
+                for chave, valores in alteracoes.items():
+                    anteriores.setdefault(chave, valores)
+
+        novos: List[int] = []
+        removidos: List[str] = []
+        precos: List[Dict] = []
+        posicoes_alteradas: List[Dict] = []
+        for chave, anterior in anteriores.items():
+            indice = posicoes.get(chave)
+            if indice is None:
+                if anterior is not None:
+                    removidos.append(chave)
+                continue
+            if anterior is None:
+                novos.append(indice)
+                continue
+            produto = produtos[indice]
+            preco_anterior, posicao_anterior = anterior
+            if produto.get('Preço') != preco_anterior:
+                precos.append({'chave': chave, 'anterior': preco_anterior, 'preco': produto.get('Preço')})
+            if produto.get('Posição no Ranking') != posicao_anterior:
+                posicoes_alteradas.append({'chave': chave, 'anterior': posicao_anterior,
+                                           'posicao': produto.get('Posição no Ranking')})
+
+        return {
+            'execucao': self.ultima,
+            'desde': desde,
+            # Na ordem do arquivo (termo, marketplace, ranking)
+            'novos': [produtos[indice] for indice in sorted(novos)],
+            'removidos': removidos,
+            'precos': precos,
+            'posicoes': posicoes_alteradas,
+        }
+
+
+_carregadas: 'OrderedDict[str, ExecucoesCarregadas]' = OrderedDict()
+_lock_carregadas = threading.Lock()
+
+
+def obter_execucoes(arquivo_json: str) -> Optional[ExecucoesCarregadas]:
+    """
+    Execuções registradas de um resultado.json, relidas só quando o arquivo muda.
+
+    Args:
+        arquivo_json: resultado.json
+
+    Returns:
+        Execuções em memória, ou None se nenhuma foi registrada
+    """
+    arquivo_execucoes = os.path.abspath(caminhos_registro(arquivo_json)[0])
+    try:
+        estado = os.stat(arquivo_execucoes)
+    except FileNotFoundError:
+        return None
+    versao = (estado.st_mtime_ns, estado.st_size)
+
+    with _lock_carregadas:
+        carregadas = _carregadas.get(arquivo_execucoes)
+        if carregadas is not None and carregadas.versao == versao:
+            _carregadas.move_to_end(arquivo_execucoes)
+            return carregadas
+
+    carregadas = ExecucoesCarregadas(arquivo_execucoes)
+
+    with _lock_carregadas:
+        _carregadas[arquivo_execucoes] = carregadas
+        _carregadas.move_to_end(arquivo_execucoes)
+        while len(_carregadas) > MAXIMO_REGISTROS:
+            _carregadas.popitem(last=False)
+    return carregadas
@@ -0,0 +1,340 @@
+"""
+Execução particionada de listas grandes de termos em vários processos.
+
+Um único processo Python dirigindo o Playwright fica preso a um núcleo
+(serialização JSON, IPC com o navegador). Aqui os termos são divididos entre
+N processos, cada um com seu próprio navegador e seu próprio arquivo de
+resultados (resultado.fragmento-<n>.jsonl). A divisão usa a latência
+observada de cada termo em execuções anteriores (latencias_termos.json):
+os termos mais demorados são distribuídos primeiro, sempre para o processo
+com menos trabalho acumulado.
+
+Quando todos terminam, uma única etapa de junção copia os lotes dos
+fragmentos para o resultado.jsonl na ordem de inputs.txt (termo, depois
+marketplace). Como a ordem final não depende de qual processo buscou cada
+termo, o resultado é o mesmo com qualquer quantidade de processos.
+"""
+
+import glob
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import metricas
+
+from armazem_resultados import ArmazemResultados
+from cache_resultados import normalizar_termo
+from historico_precos import HistoricoPrecos
+from produto import Produto
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_LATENCIAS = 'latencias_termos.json'
+
+# Estimativa para termos nunca buscados quando ainda não há nenhuma medição
+LATENCIA_PADRAO = 10.0
+
+# Peso da medição nova na média móvel da latência de cada termo
+PESO_MEDICAO = 0.5
+
+
+class LatenciasTermos:
+    """
+    Latência média (segundos) de cada termo, persistida entre execuções.
+
+    Uso:
+        latencias = LatenciasTermos()
+        latencias.estimar('brigadeiro')
+        latencias.atualizar({'brigadeiro': 12.3})
+        latencias.salvar()
+    """
+
+    def __init__(self, caminho: str = ARQUIVO_LATENCIAS):
+        """
+        Args:
+            caminho: Arquivo JSON com {termo normalizado: segundos}
+        """
+        self.caminho = caminho
+        self.segundos: Dict[str, float] = {}
+        if os.path.exists(caminho):
+            try:
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    self.segundos = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Latências em {caminho} ignoradas: {e}")
+
+    def estimar(self, termo: str) -> float:
+        """
+        Latência esperada do termo; termos novos recebem a mediana dos conhecidos.
+        """
+        conhecida = self.segundos.get(normalizar_termo(termo))
+        if conhecida is not None:
+            return conhecida
+        if self.segundos:
+            return statistics.median(self.segundos.values())
+        return LATENCIA_PADRAO
+
+    def atualizar(self, medicoes: Dict[str, float]):
+        """
+        Incorpora as medições de uma execução (média móvel exponencial).
+
+        Args:
+            medicoes: {termo: segundos gastos}
+        """
+        for termo, segundos in medicoes.items():
+            chave = normalizar_termo(termo)
+            anterior = self.segundos.get(chave)
+            if anterior is None:
+                self.segundos[chave] = segundos
+            else:
+                self.segundos[chave] = PESO_MEDICAO * segundos + (1 - PESO_MEDICAO) * anterior
+
+    def salvar(self):
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.segundos, f, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(temporario, self.caminho)
+
+
+def dividir_termos(termos: List[str], processos: int,
+                   latencias: Optional[LatenciasTermos] = None) -> List[List[str]]:
+    """
+    Divide os termos entre os processos equilibrando a latência estimada.
+
+    Termos repetidos (mesma forma normalizada) vão uma única vez para um só
+    processo. A divisão é determinística: empates de latência e de carga são
+    resolvidos pela ordem dos termos e pelo número do processo.
+
+    Args:
+        termos: Termos na ordem de inputs.txt
+        processos: Quantidade de processos
+        latencias: Latências observadas; sem elas, todos os termos pesam igual
+
+    Returns:
+        Lista com os termos de cada processo (na ordem original), sem listas vazias
+    """
+    unicos = list({normalizar_termo(t): t for t in reversed(termos)}.values())[::-1]
+    estimativas = [(latencias.estimar(t) if latencias else 1.0, i) for i, t in enumerate(unicos)]
+    # Mais demorados primeiro, sempre para o processo menos carregado
+    estimativas.sort(key=lambda e: (-e[0], e[1]))
+
+    cargas = [(0.0, n) for n in range(max(1, processos))]
+    heapq.heapify(cargas)
+    atribuidos: List[List[int]] = [[] for _ in range(len(cargas))]
+    for segundos, indice in estimativas:
+        carga, n = heapq.heappop(cargas)
+        atribuidos[n].append(indice)
+        heapq.heappush(cargas, (carga + segundos, n))
+
+    return [[unicos[i] for i in sorted(indices)] for indices in atribuidos if indices]
+
+
+def caminho_fragmento(armazem: ArmazemResultados, numero: int) -> str:
+    """
+    Arquivo do fragmento n ao lado do armazém principal
+    (ex.: resultado.fragmento-0.jsonl).
+    """
+    raiz, extensao = os.path.splitext(armazem.caminho)
+    return f'{raiz}.fragmento-{numero}{extensao}'
+
+
+def fragmentos_existentes(armazem: ArmazemResultados) -> List[str]:
+    raiz, extensao = os.path.splitext(armazem.caminho)
+    return sorted(glob.glob(f'{glob.escape(raiz)}.fragmento-*{extensao}'))
+
+
+def descartar_fragmentos(armazem: ArmazemResultados):
+    """
+    Apaga fragmentos de uma execução anterior (início de uma execução nova).
+    """
+    for caminho in fragmentos_existentes(armazem):
+        os.remove(caminho)
+
+
+def _executar_fragmento(numero: int, termos: List[str], caminho_armazem: str,
+                        opcoes: Dict) -> Tuple[Dict[str, float], Dict, Optional[List[Dict]]]:
+    """
+    Ponto de entrada de cada processo: busca os termos do fragmento com o
+    caminho sequencial e grava em um armazém próprio.
+
+    Returns:
+        Tupla ({termo: segundos gastos}, medições do processo, trechos do
+        rastreio ou None). A latência de cada termo é medida entre o fim do
+        último lote do termo anterior e o fim do último lote do termo (inclui
+        o intervalo entre requisições, que também é custo real do termo)
+    """
+    import main
+    import metricas
+    from cache_resultados import CacheResultados
+
+    if opcoes['rastreio']:
+        metricas.iniciar_rastreio()
+
+    logger.info(f"Processo {numero}: {len(termos)} termos")
+    medicoes: Dict[str, float] = {}
+    lotes_por_termo: Dict[str, int] = {}
+    marcador = [time.perf_counter()]
+
+    def ao_concluir_lote(termo: str, marketplace: str, produtos: Optional[List[Produto]]):
+        lotes_por_termo[termo] = lotes_por_termo.get(termo, 0) + 1
+        if lotes_por_termo[termo] == len(main.BUSCADORES):
+            agora = time.perf_counter()
+            medicoes[termo] = agora - marcador[0]
+            marcador[0] = agora
+
+    main.processar_termos(
+        termos,
+        usar_http=opcoes['usar_http'],
+        cache=CacheResultados() if opcoes['usar_cache'] else None,
+        forcar_atualizacao=opcoes['forcar_atualizacao'],
+        ao_concluir_lote=ao_concluir_lote,
+        armazem=ArmazemResultados(caminho_armazem),
+        limite=opcoes['limite']
+    )
+    rastreio = metricas.rastreio_ativo()
+    return medicoes, metricas.registro.estado(), rastreio.eventos if rastreio is not None else None
+
+
+def juntar_fragmentos(armazem: ArmazemResultados, caminhos: List[str], termos: List[str],
+                      historico: Optional[HistoricoPrecos] = None,
+                      execucao_historico: Optional[int] = None) -> int:
+    """
+    Copia os lotes dos fragmentos para o armazém principal e apaga os fragmentos.
+
+    A cópia segue a ordem de `termos` e de main.BUSCADORES, então o
+    resultado.jsonl final não depende de como os termos foram divididos.
+    Lotes de termos fora da lista (sobras de outra execução) são descartados.
+
+    Args:
+        armazem: Armazém principal da execução
+        caminhos: Arquivos dos fragmentos
+        termos: Termos na ordem de inputs.txt
+        historico: Se informado, os lotes copiados viram observações, com o
+            instante em que cada lote foi gravado no fragmento
+        execucao_historico: Execução do histórico à qual as observações pertencem
+
+    Returns:
+        Quantidade de lotes copiados
+    """
+    import main
+
+    fragmentos = [ArmazemResultados(c) for c in caminhos if os.path.exists(c)]
+    copiados = 0
+    for termo in termos:
+        for marketplace, _ in main.BUSCADORES:
+            if armazem.obter(marketplace, termo) is not None:
+                continue
+            for fragmento in fragmentos:
+                lote = fragmento.obter_lote(marketplace, termo)
+                if lote is not None:
+                    # Sobras de uma execução interrompida mantêm o instante da coleta
+                    produtos, gravado_em = lote
+                    armazem.gravar_lote(termo, marketplace, produtos, gravado_em=gravado_em)
+                    if historico is not None:
+                        historico.registrar(execucao_historico, produtos, observado_em=gravado_em)
+                    copiados += 1
+                    break
+
+    for fragmento in fragmentos:
+        os.remove(fragmento.caminho)
+    return copiados
+
+
+def processar_termos_particionado(termos: List[str], armazem: ArmazemResultados,
+                                  processos: int,
+                                  usar_http: bool = True,
+                                  usar_cache: bool = True,
+                                  forcar_atualizacao: bool = False,
+                                  historico: Optional[HistoricoPrecos] = None,
+                                  limite: int = 30,
+                                  latencias: Optional[LatenciasTermos] = None) -> int:
+    """
+    Busca os termos em vários processos e junta tudo em `armazem`.
+
+    Pares já presentes no armazém (retomada) não são buscados de novo, e
+    fragmentos deixados por uma execução interrompida são juntados antes de
+    dividir o trabalho.
+
+    Args:
+        termos: Termos na ordem de inputs.txt
+        armazem: Armazém principal (resultado.jsonl)
+        processos: Quantidade de processos de busca
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        usar_cache: Se cada processo lê e grava o cache de resultados
+        forcar_atualizacao: Ignora o cache na leitura (o resultado novo é gravado)
+        historico: Histórico de preços; alimentado pelo processo principal na junção
+        limite: Produtos por termo e marketplace
+        latencias: Latências observadas; se omitido, usa latencias_termos.json
+
+    Returns:
+        Quantidade de lotes buscados nesta execução
+    """
+    import main
+
+    if latencias is None:
+        latencias = LatenciasTermos()
+    execucao_historico = historico.iniciar_execucao() if historico is not None else None
+
+    # Sobras de uma execução interrompida
+    sobras = fragmentos_existentes(armazem)
+    if sobras:
+        recuperados = juntar_fragmentos(armazem, sobras, termos, historico, execucao_historico)
+        logger.info(f"{recuperados} buscas recuperadas de {len(sobras)} fragmento(s) anterior(es)")
+
+    pendentes = [
+        termo for termo in termos
+        if any(armazem.obter(marketplace, termo) is None for marketplace, _ in main.BUSCADORES)
+    ]
+    fragmentos = dividir_termos(pendentes, processos, latencias)
+    if not fragmentos:
+        logger.info("Nenhum termo pendente")
+        return 0
+
+    for n, fragmento in enumerate(fragmentos):
+        estimado = sum(latencias.estimar(t) for t in fragmento)
+        logger.info(f"Processo {n}: {len(fragmento)} termos (~{estimado:.0f}s estimados)")
+
+    opcoes = {
+        'usar_http': usar_http,
+        'usar_cache': usar_cache,
+        'forcar_atualizacao': forcar_atualizacao,
+        'limite': limite,
+        'rastreio': metricas.rastreio_ativo() is not None,
+    }
+    # "spawn": o Playwright não sobrevive a um fork com threads já iniciadas
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(fragmentos), mp_context=contexto) as executor:
+        futuros = {
+            executor.submit(_executar_fragmento, n, fragmento,
+                            caminho_fragmento(armazem, n), opcoes): n
+            for n, fragmento in enumerate(fragmentos)
+        }
+        for futuro in as_completed(futuros):
+            try:
+                medicoes, estado_metricas, eventos = futuro.result()
+            except Exception as e:
+                # O que o processo gravou antes de falhar ainda é aproveitado na junção
+                logger.error(f"Processo {futuros[futuro]} falhou: {e}")
+                continue
+            latencias.atualizar(medicoes)
+            # Tempos das etapas e rastreio de cada processo entram nos do principal
+            metricas.registro.incorporar(estado_metricas)
+            rastreio = metricas.rastreio_ativo()
+            if rastreio is not None and eventos:
+                rastreio.incorporar(eventos)
+
+    # Junção única, na ordem de inputs.txt
+    buscados = juntar_fragmentos(
+        armazem, [caminho_fragmento(armazem, n) for n in range(len(fragmentos))],
+        termos, historico, execucao_historico
+    )
+
+    latencias.salvar()
+    logger.info(f"{buscados} buscas concluídas em {len(fragmentos)} processos")
+    return buscados
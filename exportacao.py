@@ -0,0 +1,281 @@
+"""
+Exportação dos resultados em Excel, CSV ou Parquet, linha a linha.
+
+O Excel era gerado com DataFrame.to_excel, que monta a planilha inteira em
+memória (uma célula do openpyxl por valor) antes de gravar: dezenas de
+segundos e centenas de MB para um histórico de 50 mil linhas. Aqui as
+linhas são escritas conforme são lidas:
+
+    xlsx     -> openpyxl em modo write-only (cada linha vai direto para o
+                XML da planilha, em um arquivo temporário)
+    csv      -> texto gerado em blocos, sem arquivo intermediário
+    parquet  -> pyarrow, em grupos de TAMANHO_BLOCO linhas
+
+As linhas vêm do resultado de uma execução (lotes do resultado.jsonl) ou do
+histórico de preços, filtradas por termo, marketplace e período.
+
+Uso:
+    linhas = linhas_produtos(armazem.produtos(), termos=['brigadeiro'])
+    for bloco in exportar(linhas, COLUNAS_SAIDA, FORMATO_CSV):
+        ...
+"""
+
+import csv
+import importlib.util
+import io
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cache_resultados import normalizar_termo
+from historico_precos import HistoricoPrecos
+from produto import COLUNAS_SAIDA, Produto
+
+logger = logging.getLogger(__name__)
+
+FORMATO_XLSX = 'xlsx'
+FORMATO_CSV = 'csv'
+FORMATO_PARQUET = 'parquet'
+
+# Formato -> mimetype da resposta
+FORMATOS = {
+    FORMATO_XLSX: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    FORMATO_CSV: 'text/csv; charset=utf-8',
+    FORMATO_PARQUET: 'application/vnd.apache.parquet',
+}
+
+# Colunas da exportação do histórico (uma linha por observação)
+COLUNAS_HISTORICO = {
+    "observado_em": "Coletado em",
+    "termo": "Termo Pesquisado",
+    "marketplace": "Marketplace",
+    "posicao": "Posição no Ranking",
+    "titulo": "Título do Produto",
+    "preco": "Preço",
+    "link": "Link do Produto",
+    "produto_id": "Id do Produto",
+}
+
+# Tipo de cada coluna no Parquet (o nome do tipo no pyarrow)
+TIPOS_PARQUET = {
+    "observado_em": "timestamp",
+    "termo": "string",
+    "marketplace": "string",
+    "posicao": "int64",
+    "titulo": "string",
+    "preco": "float64",
+    "link": "string",
+    "imagem": "string",
+    "produto_id": "string",
+}
+
+# Linhas por bloco do CSV e por grupo do Parquet
+TAMANHO_BLOCO = 10000
+
+# Bytes lidos do arquivo temporário por pedaço da resposta
+TAMANHO_PEDACO = 256 * 1024
+
+Linha = Tuple
+
+
+def validar_formato(formato: str):
+    """
+    Raises:
+        ValueError: Se o formato não existir ou depender de um pacote ausente
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato} (use {', '.join(FORMATOS)})")
+    # Instalação sem o requirements.txt: sem o pyarrow, o formato parquet fica indisponível
+    if formato == FORMATO_PARQUET and importlib.util.find_spec('pyarrow') is None:
+        raise ValueError('O formato parquet precisa do pacote pyarrow (pip install pyarrow)')
+
+
+def linhas_produtos(produtos: Iterable[Produto], termos: Optional[List[str]] = None,
+                    marketplaces: Optional[List[str]] = None) -> Iterator[Linha]:
+    """
+    Linhas de COLUNAS_SAIDA a partir dos produtos de uma execução.
+
+    Args:
+        produtos: Produtos em qualquer iterável (ex.: armazem.produtos())
+        termos: Só os produtos destes termos (comparados já normalizados)
+        marketplaces: Só os produtos destes marketplaces
+    """
+    chaves_termos = {normalizar_termo(termo) for termo in termos} if termos else None
+    marketplaces = set(marketplaces) if marketplaces else None
+    colunas = list(COLUNAS_SAIDA)
+    for produto in produtos:
+        if marketplaces is not None and produto.marketplace not in marketplaces:
+            continue
+        if chaves_termos is not None and normalizar_termo(produto.termo) not in chaves_termos:
+            continue
+        yield tuple(getattr(produto, coluna) for coluna in colunas)
+
+
+def linhas_historico(historico: HistoricoPrecos, desde: Optional[float] = None,
+                     ate: Optional[float] = None, termos: Optional[List[str]] = None,
+                     marketplaces: Optional[List[str]] = None) -> Iterator[Linha]:
+    """
+    Linhas de COLUNAS_HISTORICO, uma por observação do histórico de preços.
+
+    Args:
+        historico: Histórico de preços
+        desde: Início do período (epoch em segundos)
+        ate: Fim do período (exclusivo)
+        termos: Só as observações destes termos
+        marketplaces: Só as observações destes marketplaces
+    """
+    colunas = list(COLUNAS_HISTORICO)
+    for observacao in historico.observacoes(desde, ate, termos, marketplaces):
+        observacao['observado_em'] = datetime.fromtimestamp(int(observacao['observado_em']))
+        yield tuple(observacao[coluna] for coluna in colunas)
+
+
+def escrever_xlsx(linhas: Iterable[Linha], colunas: Dict[str, str], destino) -> int:
+    """
+    Grava as linhas em uma planilha com o openpyxl em modo write-only.
+
+    Args:
+        linhas: Tuplas na ordem de `colunas`
+        colunas: Chave da coluna -> título no cabeçalho
+        destino: Caminho ou arquivo aberto em modo binário
+
+    Returns:
+        Quantidade de linhas gravadas
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    livro = Workbook(write_only=True)
+    planilha = livro.create_sheet()
+    negrito = Font(bold=True)
+    cabecalho = []
+    for titulo in colunas.values():
+        celula = WriteOnlyCell(planilha, value=titulo)
+        celula.font = negrito
+        cabecalho.append(celula)
+    planilha.append(cabecalho)
+
+    quantidade = 0
+    for linha in linhas:
+        planilha.append(linha)
+        quantidade += 1
+    livro.save(destino)
+    return quantidade
+
+
+def escrever_parquet(linhas: Iterable[Linha], colunas: Dict[str, str], destino) -> int:
+    """
+    Grava as linhas em Parquet, um grupo de TAMANHO_BLOCO linhas por vez.
+
+    Args:
+        linhas: Tuplas na ordem de `colunas`
+        colunas: Chave da coluna -> título (as chaves viram os nomes das
+            colunas, mais fáceis de usar em código que os títulos)
+        destino: Caminho ou arquivo aberto em modo binário
+
+    Returns:
+        Quantidade de linhas gravadas
+
+    Raises:
+        ValueError: Sem o pyarrow instalado
+    """
+    validar_formato(FORMATO_PARQUET)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {
+        'timestamp': pa.timestamp('s'), 'string': pa.string(),
+        'int64': pa.int64(), 'float64': pa.float64(),
+    }
+    esquema = pa.schema([(chave, tipos[TIPOS_PARQUET[chave]]) for chave in colunas])
+
+    quantidade = 0
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        bloco: List[Linha] = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= TAMANHO_BLOCO:
+                escritor.write_table(_tabela_arrow(bloco, esquema))
+                quantidade += len(bloco)
+                bloco = []
+        if bloco or not quantidade:
+            escritor.write_table(_tabela_arrow(bloco, esquema))
+            quantidade += len(bloco)
+    return quantidade
+
+
+def _tabela_arrow(bloco: List[Linha], esquema):
+    import pyarrow as pa
+
+    colunas = list(zip(*bloco)) if bloco else [()] * len(esquema)
+    return pa.Table.from_arrays([pa.array(valores, type=campo.type)
+                                 for valores, campo in zip(colunas, esquema)], schema=esquema)
+
+
+def gerar_csv(linhas: Iterable[Linha], colunas: Dict[str, str]) -> Iterator[bytes]:
+    """
+    CSV em blocos de TAMANHO_BLOCO linhas, com BOM para o Excel reconhecer o UTF-8.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(colunas.values())
+    pendentes = 0
+    for linha in linhas:
+        escritor.writerow(linha)
+        pendentes += 1
+        if pendentes >= TAMANHO_BLOCO:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _ler_e_apagar(caminho: str) -> Iterator[bytes]:
+    try:
+        with open(caminho, 'rb') as f:
+            while True:
+                pedaco = f.read(TAMANHO_PEDACO)
+                if not pedaco:
+                    break
+                yield pedaco
+    finally:
+        os.remove(caminho)
+
+
+def exportar(linhas: Iterable[Linha], colunas: Dict[str, str], formato: str) -> Iterator[bytes]:
+    """
+    Conteúdo do arquivo exportado, em pedaços para uma resposta em streaming.
+
+    O xlsx e o Parquet precisam do arquivo completo (o zip da planilha e o
+    rodapé do Parquet vêm no final), então são gravados antes em um
+    temporário, já nesta chamada: um erro aparece aqui, e não no meio da
+    resposta. O temporário é apagado quando o último pedaço é lido ou a
+    resposta é interrompida.
+
+    Args:
+        linhas: Tuplas na ordem de `colunas`
+        colunas: COLUNAS_SAIDA ou COLUNAS_HISTORICO
+        formato: FORMATO_XLSX, FORMATO_CSV ou FORMATO_PARQUET
+
+    Raises:
+        ValueError: Se o formato for inválido ou estiver indisponível
+    """
+    validar_formato(formato)
+    if formato == FORMATO_CSV:
+        return gerar_csv(linhas, colunas)
+
+    descritor, caminho = tempfile.mkstemp(suffix='.' + formato)
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            escrever = escrever_xlsx if formato == FORMATO_XLSX else escrever_parquet
+            quantidade = escrever(linhas, colunas, f)
+    except BaseException:
+        os.remove(caminho)
+        raise
+    logger.info(f"Exportação {formato} gerada com {quantidade} linhas")
+    return _ler_e_apagar(caminho)
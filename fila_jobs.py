@@ -0,0 +1,408 @@
+"""
+Fila de jobs de busca executada dentro do processo do Flask.
+
+Substitui o `subprocess.run(['python', 'main.py'])` por requisição: as
+funções do main.py são importadas uma única vez e um conjunto fixo de
+threads trabalhadoras (cada uma com seu próprio navegador) atende os jobs.
+Cada job é quebrado em tarefas por termo; se dois jobs pedem o mesmo termo
+enquanto ele ainda está pendente, a mesma tarefa atende os dois.
+Os resultados ficam em uma pasta própria por job, sem sobrescrever os de
+outros usuários.
+
+Cada lote (termo, marketplace) concluído vira um evento do job, consumido
+pela rota de Server-Sent Events para o dashboard exibir resultados parciais,
+e é gravado no armazenamento incremental do job (resultado.jsonl). Ao final
+só o JSON do dashboard é gerado; o Excel é montado no primeiro download.
+
+Jobs terminados são descartados (da memória e do disco) depois de
+RETENCAO_JOBS segundos, ou antes disso se passarem de MAXIMO_JOBS
+terminados; a partir daí /jobs/<id> responde 404.
+"""
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import main
+from armazem_resultados import ArmazemResultados, ARQUIVO_ARMAZEM
+from cache_resultados import CacheResultados, normalizar_termo
+from historico_precos import HistoricoPrecos
+from produto import Produto
+from limitador import LimitadorAdaptativo, PoliticaRetentativa
+from navegador import PoolNavegador
+
+logger = logging.getLogger(__name__)
+
+PASTA_RESULTADOS = 'resultados'
+
+STATUS_NA_FILA = 'na_fila'
+STATUS_EXECUTANDO = 'executando'
+STATUS_CONCLUIDO = 'concluido'
+STATUS_ERRO = 'erro'
+
+EVENTO_LOTE = 'lote'
+EVENTO_FIM = 'fim'
+
+# Jobs terminados mantidos (os mais antigos saem primeiro) e por quanto tempo
+MAXIMO_JOBS = 200
+RETENCAO_JOBS = 24 * 3600
+
+
+class Tarefa(Future):
+    """
+    Busca de um termo, compartilhável entre jobs.
+
+    Guarda os lotes já concluídos para repassá-los a jobs que se juntam à
+    tarefa depois que ela começou.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lotes: List[Tuple[str, List[Produto]]] = []
+        self.assinantes: List[Tuple['Job', str]] = []
+
+
+class Job:
+    """
+    Um pedido de busca com seus termos, tarefas e arquivos de resultado.
+    """
+
+    def __init__(self, termos: List[str], pasta: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.termos = termos
+        self.pasta = os.path.join(pasta, self.id)
+        self.tarefas: List[Tarefa] = []
+        self.status_final: Optional[str] = None
+        self.erro: Optional[str] = None
+        self.total_produtos = 0
+        self.criado_em = time.time()
+        self.concluido_em: Optional[float] = None
+        self._finalizando = False
+        self._finalizado = threading.Event()
+        self.eventos: List[Dict] = []
+        self.lotes_concluidos = 0
+        self._condicao = threading.Condition()
+        os.makedirs(self.pasta, exist_ok=True)
+        self.armazem = ArmazemResultados(os.path.join(self.pasta, ARQUIVO_ARMAZEM))
+        self._lock_excel = threading.Lock()
+
+    @property
+    def arquivo_json(self) -> str:
+        return os.path.join(self.pasta, 'resultado.json')
+
+    @property
+    def arquivo_comparacao(self) -> str:
+        return os.path.join(self.pasta, 'comparacao.json')
+
+    @property
+    def arquivo_excel(self) -> str:
+        return os.path.join(self.pasta, 'resultado.xlsx')
+
+    def garantir_excel(self) -> str:
+        """
+        Gera o Excel do job sob demanda, se ainda não existir ou estiver
+        mais antigo que os lotes gravados.
+
+        Returns:
+            Caminho do arquivo Excel
+        """
+        with self._lock_excel:
+            if (not os.path.exists(self.arquivo_excel)
+                    or os.path.getmtime(self.arquivo_excel) < self.armazem.modificado_em()):
+                main.exportar_armazem(self.armazem, arquivo_excel=self.arquivo_excel,
+                                      ordem_termos=self.termos)
+        return self.arquivo_excel
+
+    @property
+    def status(self) -> str:
+        if self.status_final:
+            return self.status_final
+        if any(tarefa.running() or tarefa.done() for tarefa in self.tarefas):
+            return STATUS_EXECUTANDO
+        return STATUS_NA_FILA
+
+    def aguardar(self, timeout: Optional[float] = None) -> bool:
+        """
+        Bloqueia até o job terminar.
+
+        Args:
+            timeout: Tempo máximo de espera em segundos
+
+        Returns:
+            True se o job terminou dentro do prazo
+        """
+        return self._finalizado.wait(timeout)
+
+    def publicar(self, tipo: str, dados: Dict):
+        """
+        Acrescenta um evento ao job e acorda quem estiver aguardando.
+
+        Args:
+            tipo: EVENTO_LOTE ou EVENTO_FIM
+            dados: Conteúdo do evento
+        """
+        with self._condicao:
+            if tipo == EVENTO_LOTE:
+                # Contado sob o lock: dois lotes simultâneos nunca repetem o número
+                self.lotes_concluidos += 1
+                dados['lotes_concluidos'] = self.lotes_concluidos
+            self.eventos.append({'tipo': tipo, 'dados': dados})
+            self._condicao.notify_all()
+
+    def publicar_lote(self, termo: str, marketplace: str, produtos: List[Produto]):
+        """
+        Publica os produtos de uma busca concluída no formato do resultado.json.
+
+        O número do lote (lotes_concluidos) é preenchido por publicar().
+
+        Args:
+            termo: Termo como digitado neste job
+            marketplace: Marketplace do lote
+            produtos: Produtos encontrados
+        """
+        self.armazem.gravar_lote(termo, marketplace, produtos)
+        self.publicar(EVENTO_LOTE, {
+            'termo': termo,
+            'marketplace': marketplace,
+            'produtos': main.formatar_para_saida(produto.com_termo(termo) for produto in produtos),
+            'total_lotes': len(self.termos) * len(main.BUSCADORES),
+        })
+
+    def eventos_desde(self, indice: int, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Retorna os eventos a partir de `indice`, aguardando se ainda não houver.
+
+        Args:
+            indice: Quantidade de eventos já consumidos
+            timeout: Tempo máximo de espera em segundos
+
+        Returns:
+            Novos eventos (lista vazia se o prazo acabar)
+        """
+        with self._condicao:
+            self._condicao.wait_for(lambda: len(self.eventos) > indice, timeout)
+            return self.eventos[indice:]
+
+    def para_dict(self) -> Dict:
+        """
+        Representação do job para a API.
+        """
+        concluidas = sum(1 for tarefa in self.tarefas if tarefa.done())
+        return {
+            'id': self.id,
+            'status': self.status,
+            'termos': self.termos,
+            'progresso': {'concluidos': concluidas, 'total': len(self.tarefas)},
+            'total_produtos': self.total_produtos,
+            'erro': self.erro,
+            'criado_em': self.criado_em,
+            'concluido_em': self.concluido_em,
+        }
+
+
+class FilaJobs:
+    """
+    Distribui as tarefas por termo entre threads trabalhadoras.
+
+    Uso:
+        fila = FilaJobs(workers=2)
+        job = fila.enviar(['brigadeiro', 'balão'])
+        fila.obter(job.id).para_dict()
+    """
+
+    def __init__(self, workers: int = 2, pasta_resultados: str = PASTA_RESULTADOS,
+                 cache: Optional[CacheResultados] = None,
+                 historico: Optional[HistoricoPrecos] = None,
+                 maximo_jobs: int = MAXIMO_JOBS, retencao: float = RETENCAO_JOBS):
+        """
+        Args:
+            workers: Quantidade de threads trabalhadoras (um navegador cada)
+            pasta_resultados: Pasta onde cada job grava seus arquivos
+            cache: Cache de resultados compartilhado pelos jobs
+            historico: Histórico de preços alimentado pelas buscas
+            maximo_jobs: Jobs terminados mantidos ao mesmo tempo
+            retencao: Segundos que um job terminado é mantido
+        """
+        self.pasta_resultados = pasta_resultados
+        self.cache = cache
+        self.historico = historico
+        self.maximo_jobs = maximo_jobs
+        self.retencao = retencao
+        # Ritmo e orçamento de retentativas compartilhados por todas as threads
+        self.limitador = LimitadorAdaptativo()
+        self.politica = PoliticaRetentativa()
+        self._fila: queue.Queue = queue.Queue()
+        self._jobs: Dict[str, Job] = {}
+        self._pendentes: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._trabalhar, name=f'worker-busca-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._remover_pastas_antigas()
+
+    def enviar(self, termos: List[str], forcar_atualizacao: bool = False) -> Job:
+        """
+        Cria um job e enfileira as tarefas dos termos que ainda não estão pendentes.
+
+        Args:
+            termos: Termos de busca
+            forcar_atualizacao: Ignora o cache na leitura
+
+        Returns:
+            Job criado
+        """
+        self._descartar_expirados()
+        job = Job(termos, self.pasta_resultados)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            for termo in termos:
+                chave = (normalizar_termo(termo), forcar_atualizacao)
+                tarefa = self._pendentes.get(chave)
+                if tarefa is None:
+                    tarefa = Tarefa()
+                    self._pendentes[chave] = tarefa
+                    self._fila.put((chave, termo, forcar_atualizacao, tarefa))
+                else:
+                    logger.info(f"Termo '{termo}' já pendente em outro job; reaproveitando")
+                    # Repassar os lotes que a tarefa já concluiu
+                    for marketplace, produtos in tarefa.lotes:
+                        job.publicar_lote(termo, marketplace, produtos)
+                tarefa.assinantes.append((job, termo))
+                job.tarefas.append(tarefa)
+
+        for tarefa in job.tarefas:
+            tarefa.add_done_callback(lambda _, job=job: self._verificar_job(job))
+
+        logger.info(f"Job {job.id} enviado com {len(termos)} termos")
+        return job
+
+    def obter(self, job_id: str) -> Optional[Job]:
+        """
+        Retorna o job pelo id, ou None se não existir.
+        """
+        return self._jobs.get(job_id)
+
+    def _descartar_expirados(self):
+        """
+        Remove da memória e do disco os jobs terminados há mais de `retencao`
+        segundos e os mais antigos além de `maximo_jobs`.
+        """
+        limite = time.time() - self.retencao
+        with self._lock:
+            terminados = sorted((job for job in self._jobs.values() if job.concluido_em is not None),
+                                key=lambda job: job.concluido_em)
+            excedentes = len(terminados) - self.maximo_jobs
+            descartados = [job for indice, job in enumerate(terminados)
+                           if indice < excedentes or job.concluido_em < limite]
+            for job in descartados:
+                del self._jobs[job.id]
+
+        for job in descartados:
+            shutil.rmtree(job.pasta, ignore_errors=True)
+        if descartados:
+            logger.info(f"{len(descartados)} job(s) terminado(s) descartado(s)")
+
+    def _remover_pastas_antigas(self):
+        """
+        Apaga as pastas de jobs de execuções anteriores do servidor mais
+        antigas que `retencao` (esses jobs não estão mais na memória).
+        """
+        if not os.path.isdir(self.pasta_resultados):
+            return
+        limite = time.time() - self.retencao
+        for nome in os.listdir(self.pasta_resultados):
+            pasta = os.path.join(self.pasta_resultados, nome)
+            if os.path.isdir(pasta) and os.path.getmtime(pasta) < limite:
+                shutil.rmtree(pasta, ignore_errors=True)
+
+    def encerrar(self):
+        """
+        Sinaliza o fim para as threads e aguarda o fechamento dos navegadores.
+        """
+        for _ in self._threads:
+            self._fila.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _trabalhar(self):
+        """
+        Laço de cada thread: um navegador reaproveitado para todas as tarefas.
+        """
+        with PoolNavegador() as pool:
+            while True:
+                item = self._fila.get()
+                if item is None:
+                    break
+
+                chave, termo, forcar_atualizacao, tarefa = item
+                if not tarefa.set_running_or_notify_cancel():
+                    continue
+
+                def ao_concluir_lote(_, marketplace, produtos, tarefa=tarefa):
+                    # Busca que desistiu: o job conta o par como concluído, sem produtos
+                    produtos = produtos if produtos is not None else []
+                    with self._lock:
+                        tarefa.lotes.append((marketplace, produtos))
+                        for job, termo_job in tarefa.assinantes:
+                            job.publicar_lote(termo_job, marketplace, produtos)
+
+                try:
+                    produtos = main.processar_termos(
+                        [termo], pool=pool, cache=self.cache,
+                        forcar_atualizacao=forcar_atualizacao,
+                        ao_concluir_lote=ao_concluir_lote,
+                        historico=self.historico,
+                        limitador=self.limitador,
+                        politica=self.politica
+                    )
+                except Exception as e:
+                    logger.error(f"Erro na tarefa do termo '{termo}': {e}")
+                    with self._lock:
+                        self._pendentes.pop(chave, None)
+                    tarefa.set_exception(e)
+                else:
+                    with self._lock:
+                        self._pendentes.pop(chave, None)
+                    tarefa.set_result(produtos)
+
+    def _verificar_job(self, job: Job):
+        """
+        Chamado ao fim de cada tarefa; grava os resultados quando todas terminam.
+        """
+        with self._lock:
+            if job._finalizando or not all(tarefa.done() for tarefa in job.tarefas):
+                return
+            # Só uma thread finaliza o job
+            job._finalizando = True
+
+        try:
+            for tarefa in job.tarefas:
+                # Propaga o erro de qualquer tarefa
+                tarefa.result()
+
+            # Os lotes já estão no armazenamento do job; o Excel fica para o download
+            job.total_produtos = main.exportar_armazem(
+                job.armazem, arquivo_json=job.arquivo_json, ordem_termos=job.termos,
+                arquivo_comparacao=job.arquivo_comparacao
+            )
+            job.status_final = STATUS_CONCLUIDO
+        except Exception as e:
+            logger.error(f"Erro ao finalizar o job {job.id}: {e}")
+            job.erro = str(e)
+            job.status_final = STATUS_ERRO
+        finally:
+            job.concluido_em = time.time()
+            job._finalizado.set()
+            job.publicar(EVENTO_FIM, job.para_dict())
+            logger.info(f"Job {job.id} finalizado com status '{job.status_final}'")
+        self._descartar_expirados()
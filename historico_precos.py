@@ -0,0 +1,430 @@
+"""
+Histórico de preços e posições (SQLite) por produto.
+
+Cada busca real (não vinda do cache) grava uma observação por produto:
+preço, posição no ranking, termo e o instante da coleta. O produto é
+identificado pelo marketplace mais um id normalizado extraído do link
+(id do anúncio do Mercado Livre ou ASIN da Amazon), o que permite
+acompanhar o mesmo anúncio entre execuções mesmo quando o link muda.
+
+As consultas ("mudanças de preço desde T", "quem subiu/desceu no ranking
+do termo X") rodam direto no SQLite usando os índices, sem carregar o
+histórico em memória.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import unquote
+
+from cache_resultados import FONTE_CACHE, normalizar_termo
+from produto import Produto
+
+logger = logging.getLogger(__name__)
+
+CAMINHO_HISTORICO = 'historico_precos.sqlite3'
+
+# Mercado Livre: id do anúncio em links de anúncio patrocinado (wid=),
+# de catálogo (/p/MLB...), de item (MLB-123...) e de produto do vendedor (/up/MLBU...)
+_ML_IDS = [
+    (re.compile(r'[?&#]wid=(MLB\d+)'), None),
+    (re.compile(r'/p/(MLB\d+)'), None),
+    (re.compile(r'\bMLB-?(\d+)'), 'MLB'),
+    (re.compile(r'/up/(MLBU\d+)'), None),
+    (re.compile(r'[?&#]searchVariation=(\d+)'), 'MLBV'),
+]
+
+# Amazon: ASIN em /dp/ ou /gp/product/ (links patrocinados trazem a URL
+# do produto codificada no parâmetro url=)
+_AMAZON_ASIN = re.compile(r'/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})(?:[/?&]|$)')
+
+
+def extrair_id_produto(marketplace: str, link: Optional[str],
+                       titulo: Optional[str] = None) -> Optional[str]:
+    """
+    Extrai um id estável do produto a partir do link.
+
+    Args:
+        marketplace: 'Mercado Livre' ou 'Amazon BR'
+        link: Link do produto como veio da busca
+        titulo: Usado como último recurso quando o link não traz id
+            (ex.: links de clique de anúncio)
+
+    Returns:
+        Id normalizado (ex.: 'MLB3823588389', 'B088RKDLNY'), ou None
+    """
+    if link:
+        if marketplace == 'Amazon BR':
+            encontrado = _AMAZON_ASIN.search(unquote(link))
+            if encontrado:
+                return encontrado.group(1)
+        else:
+            for padrao, prefixo in _ML_IDS:
+                encontrado = padrao.search(link)
+                if encontrado:
+                    return (prefixo or '') + encontrado.group(1)
+
+    if titulo:
+        return 'titulo:' + hashlib.sha1(' '.join(titulo.lower().split()).encode('utf-8')).hexdigest()[:16]
+    return None
+
+
+class HistoricoPrecos:
+    """
+    Série temporal de preço e posição por (marketplace, id do produto).
+
+    Uso:
+        historico = HistoricoPrecos()
+        execucao = historico.iniciar_execucao()
+        historico.registrar(execucao, produtos)
+        historico.mudancas_preco(desde=time.time() - 86400)
+        historico.movimentos_ranking('brigadeiro')
+    """
+
+    def __init__(self, caminho: str = CAMINHO_HISTORICO):
+        """
+        Args:
+            caminho: Arquivo SQLite do histórico
+        """
+        self.caminho = caminho
+        self._criar_tabelas()
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """
+        Abre uma conexão, faz commit ao final do bloco e a fecha.
+        """
+        conexao = sqlite3.connect(self.caminho, timeout=10)
+        conexao.row_factory = sqlite3.Row
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def _criar_tabelas(self):
+        with self._conectar() as conexao:
+            # WAL permite consultas da API enquanto a busca grava
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS execucoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    iniciada_em REAL NOT NULL
+                )
+            ''')
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS observacoes (
+                    execucao_id INTEGER NOT NULL REFERENCES execucoes (id),
+                    marketplace TEXT NOT NULL,
+                    produto_id TEXT NOT NULL,
+                    termo TEXT NOT NULL,
+                    posicao INTEGER,
+                    preco REAL,
+                    titulo TEXT,
+                    link TEXT,
+                    observado_em REAL NOT NULL
+                )
+            ''')
+            # Série de um produto e "último preço antes de T"
+            conexao.execute(
+                'CREATE INDEX IF NOT EXISTS idx_observacoes_produto '
+                'ON observacoes (marketplace, produto_id, observado_em)'
+            )
+            # Janela "desde T"
+            conexao.execute(
+                'CREATE INDEX IF NOT EXISTS idx_observacoes_tempo ON observacoes (observado_em)'
+            )
+            # Ranking de um termo por execução
+            conexao.execute(
+                'CREATE INDEX IF NOT EXISTS idx_observacoes_termo '
+                'ON observacoes (termo, execucao_id, marketplace)'
+            )
+
+    def iniciar_execucao(self) -> int:
+        """
+        Registra o início de uma execução de busca.
+
+        Returns:
+            Id da execução, usado em registrar()
+        """
+        with self._conectar() as conexao:
+            cursor = conexao.execute('INSERT INTO execucoes (iniciada_em) VALUES (?)', (time.time(),))
+            return cursor.lastrowid
+
+    def registrar(self, execucao_id: int, produtos: List[Produto],
+                  observado_em: Optional[float] = None):
+        """
+        Grava uma observação para cada produto de um lote.
+
+        Lotes vindos do cache não são gravados: repetiriam uma observação antiga.
+        Preço zero (limpar_preco não conseguiu ler o preço) é gravado como
+        NULL, para não aparecer como uma queda de 100%.
+
+        Args:
+            execucao_id: Id devolvido por iniciar_execucao()
+            produtos: Produtos de uma busca
+            observado_em: Instante (epoch) da coleta, para lotes gravados
+                antes (padrão: agora)
+        """
+        agora = observado_em if observado_em is not None else time.time()
+        linhas = []
+        for produto in produtos:
+            if produto.fonte == FONTE_CACHE:
+                continue
+            produto_id = extrair_id_produto(produto.marketplace, produto.link, produto.titulo)
+            if produto_id is None:
+                continue
+            linhas.append((
+                execucao_id, produto.marketplace, produto_id, normalizar_termo(produto.termo),
+                produto.posicao, produto.preco if produto.preco and produto.preco > 0 else None,
+                produto.titulo, produto.link, agora
+            ))
+
+        if not linhas:
+            return
+
+        with self._conectar() as conexao:
+            conexao.executemany(
+                'INSERT INTO observacoes '
+                '(execucao_id, marketplace, produto_id, termo, posicao, preco, titulo, link, observado_em) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                linhas
+            )
+
+    def mudancas_preco(self, desde: float, marketplace: Optional[str] = None,
+                       limite: int = 100) -> List[Dict]:
+        """
+        Produtos cujo preço mudou desde o instante informado.
+
+        O preço anterior é o último observado antes de `desde` (ou, para
+        produtos que apareceram depois, o primeiro observado desde então);
+        o atual é a observação mais recente.
+
+        Observações sem preço (NULL, ou 0 em históricos antigos) são ignoradas.
+
+        Args:
+            desde: Instante de referência (epoch em segundos)
+            marketplace: Restringe a um marketplace
+            limite: Quantidade máxima de produtos
+
+        Returns:
+            Lista ordenada pela maior variação percentual, com preco_anterior,
+            preco_atual, variacao, variacao_percentual, titulo, link e observado_em
+        """
+        filtro_marketplace = 'AND marketplace = :marketplace' if marketplace else ''
+        consulta = f'''
+            WITH recentes AS (
+                SELECT marketplace, produto_id, MIN(observado_em) AS primeira
+                FROM observacoes
+                WHERE observado_em >= :desde AND preco > 0 {filtro_marketplace}
+                GROUP BY marketplace, produto_id
+            ),
+            comparacao AS (
+                SELECT
+                    r.marketplace,
+                    r.produto_id,
+                    COALESCE(
+                        (SELECT o.preco FROM observacoes o
+                         WHERE o.marketplace = r.marketplace AND o.produto_id = r.produto_id
+                           AND o.observado_em < :desde AND o.preco > 0
+                         ORDER BY o.observado_em DESC LIMIT 1),
+                        (SELECT o.preco FROM observacoes o
+                         WHERE o.marketplace = r.marketplace AND o.produto_id = r.produto_id
+                           AND o.observado_em = r.primeira AND o.preco > 0
+                         LIMIT 1)
+                    ) AS preco_anterior,
+                    (SELECT o.rowid FROM observacoes o
+                     WHERE o.marketplace = r.marketplace AND o.produto_id = r.produto_id
+                       AND o.preco > 0
+                     ORDER BY o.observado_em DESC LIMIT 1) AS ultima
+                FROM recentes r
+            )
+            SELECT c.marketplace, c.produto_id, c.preco_anterior, atual.preco AS preco_atual,
+                   atual.titulo, atual.link, atual.observado_em
+            FROM comparacao c
+            JOIN observacoes atual ON atual.rowid = c.ultima
+            WHERE atual.preco != c.preco_anterior
+            ORDER BY ABS(atual.preco - c.preco_anterior) / c.preco_anterior DESC
+            LIMIT :limite
+        '''
+        with self._conectar() as conexao:
+            linhas = conexao.execute(
+                consulta, {'desde': desde, 'marketplace': marketplace, 'limite': limite}
+            ).fetchall()
+
+        mudancas = []
+        for linha in linhas:
+            mudanca = dict(linha)
+            mudanca['variacao'] = round(mudanca['preco_atual'] - mudanca['preco_anterior'], 2)
+            mudanca['variacao_percentual'] = round(
+                100 * mudanca['variacao'] / mudanca['preco_anterior'], 2
+            ) if mudanca['preco_anterior'] else None
+            mudancas.append(mudanca)
+        return mudancas
+
+    def movimentos_ranking(self, termo: str, marketplace: Optional[str] = None,
+                           desde: Optional[float] = None, limite: int = 100) -> Dict:
+        """
+        Compara o ranking mais recente do termo com uma execução anterior.
+
+        Args:
+            termo: Termo de busca
+            marketplace: Restringe a um marketplace
+            desde: Compara com a última execução iniciada antes deste instante
+                (padrão: a execução imediatamente anterior)
+            limite: Quantidade máxima de produtos
+
+        Returns:
+            Dicionário com as execuções comparadas em cada marketplace
+            ('execucoes': marketplace -> atual e anterior; 'execucao_atual' e
+            'execucao_anterior' são as mais recentes delas) e 'movimentos': produtos
+            ordenados pelo tamanho do movimento (positivo = subiu), incluindo
+            os que entraram (posicao_anterior None) e saíram (posicao_atual None)
+        """
+        chave = normalizar_termo(termo)
+        filtro_desde = 'AND e.iniciada_em < :desde' if desde is not None else ''
+
+        # Posição de cada produto em uma execução (a melhor, se repetido)
+        ranking = '''
+            SELECT o.marketplace, o.produto_id, MIN(o.posicao) AS posicao,
+                   MAX(o.titulo) AS titulo, MAX(o.link) AS link
+            FROM observacoes o
+            WHERE o.termo = :termo AND o.marketplace = :marketplace AND o.execucao_id = :{execucao}
+            GROUP BY o.marketplace, o.produto_id
+        '''
+        consulta = f'''
+            WITH atual AS ({ranking.format(execucao='atual')}),
+                 anterior AS ({ranking.format(execucao='anterior')})
+            SELECT a.marketplace, a.produto_id, a.titulo, a.link,
+                   b.posicao AS posicao_anterior, a.posicao AS posicao_atual
+            FROM atual a LEFT JOIN anterior b
+              ON b.marketplace = a.marketplace AND b.produto_id = a.produto_id
+            UNION ALL
+            SELECT b.marketplace, b.produto_id, b.titulo, b.link,
+                   b.posicao AS posicao_anterior, NULL AS posicao_atual
+            FROM anterior b LEFT JOIN atual a
+              ON a.marketplace = b.marketplace AND a.produto_id = b.produto_id
+            WHERE a.produto_id IS NULL
+        '''
+
+        linhas = []
+        execucoes: Dict[str, Dict] = {}
+        with self._conectar() as conexao:
+            # Cada marketplace é comparado com as próprias execuções: lotes do
+            # cache não são gravados, então a execução mais recente do termo
+            # pode ter só um dos marketplaces
+            if marketplace:
+                marketplaces = [marketplace]
+            else:
+                marketplaces = [linha[0] for linha in conexao.execute(
+                    'SELECT DISTINCT marketplace FROM observacoes WHERE termo = ? ORDER BY marketplace',
+                    (chave,)
+                )]
+
+            for nome in marketplaces:
+                parametros = {'termo': chave, 'marketplace': nome, 'desde': desde}
+                atual = conexao.execute(
+                    'SELECT MAX(execucao_id) FROM observacoes WHERE termo = :termo AND marketplace = :marketplace',
+                    parametros
+                ).fetchone()[0]
+                if atual is None:
+                    continue
+                anterior = conexao.execute(f'''
+                    SELECT MAX(o.execucao_id) FROM observacoes o
+                    JOIN execucoes e ON e.id = o.execucao_id
+                    WHERE o.termo = :termo AND o.marketplace = :marketplace
+                      AND o.execucao_id < :atual {filtro_desde}
+                ''', dict(parametros, atual=atual)).fetchone()[0]
+                execucoes[nome] = {'atual': atual, 'anterior': anterior}
+                linhas.extend(conexao.execute(consulta, dict(parametros, atual=atual, anterior=anterior)))
+
+        if not execucoes:
+            return {'termo': termo, 'execucao_atual': None, 'execucao_anterior': None,
+                    'execucoes': {}, 'movimentos': []}
+
+        movimentos = []
+        for linha in linhas:
+            movimento = dict(linha)
+            if movimento['posicao_anterior'] is not None and movimento['posicao_atual'] is not None:
+                movimento['movimento'] = movimento['posicao_anterior'] - movimento['posicao_atual']
+            else:
+                movimento['movimento'] = None
+            movimentos.append(movimento)
+
+        # Maiores movimentos primeiro; entradas e saídas depois
+        movimentos.sort(key=lambda m: (m['movimento'] is None, -abs(m['movimento'] or 0)))
+        anteriores = [execucao['anterior'] for execucao in execucoes.values()
+                      if execucao['anterior'] is not None]
+        return {
+            'termo': termo,
+            'execucao_atual': max(execucao['atual'] for execucao in execucoes.values()),
+            'execucao_anterior': max(anteriores) if anteriores else None,
+            'execucoes': execucoes,
+            'movimentos': movimentos[:limite],
+        }
+
+    def observacoes(self, desde: Optional[float] = None, ate: Optional[float] = None,
+                    termos: Optional[List[str]] = None,
+                    marketplaces: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        Percorre as observações gravadas, sem carregá-las todas em memória.
+
+        Args:
+            desde: Só observações a partir deste instante (epoch em segundos)
+            ate: Só observações anteriores a este instante
+            termos: Restringe aos termos (comparados já normalizados)
+            marketplaces: Restringe aos marketplaces
+
+        Yields:
+            Dicionários com termo, marketplace, posicao, titulo, preco, link,
+            produto_id e observado_em, por ordem de coleta
+        """
+        condicoes = []
+        parametros: List = []
+        if desde is not None:
+            condicoes.append('observado_em >= ?')
+            parametros.append(desde)
+        if ate is not None:
+            condicoes.append('observado_em < ?')
+            parametros.append(ate)
+        if termos:
+            chaves = sorted({normalizar_termo(termo) for termo in termos})
+            condicoes.append(f"termo IN ({', '.join('?' * len(chaves))})")
+            parametros.extend(chaves)
+        if marketplaces:
+            condicoes.append(f"marketplace IN ({', '.join('?' * len(marketplaces))})")
+            parametros.extend(marketplaces)
+        onde = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+        with self._conectar() as conexao:
+            cursor = conexao.execute(f'''
+                SELECT termo, marketplace, posicao, titulo, preco, link, produto_id, observado_em
+                FROM observacoes {onde}
+                ORDER BY observado_em, execucao_id, termo, marketplace, posicao
+            ''', parametros)
+            for linha in cursor:
+                yield dict(linha)
+
+    def serie(self, marketplace: str, produto_id: str, limite: int = 500) -> List[Dict]:
+        """
+        Observações de um produto, da mais antiga para a mais recente.
+
+        Args:
+            marketplace: Marketplace do produto
+            produto_id: Id devolvido por extrair_id_produto()
+            limite: Quantidade máxima de observações (as mais recentes)
+        """
+        with self._conectar() as conexao:
+            linhas = conexao.execute('''
+                SELECT * FROM (
+                    SELECT execucao_id, termo, posicao, preco, titulo, observado_em
+                    FROM observacoes
+                    WHERE marketplace = ? AND produto_id = ?
+                    ORDER BY observado_em DESC LIMIT ?
+                ) ORDER BY observado_em
+            ''', (marketplace, produto_id, limite)).fetchall()
+        return [dict(linha) for linha in linhas]
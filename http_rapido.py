@@ -0,0 +1,133 @@
+"""
+Camada HTTP rápida para as páginas de busca dos marketplaces.
+
+Muitas listagens já trazem os cards de produto no HTML inicial, sem precisar
+de JavaScript. Esta camada baixa a página com uma sessão `requests`
+reaproveitada (keep-alive) e extrai os cards com lxml, usando a mesma
+especificação de seletores do navegador (ver marketplaces.py), então o lote
+tem o mesmo formato nos dois caminhos.
+Quando os seletores obrigatórios não aparecem (captcha, página renderizada
+só no cliente, erro HTTP), devolve None e a busca cai para o Playwright.
+Respostas 429/503 são o próprio site pedindo para diminuir o ritmo: nesse
+caso o navegador também seria barrado, então BloqueioHttp é levantado para
+a busca ser refeita mais tarde.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from marketplaces import obter_marketplace
+from metricas import medir
+from navegador import USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+FONTE_HTTP = 'http'
+FONTE_NAVEGADOR = 'navegador'
+
+TIMEOUT_HTTP = 15
+
+# Status com que os marketplaces sinalizam excesso de requisições
+STATUS_BLOQUEIO = (429, 503)
+
+_sessao = None
+_lock_sessao = threading.Lock()
+
+
+def obter_sessao() -> requests.Session:
+    """
+    Retorna a sessão HTTP compartilhada, criando-a na primeira chamada.
+
+    A sessão mantém um pool de conexões keep-alive por host, então buscas
+    seguidas no mesmo marketplace não repetem o handshake TCP/TLS.
+
+    Returns:
+        Sessão requests configurada com cabeçalhos de navegador
+    """
+    global _sessao
+    with _lock_sessao:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+            sessao.mount('https://', adaptador)
+            sessao.mount('http://', adaptador)
+            sessao.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+            })
+            _sessao = sessao
+        return _sessao
+
+
+# Fração mínima de cards com título e link para aceitar o HTML inicial
+# (cards de anúncio/carrossel sem esses campos são tolerados)
+FRACAO_MINIMA_COMPLETOS = 0.8
+
+
+def cards_completos(cards: List[Dict]) -> bool:
+    """
+    Verifica se o lote tem os campos obrigatórios para dispensar o navegador.
+
+    Args:
+        cards: Lote extraído do HTML
+
+    Returns:
+        True se o lote pode ser usado sem renderização
+    """
+    if not cards:
+        return False
+    completos = sum(1 for card in cards if card['titulo'] and card['link'])
+    return completos / len(cards) >= FRACAO_MINIMA_COMPLETOS
+
+
+class BloqueioHttp(Exception):
+    """
+    O marketplace respondeu com um status de excesso de requisições.
+    """
+
+    def __init__(self, marketplace: str, status: int):
+        super().__init__(f"{marketplace} respondeu com status {status}")
+        self.marketplace = marketplace
+        self.status = status
+
+
+def buscar_cards_http(marketplace: str, url: str) -> Optional[List[Dict]]:
+    """
+    Tenta obter os cards de uma busca apenas com HTTP.
+
+    Args:
+        marketplace: Nome de um marketplace registrado (ex.: 'Amazon BR')
+        url: URL da página de busca
+
+    Returns:
+        Lote de cards, ou None se for preciso cair para o navegador
+
+    Raises:
+        BloqueioHttp: Status 429/503 (excesso de requisições)
+    """
+    try:
+        with medir('download_http', marketplace):
+            resposta = obter_sessao().get(url, timeout=TIMEOUT_HTTP)
+    except requests.RequestException as e:
+        logger.info(f"{marketplace}: camada HTTP falhou ({e}), usando navegador")
+        return None
+
+    if resposta.status_code in STATUS_BLOQUEIO:
+        raise BloqueioHttp(marketplace, resposta.status_code)
+
+    if resposta.status_code != 200:
+        logger.info(f"{marketplace}: camada HTTP recebeu status {resposta.status_code}, usando navegador")
+        return None
+
+    with medir('parsing', marketplace):
+        cards = obter_marketplace(marketplace).extrator.extrair_html(resposta.text)
+    if not cards_completos(cards):
+        logger.info(f"{marketplace}: seletores ausentes no HTML inicial, usando navegador")
+        return None
+
+    return cards
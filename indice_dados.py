@@ -0,0 +1,205 @@
+"""
+Índice em memória do resultado.json para a rota /dados.
+
+O arquivo é lido uma única vez e mantido em memória enquanto o mtime e o
+tamanho não mudarem. Sobre ele a rota aplica filtros (marketplace, termo,
+faixa de preço), ordenação e paginação, devolvendo só a página visível.
+As ordenações são calculadas uma vez por versão do arquivo e reaproveitadas.
+Cada produto ganha a "Chave" que o identifica entre execuções (deltas.py),
+usada por /dados?since= e pelos cards do dashboard.
+"""
+
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from deltas import chave_saida
+
+# Ordenações aceitas em ?ordenar= ("-" na frente inverte a ordem)
+ORDENACOES = {
+    'posicao': None,  # ordem original do arquivo (termo, marketplace, ranking)
+    'preco': 'Preço',
+    'titulo': 'Título do Produto',
+}
+
+POR_PAGINA_PADRAO = 60
+POR_PAGINA_MAXIMO = 500
+
+# Quantidade de arquivos (um por job) mantidos em memória ao mesmo tempo
+MAXIMO_INDICES = 16
+
+
+class IndiceResultados:
+    """
+    Produtos de um resultado.json com listas auxiliares para consulta.
+    """
+
+    def __init__(self, caminho: str):
+        """
+        Args:
+            caminho: Arquivo resultado.json
+        """
+        estado = os.stat(caminho)
+        self.caminho = caminho
+        self.versao = (estado.st_mtime_ns, estado.st_size)
+
+        with open(caminho, 'r', encoding='utf-8') as f:
+            self.produtos: List[Dict] = json.load(f)
+
+        # chave_saida() -> índice do produto (o primeiro, se a chave se repetir)
+        self.posicoes: Dict[str, int] = {}
+        for indice, produto in enumerate(self.produtos):
+            produto['Chave'] = chave = chave_saida(produto)
+            self.posicoes.setdefault(chave, indice)
+
+        self.termos = list(dict.fromkeys(p['Termo Pesquisado'] for p in self.produtos))
+        self.marketplaces = list(dict.fromkeys(p['Marketplace'] for p in self.produtos))
+        self._ordens: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self) -> str:
+        return f'{self.versao[0]:x}-{self.versao[1]:x}'
+
+    def _ordem(self, ordenar: str) -> List[int]:
+        """
+        Índices dos produtos na ordenação pedida (calculada uma vez).
+        """
+        with self._lock:
+            if ordenar not in self._ordens:
+                decrescente = ordenar.startswith('-')
+                coluna = ORDENACOES[ordenar.lstrip('-')]
+                indices = list(range(len(self.produtos)))
+                if coluna is not None:
+                    # Produtos sem valor ficam sempre no fim
+                    com_valor = [i for i in indices if self.produtos[i].get(coluna) is not None]
+                    sem_valor = [i for i in indices if self.produtos[i].get(coluna) is None]
+                    textual = coluna == 'Título do Produto'
+                    com_valor.sort(
+                        key=lambda i: self.produtos[i][coluna].lower() if textual else self.produtos[i][coluna],
+                        reverse=decrescente
+                    )
+                    indices = com_valor + sem_valor
+                elif decrescente:
+                    indices.reverse()
+                self._ordens[ordenar] = indices
+            return self._ordens[ordenar]
+
+    def consultar(self, marketplace: Optional[str] = None, termo: Optional[str] = None,
+                  preco_min: Optional[float] = None, preco_max: Optional[float] = None,
+                  ordenar: str = 'posicao', pagina: int = 1,
+                  por_pagina: int = POR_PAGINA_PADRAO) -> Dict:
+        """
+        Filtra, ordena e pagina os produtos.
+
+        Args:
+            marketplace: Só produtos deste marketplace
+            termo: Só produtos deste termo pesquisado
+            preco_min: Preço mínimo (produtos sem preço são excluídos)
+            preco_max: Preço máximo (produtos sem preço são excluídos)
+            ordenar: Chave de ORDENACOES, com "-" opcional para ordem decrescente
+            pagina: Página pedida (a partir de 1)
+            por_pagina: Produtos por página
+
+        Returns:
+            Dicionário com 'produtos' da página, 'total', 'pagina', 'paginas',
+            'por_pagina' e os 'termos'/'marketplaces' disponíveis no arquivo
+        """
+        def aceita(produto: Dict) -> bool:
+            if marketplace and produto['Marketplace'] != marketplace:
+                return False
+            if termo and produto['Termo Pesquisado'] != termo:
+                return False
+            if preco_min is not None or preco_max is not None:
+                preco = produto.get('Preço')
+                if preco is None:
+                    return False
+                if preco_min is not None and preco < preco_min:
+                    return False
+                if preco_max is not None and preco > preco_max:
+                    return False
+            return True
+
+        selecionados = [i for i in self._ordem(ordenar) if aceita(self.produtos[i])]
+        total = len(selecionados)
+        paginas = max(1, math.ceil(total / por_pagina))
+        inicio = (pagina - 1) * por_pagina
+
+        return {
+            'produtos': [self.produtos[i] for i in selecionados[inicio:inicio + por_pagina]],
+            'total': total,
+            'pagina': pagina,
+            'paginas': paginas,
+            'por_pagina': por_pagina,
+            'termos': self.termos,
+            'marketplaces': self.marketplaces,
+        }
+
+
+_indices: 'OrderedDict[str, IndiceResultados]' = OrderedDict()
+_lock_indices = threading.Lock()
+
+
+def obter_indice(caminho: str) -> IndiceResultados:
+    """
+    Retorna o índice do arquivo, recarregando-o se o arquivo mudou.
+
+    Args:
+        caminho: Arquivo resultado.json
+
+    Returns:
+        Índice pronto para consulta
+    """
+    chave = os.path.abspath(caminho)
+    estado = os.stat(chave)
+    versao = (estado.st_mtime_ns, estado.st_size)
+
+    with _lock_indices:
+        indice = _indices.get(chave)
+        if indice is not None and indice.versao == versao:
+            _indices.move_to_end(chave)
+            return indice
+
+    # Carregar fora do lock para não travar consultas a outros arquivos
+    indice = IndiceResultados(chave)
+
+    with _lock_indices:
+        _indices[chave] = indice
+        _indices.move_to_end(chave)
+        while len(_indices) > MAXIMO_INDICES:
+            _indices.popitem(last=False)
+    return indice
+
+
+def ler_parametros(args) -> Tuple[Dict, Optional[str]]:
+    """
+    Converte os parâmetros da query string nos argumentos de consultar().
+
+    Args:
+        args: request.args do Flask
+
+    Returns:
+        Tupla (parametros, mensagem_de_erro); a mensagem é None se tudo for válido
+    """
+    try:
+        parametros = {
+            'marketplace': args.get('marketplace') or None,
+            'termo': args.get('termo') or None,
+            'preco_min': float(args['preco_min']) if args.get('preco_min') else None,
+            'preco_max': float(args['preco_max']) if args.get('preco_max') else None,
+            'ordenar': args.get('ordenar') or 'posicao',
+            'pagina': int(args.get('pagina', 1)),
+            'por_pagina': int(args.get('por_pagina', POR_PAGINA_PADRAO)),
+        }
+    except ValueError:
+        return {}, 'Parâmetros numéricos inválidos'
+
+    if parametros['ordenar'].lstrip('-') not in ORDENACOES:
+        return {}, f"Ordenação inválida; use uma de: {', '.join(ORDENACOES)}"
+    if parametros['pagina'] < 1 or not 1 <= parametros['por_pagina'] <= POR_PAGINA_MAXIMO:
+        return {}, f'"pagina" deve ser >= 1 e "por_pagina" entre 1 e {POR_PAGINA_MAXIMO}'
+
+    return parametros, None
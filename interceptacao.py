@@ -0,0 +1,233 @@
+"""
+Interceptação de requisições durante o scraping.
+
+O scraper só lê textos, hrefs e atributos `src`, então imagens, fontes,
+mídia, scripts de terceiros e rastreadores são abortados antes de sair da
+máquina. Cada marketplace tem uma lista de domínios próprios permitidos;
+qualquer script fora dela é tratado como terceiro.
+
+Folhas de estilo não são bloqueadas: o `innerText` usado na extração depende
+do CSS para ignorar elementos ocultos.
+"""
+
+import logging
+import time
+from typing import Dict, Iterable
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Tipos de recurso (request.resource_type do Playwright) sempre bloqueados
+TIPOS_BLOQUEADOS = {'image', 'font', 'media'}
+
+# Tipos bloqueados apenas quando vêm de domínios fora da lista do marketplace
+TIPOS_SO_PRIMEIRA_PARTE = {'script', 'xhr', 'fetch', 'websocket', 'eventsource'}
+
+# Domínios de anúncios e rastreamento bloqueados em qualquer tipo de recurso
+DOMINIOS_RASTREADORES = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'facebook.net',
+    'facebook.com',
+    'hotjar.com',
+    'clarity.ms',
+    'bing.com',
+    'criteo.com',
+    'criteo.net',
+    'taboola.com',
+    'outbrain.com',
+    'scorecardresearch.com',
+    'adsrvr.org',
+    'amazon-adsystem.com',
+    'mercadoclics.com',
+    'nr-data.net',
+    'newrelic.com',
+)
+
+# Domínios próprios de cada marketplace (incluem subdomínios)
+DOMINIOS_PERMITIDOS = {
+    'Mercado Livre': (
+        'mercadolivre.com.br',
+        'mercadolibre.com',
+        'mlstatic.com',
+    ),
+    'Amazon BR': (
+        'amazon.com.br',
+        'amazon.com',
+        'media-amazon.com',
+        'ssl-images-amazon.com',
+    ),
+}
+
+# Tamanho médio (bytes) de cada tipo bloqueado nas páginas de busca, usado
+# para estimar a economia: requisições abortadas não informam o tamanho real
+TAMANHO_MEDIO_BLOQUEADO = {
+    'image': 25_000,
+    'font': 40_000,
+    'media': 300_000,
+    'script': 60_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+    'websocket': 0,
+    'eventsource': 0,
+}
+
+
+def dominio_pertence(host: str, dominios: Iterable[str]) -> bool:
+    """
+    Verifica se o host é um dos domínios informados ou subdomínio deles.
+
+    Args:
+        host: Host da URL (ex.: 'http2.mlstatic.com')
+        dominios: Domínios de referência (ex.: ('mlstatic.com',))
+
+    Returns:
+        True se o host casar com algum domínio
+    """
+    return any(host == dominio or host.endswith('.' + dominio) for dominio in dominios)
+
+
+class InterceptadorRecursos:
+    """
+    Aborta recursos desnecessários de uma página e contabiliza a economia.
+
+    Uso (API síncrona):
+        interceptador = InterceptadorRecursos('Mercado Livre')
+        interceptador.instalar(page)
+        interceptador.iniciar_carregamento()
+        page.goto(url)
+        interceptador.finalizar_carregamento()
+        logger.info(interceptador.resumo())
+    """
+
+    def __init__(self, marketplace: str, permitir_locais: bool = True):
+        """
+        Args:
+            marketplace: Nome do marketplace (chave de DOMINIOS_PERMITIDOS)
+            permitir_locais: Trata 127.0.0.1/localhost como primeira parte
+                (necessário para rodar contra as fixtures locais)
+        """
+        self.marketplace = marketplace
+        self.permitidos = DOMINIOS_PERMITIDOS.get(marketplace, ())
+        if permitir_locais:
+            self.permitidos = self.permitidos + ('127.0.0.1', 'localhost')
+        self.bloqueadas: Dict[str, int] = {}
+        self.requisicoes_permitidas = 0
+        self.bytes_baixados = 0
+        self.tempo_carregamento = 0.0
+        self._inicio = None
+
+    def deve_bloquear(self, url: str, tipo: str) -> bool:
+        """
+        Decide se uma requisição deve ser abortada.
+
+        Args:
+            url: URL da requisição
+            tipo: request.resource_type do Playwright
+
+        Returns:
+            True se a requisição deve ser abortada
+        """
+        host = urlparse(url).hostname or ''
+        if dominio_pertence(host, DOMINIOS_RASTREADORES):
+            return True
+        if tipo in TIPOS_BLOQUEADOS:
+            return True
+        if tipo in TIPOS_SO_PRIMEIRA_PARTE:
+            return not dominio_pertence(host, self.permitidos)
+        return False
+
+    def _registrar(self, request) -> bool:
+        tipo = request.resource_type
+        if self.deve_bloquear(request.url, tipo):
+            self.bloqueadas[tipo] = self.bloqueadas.get(tipo, 0) + 1
+            return True
+        self.requisicoes_permitidas += 1
+        return False
+
+    def _rotear(self, route):
+        if self._registrar(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _rotear_async(self, route):
+        if self._registrar(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _contar_resposta(self, response):
+        tamanho = response.headers.get('content-length')
+        if tamanho and tamanho.isdigit():
+            self.bytes_baixados += int(tamanho)
+
+    def instalar(self, page):
+        """
+        Registra a interceptação em uma página da API síncrona.
+        """
+        page.route('**/*', self._rotear)
+        page.on('response', self._contar_resposta)
+
+    async def instalar_async(self, page):
+        """
+        Registra a interceptação em uma página da API assíncrona.
+        """
+        await page.route('**/*', self._rotear_async)
+        page.on('response', self._contar_resposta)
+
+    def iniciar_carregamento(self):
+        """
+        Marca o início do carregamento da página.
+        """
+        self._inicio = time.perf_counter()
+
+    def finalizar_carregamento(self):
+        """
+        Marca o fim do carregamento da página.
+        """
+        if self._inicio is not None:
+            self.tempo_carregamento = time.perf_counter() - self._inicio
+
+    @property
+    def bytes_economizados(self) -> int:
+        """
+        Estimativa de bytes não baixados graças aos bloqueios.
+        """
+        return sum(
+            TAMANHO_MEDIO_BLOQUEADO.get(tipo, 0) * quantidade
+            for tipo, quantidade in self.bloqueadas.items()
+        )
+
+    def relatorio(self) -> Dict:
+        """
+        Retorna as estatísticas da página interceptada.
+
+        Returns:
+            Dicionário com requisições bloqueadas por tipo, permitidas,
+            bytes baixados, bytes economizados (estimados) e tempo de carga
+        """
+        return {
+            'marketplace': self.marketplace,
+            'bloqueadas': dict(self.bloqueadas),
+            'permitidas': self.requisicoes_permitidas,
+            'bytes_baixados': self.bytes_baixados,
+            'bytes_economizados_estimados': self.bytes_economizados,
+            'tempo_carregamento': round(self.tempo_carregamento, 3),
+        }
+
+    def resumo(self) -> str:
+        """
+        Retorna uma linha de log com as estatísticas da página.
+        """
+        total_bloqueadas = sum(self.bloqueadas.values())
+        return (
+            f"{self.marketplace}: {total_bloqueadas} requisições bloqueadas, "
+            f"{self.requisicoes_permitidas} permitidas, "
+            f"{self.bytes_baixados / 1024:.0f} KB baixados, "
+            f"~{self.bytes_economizados / 1024:.0f} KB economizados, "
+            f"carregamento em {self.tempo_carregamento:.2f}s"
+        )
@@ -0,0 +1,254 @@
+"""
+Controle de ritmo por domínio e reagendamento de buscas que falharam.
+
+Substitui os intervalos fixos de 2 a 5 segundos entre requisições. Cada
+domínio tem um balde de fichas (token bucket) cujo intervalo entre fichas se
+adapta ao que é observado: respostas rápidas e com produtos encurtam o
+intervalo aos poucos; respostas lentas o alongam um pouco; sinais de
+bloqueio (status 429/503, captcha, página sem produtos, timeout) o dobram.
+Buscas em outros domínios seguem sem esperar.
+
+Buscas que falham são refeitas mais tarde, com espera exponencial e jitter,
+até um número máximo de tentativas e dentro de um orçamento de
+retentativas (uma fração das buscas feitas), para que um site fora do ar
+não multiplique a carga enviada a ele.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Resultado de uma busca, usado para ajustar o ritmo do domínio
+RESULTADO_OK = 'ok'
+RESULTADO_VAZIO = 'vazio'
+RESULTADO_BLOQUEIO = 'bloqueio'
+RESULTADO_ERRO = 'erro'
+
+
+class BaldeFichas:
+    """
+    Balde de fichas de um domínio, com intervalo entre fichas adaptativo.
+
+    Não é thread-safe; LimitadorAdaptativo serializa o acesso.
+    """
+
+    def __init__(self, intervalo: float, intervalo_min: float, intervalo_max: float,
+                 capacidade: float = 1.0):
+        """
+        Args:
+            intervalo: Intervalo inicial entre fichas (segundos)
+            intervalo_min: Intervalo mais curto permitido
+            intervalo_max: Intervalo mais longo permitido
+            capacidade: Fichas acumuláveis (rajada máxima depois de um período ocioso)
+        """
+        self.intervalo = intervalo
+        self.intervalo_min = intervalo_min
+        self.intervalo_max = intervalo_max
+        self.capacidade = capacidade
+        self.fichas = capacidade
+        self.atualizado_em = time.monotonic()
+        # Média móvel da latência das buscas bem-sucedidas
+        self.latencia_media: Optional[float] = None
+
+    def reservar(self, agora: float) -> float:
+        """
+        Reserva uma ficha e devolve quanto tempo esperar até poder usá-la.
+        """
+        self.fichas = min(self.capacidade,
+                          self.fichas + (agora - self.atualizado_em) / self.intervalo)
+        self.atualizado_em = agora
+        self.fichas -= 1
+        # Saldo negativo: fichas já reservadas por quem está esperando
+        return 0.0 if self.fichas >= 0 else -self.fichas * self.intervalo
+
+    def ajustar(self, resultado: str, latencia: Optional[float] = None):
+        """
+        Adapta o intervalo ao resultado de uma busca.
+        """
+        if resultado == RESULTADO_OK:
+            lenta = (latencia is not None and self.latencia_media is not None
+                     and latencia > 2 * self.latencia_media)
+            if latencia is not None:
+                self.latencia_media = (latencia if self.latencia_media is None
+                                       else 0.8 * self.latencia_media + 0.2 * latencia)
+            # Site saudável: acelerar devagar; lento: desacelerar um pouco
+            self.intervalo *= 1.25 if lenta else 0.9
+        else:
+            # Sinal de bloqueio ou falha: recuar rápido
+            self.intervalo *= 2
+        self.intervalo = min(self.intervalo_max, max(self.intervalo_min, self.intervalo))
+
+
+class LimitadorAdaptativo:
+    """
+    Um balde de fichas por domínio, compartilhável entre threads e corrotinas.
+
+    Uso:
+        limitador = LimitadorAdaptativo()
+        limitador.aguardar('lista.mercadolivre.com.br')        # ou await aguardar_async(...)
+        # ... faz a requisição
+        limitador.registrar('lista.mercadolivre.com.br', RESULTADO_OK, latencia=1.2)
+    """
+
+    def __init__(self, intervalo_min: float = 2.0, intervalo_max: float = 5.0,
+                 intervalo_piso: float = 0.5, intervalo_teto: float = 60.0,
+                 jitter: float = 0.25):
+        """
+        Args:
+            intervalo_min: Limite inferior do intervalo inicial (segundos)
+            intervalo_max: Limite superior do intervalo inicial (segundos); o
+                intervalo inicial é a média dos dois, como nos antigos 2 a 5 s
+            intervalo_piso: Intervalo mais curto a que o ritmo pode chegar
+            intervalo_teto: Intervalo mais longo a que o ritmo pode chegar
+            jitter: Variação aleatória relativa aplicada a cada espera
+
+        Raises:
+            ValueError: Se algum intervalo não for positivo (o balde divide
+                pelo intervalo ao repor as fichas)
+        """
+        if min(intervalo_min, intervalo_max, intervalo_piso, intervalo_teto) <= 0:
+            raise ValueError('Os intervalos entre requisições devem ser positivos')
+        self.intervalo_inicial = (intervalo_min + intervalo_max) / 2
+        self.intervalo_piso = min(intervalo_piso, intervalo_min)
+        self.intervalo_teto = max(intervalo_teto, intervalo_max)
+        self.jitter = jitter
+        self._baldes: Dict[str, BaldeFichas] = {}
+        self._lock = threading.Lock()
+
+    def _balde(self, dominio: str) -> BaldeFichas:
+        balde = self._baldes.get(dominio)
+        if balde is None:
+            balde = self._baldes[dominio] = BaldeFichas(
+                self.intervalo_inicial, self.intervalo_piso, self.intervalo_teto
+            )
+        return balde
+
+    def _reservar(self, dominio: str) -> float:
+        with self._lock:
+            espera = self._balde(dominio).reservar(time.monotonic())
+        if espera > 0:
+            espera *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return espera
+
+    def aguardar(self, dominio: str) -> float:
+        """
+        Bloqueia até que uma nova requisição ao domínio seja permitida.
+
+        Args:
+            dominio: Host de destino da requisição
+
+        Returns:
+            Segundos esperados
+        """
+        espera = self._reservar(dominio)
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+    async def aguardar_async(self, dominio: str) -> float:
+        """
+        Versão assíncrona de aguardar().
+        """
+        espera = self._reservar(dominio)
+        if espera > 0:
+            await asyncio.sleep(espera)
+        return espera
+
+    def registrar(self, dominio: str, resultado: str, latencia: Optional[float] = None):
+        """
+        Informa o resultado de uma busca para ajustar o ritmo do domínio.
+
+        Args:
+            dominio: Host da busca
+            resultado: RESULTADO_OK, RESULTADO_VAZIO, RESULTADO_BLOQUEIO ou RESULTADO_ERRO
+            latencia: Duração da busca em segundos
+        """
+        with self._lock:
+            balde = self._balde(dominio)
+            anterior = balde.intervalo
+            balde.ajustar(resultado, latencia)
+            if resultado != RESULTADO_OK and balde.intervalo != anterior:
+                logger.info(f"{dominio}: {resultado}, intervalo entre requisições "
+                            f"{anterior:.1f}s -> {balde.intervalo:.1f}s")
+
+    def intervalos(self) -> Dict[str, float]:
+        """
+        Intervalo atual de cada domínio (segundos), para log e diagnóstico.
+        """
+        with self._lock:
+            return {dominio: balde.intervalo for dominio, balde in self._baldes.items()}
+
+
+class PoliticaRetentativa:
+    """
+    Decide se e quando uma busca que falhou deve ser refeita.
+
+    A espera antes da tentativa n é sorteada entre 0 e base * 2^n (limitada a
+    `espera_maxima`), o "full jitter", que espalha as retentativas de várias
+    buscas em vez de sincronizá-las. O orçamento limita as retentativas a uma
+    fração das buscas feitas (mais um mínimo fixo).
+
+    Uso:
+        politica = PoliticaRetentativa()
+        politica.registrar_busca()
+        if politica.pode_repetir(tentativa):
+            espera = politica.espera(tentativa)
+    """
+
+    def __init__(self, tentativas_max: int = 3, espera_base: float = 5.0,
+                 espera_maxima: float = 120.0, fracao_orcamento: float = 0.2,
+                 minimo_orcamento: int = 3):
+        """
+        Args:
+            tentativas_max: Tentativas por busca, contando a primeira
+            espera_base: Espera base antes da primeira retentativa (segundos)
+            espera_maxima: Teto da espera entre tentativas (segundos)
+            fracao_orcamento: Retentativas permitidas por busca feita
+            minimo_orcamento: Retentativas sempre permitidas, mesmo com poucas buscas
+        """
+        self.tentativas_max = tentativas_max
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.fracao_orcamento = fracao_orcamento
+        self.minimo_orcamento = minimo_orcamento
+        self.buscas = 0
+        self.retentativas = 0
+        self._lock = threading.Lock()
+
+    def registrar_busca(self):
+        """
+        Conta uma busca nova (primeira tentativa) para o orçamento.
+        """
+        with self._lock:
+            self.buscas += 1
+
+    def pode_repetir(self, tentativa: int) -> bool:
+        """
+        Reserva uma retentativa, se a busca ainda tiver tentativas e houver orçamento.
+
+        Args:
+            tentativa: Tentativas já feitas desta busca (1 depois da primeira)
+        """
+        with self._lock:
+            if tentativa >= self.tentativas_max:
+                return False
+            orcamento = self.minimo_orcamento + self.fracao_orcamento * self.buscas
+            if self.retentativas >= orcamento:
+                logger.warning("Orçamento de retentativas esgotado")
+                return False
+            self.retentativas += 1
+            return True
+
+    def espera(self, tentativa: int) -> float:
+        """
+        Segundos a esperar antes da próxima tentativa.
+
+        Args:
+            tentativa: Tentativas já feitas desta busca
+        """
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** (tentativa - 1)))
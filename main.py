@@ -3,14 +3,31 @@ Script para buscar produtos nos marketplaces Mercado Livre e Amazon BR
 e gerar arquivos Excel e JSON com os resultados.
 """
 
-import pandas as pd
+import argparse
+import json
+import heapq
+import itertools
+import os
 import time
-import random
-import re
-from playwright.sync_api import sync_playwright
-from typing import List, Dict
+from functools import partial
+from typing import Callable, Iterable, List, Dict, Optional
 import logging
 
+from armazem_resultados import ArmazemResultados
+from cache_resultados import CacheResultados, FONTE_CACHE
+from comparacao import ARQUIVO_COMPARACAO, parear_produtos, salvar_comparacao
+from deltas import RegistroExecucoes
+from exportacao import escrever_xlsx, linhas_produtos
+from historico_precos import HistoricoPrecos
+from http_rapido import FONTE_HTTP
+from interceptacao import InterceptadorRecursos
+from marketplaces import MARKETPLACES, Marketplace, obter_marketplace
+import metricas
+from limitador import LimitadorAdaptativo, PoliticaRetentativa, RESULTADO_OK, RESULTADO_VAZIO
+from navegador import PoolNavegador
+from paginacao import coletar_paginas, ErroBusca
+from produto import COLUNAS_SAIDA, Produto
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,7 +35,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-
 def ler_termos(arquivo: str) -> List[str]:
     """
     Lê os termos de busca do arquivo inputs.txt.
@@ -39,433 +55,557 @@ def ler_termos(arquivo: str) -> List[str]:
         return []
 
 
-def limpar_preco(texto: str) -> float:
+def cards_navegador(marketplace: Marketplace, pool: PoolNavegador, url_busca: str,
+                    termo: str) -> List[Dict]:
     """
-    Limpa e converte texto de preço para float usando regex para ser mais robusta.
-    
-    Lida com strings sujas como 'ou R$ 232,19' ou '10x de R$ 50,00'.
-    Busca padrões numéricos e extrai o valor após 'R$' ou o último da string.
+    Carrega uma página de busca no navegador e extrai os cards.
     
     Args:
-        texto: Texto do preço a ser limpo (pode conter texto extra)
+        marketplace: Marketplace registrado (ver marketplaces.py)
+        pool: Pool de navegador
+        url_busca: URL da página de resultados
+        termo: Termo de busca (usado no log)
         
     Returns:
-        Valor float do preço, ou 0.0 se não conseguir converter
+        Lote de cards no formato de marketplace.extrator
     """
-    if not texto:
-        return 0.0
-    
-    try:
-        # Buscar todos os padrões numéricos (sequências de números, pontos e vírgulas)
-        padrao = r'[\d\.,]+'
-        matches = re.findall(padrao, texto)
+    with pool.pagina() as page:
+        # Debug: mostrar URL final gerada
+        logger.debug('URL %s: %s', marketplace.nome, url_busca)
         
-        if not matches:
-            return 0.0
+        # Bloquear imagens, fontes, mídia e scripts de terceiros
+        interceptador = InterceptadorRecursos(marketplace.nome)
+        interceptador.instalar(page)
         
-        # Se encontrar 'R$' no texto, priorizar o valor logo após ele
-        valor_preco = None
-        if 'R$' in texto:
-            # Buscar o padrão numérico que vem logo após 'R$'
-            padrao_apos_rs = r'R\$\s*([\d\.,]+)'
-            match_rs = re.search(padrao_apos_rs, texto)
-            if match_rs:
-                valor_preco = match_rs.group(1)
+        logger.info(f"Acessando {marketplace.nome} para '{termo}'...")
+        interceptador.iniciar_carregamento()
+        with metricas.medir('navegacao'):
+            page.goto(url_busca, wait_until="domcontentloaded", timeout=60000)
         
-        # Se não encontrou após R$, usar o último match (geralmente o valor total/à vista)
-        if not valor_preco:
-            valor_preco = matches[-1]
+        # Aguardar carregamento dos produtos - tentar cada seletor esperado
+        with metricas.medir('espera_seletor'):
+            for indice, seletor in enumerate(marketplace.seletores_espera, 1):
+                try:
+                    page.wait_for_selector(seletor, timeout=10000)
+                    break
+                except Exception:
+                    if marketplace.espera_obrigatoria and indice == len(marketplace.seletores_espera):
+                        raise
+        interceptador.finalizar_carregamento()
         
-        # Limpar o valor: remover pontos de milhar e trocar vírgula decimal por ponto
-        # Se tem vírgula, assume formato brasileiro: vírgula é decimal, pontos são milhar
-        if ',' in valor_preco:
-            partes = valor_preco.split(',')
-            parte_inteira = partes[0].replace('.', '')  # Remove pontos de milhar
-            parte_decimal = partes[1] if len(partes) > 1 else '00'
-            valor_limpo = f"{parte_inteira}.{parte_decimal}"
-        else:
-            # Se não tem vírgula, pode ter ponto como decimal ou milhar
-            # Se tem apenas um ponto e 1-2 dígitos após, assume decimal
-            if '.' in valor_preco:
-                partes_ponto = valor_preco.split('.')
-                if len(partes_ponto) == 2 and len(partes_ponto[1]) <= 2:
-                    # É decimal (ex: 10.80)
-                    valor_limpo = valor_preco  # Mantém como está
-                else:
-                    # É milhar, remove pontos
-                    valor_limpo = valor_preco.replace('.', '')
-            else:
-                valor_limpo = valor_preco
+        # Extrair todos os cards em uma única ida ao navegador
+        with metricas.medir('extracao'):
+            cards = marketplace.extrator.extrair_navegador(page)
         
-        return float(valor_limpo)
-    except (ValueError, AttributeError, IndexError):
-        return 0.0
+        logger.info(interceptador.resumo())
+    
+    return cards
 
 
-def buscar_mercado_livre(termo: str, limite: int = 30) -> List[Dict]:
+def buscar_marketplace(nome: str, termo: str, limite: int = 30,
+                       pool: Optional[PoolNavegador] = None,
+                       usar_http: bool = True,
+                       limitador: Optional[LimitadorAdaptativo] = None) -> List[Produto]:
     """
-    Busca produtos no Mercado Livre usando Playwright para scraping.
+    Busca produtos em um marketplace registrado.
+    
+    Tenta primeiro a camada HTTP rápida; se o HTML inicial não trouxer os
+    cards, usa Playwright para renderizar a página. Se a primeira página não
+    tiver `limite` produtos únicos, segue para as próximas.
     
     Args:
+        nome: Nome do marketplace (ex.: 'Mercado Livre')
         termo: Termo de busca
         limite: Número máximo de produtos a retornar
+        pool: Pool de navegador compartilhado; se omitido, um navegador
+            temporário é lançado só se a camada HTTP não resolver
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        limitador: Ritmo por domínio para as páginas seguintes (a primeira
+            é aguardada por quem chama)
         
     Returns:
-        Lista de dicionários com informações dos produtos
+        Lista de produtos
+    """
+    marketplace = obter_marketplace(nome)
+    return coletar_paginas(
+        nome, termo, limite,
+        url_pagina=lambda pagina: marketplace.url_pagina(termo, pagina),
+        normalizar=marketplace.normalizar,
+        cards_navegador=partial(cards_navegador, marketplace),
+        pool=pool,
+        usar_http=usar_http,
+        limitador=limitador
+    )
+
+
+def buscar_mercado_livre(termo: str, limite: int = 30,
+                         pool: Optional[PoolNavegador] = None,
+                         usar_http: bool = True,
+                         limitador: Optional[LimitadorAdaptativo] = None) -> List[Produto]:
+    """
+    Busca produtos no Mercado Livre (ver buscar_marketplace).
     """
-    produtos = []
+    return buscar_marketplace("Mercado Livre", termo, limite, pool=pool, usar_http=usar_http,
+                              limitador=limitador)
+
+
+def buscar_amazon(termo: str, limite: int = 30,
+                  pool: Optional[PoolNavegador] = None,
+                  usar_http: bool = True,
+                  limitador: Optional[LimitadorAdaptativo] = None) -> List[Produto]:
+    """
+    Busca produtos na Amazon BR (ver buscar_marketplace).
+    """
+    return buscar_marketplace("Amazon BR", termo, limite, pool=pool, usar_http=usar_http,
+                              limitador=limitador)
+
+
+# Produtos por termo e marketplace quando nada é informado
+LIMITE_PADRAO = 30
+
+# Marketplaces consultados para cada termo, na ordem dos resultados
+BUSCADORES = [(nome, partial(buscar_marketplace, nome)) for nome in MARKETPLACES]
+
+def formatar_para_saida(produtos: Iterable[Produto]) -> List[Dict]:
+    """
+    Converte produtos para o formato do resultado.json (colunas em português).
     
-    try:
-        with sync_playwright() as p:
-            # Iniciar navegador em modo headless
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            )
-            page = context.new_page()
-            
-            # URL de busca do Mercado Livre
-            # Nota: A URL padrão já traz os resultados ordenados por "Mais Relevantes",
-            # que serve como proxy para "Mais Vendidos" conforme as regras do marketplace.
-            # Qualquer discrepância entre o navegador do usuário e o script se deve à
-            # personalização de cookies/região do navegador. O script captura o ranking neutro.
-            url_busca = f'https://lista.mercadolivre.com.br/{termo.replace(" ", "-")}'
-            
-            # Debug: mostrar URL final gerada
-            print(f'URL Mercado Livre: {url_busca}')
-            
-            logger.info(f"Acessando Mercado Livre para '{termo}'...")
-            page.goto(url_busca, wait_until="domcontentloaded", timeout=60000)
-            
-            # Aguardar carregamento dos produtos - tentar ambos os seletores
-            try:
-                page.wait_for_selector('.ui-search-layout__item', timeout=10000)
-            except:
-                try:
-                    page.wait_for_selector('div.poly-card', timeout=10000)
-                except:
-                    pass
-            
-            # Extrair produtos da página - tentar ambos os seletores de container
-            elementos_produtos = page.query_selector_all('div.poly-card, li.ui-search-layout__item')
-            
-            # Conjunto para rastrear links já vistos (deduplicação)
-            vistos = set()
-            
-            # Iterar sobre todos os elementos até ter 30 produtos únicos
-            for elemento in elementos_produtos:
-                # Parar quando tiver 30 produtos únicos
-                if len(produtos) >= limite:
-                    break
-                
-                try:
-                    # Extrair título - tentar múltiplos seletores
-                    titulo = "Título não disponível"
-                    titulo_elem = elemento.query_selector('h2.poly-box')
-                    if not titulo_elem:
-                        titulo_elem = elemento.query_selector('.poly-component__title')
-                    if not titulo_elem:
-                        titulo_elem = elemento.query_selector('.ui-search-item__title')
-                    
-                    if titulo_elem:
-                        titulo = titulo_elem.inner_text()
-                    
-                    # Debug: mostrar título encontrado
-                    print(f'Título encontrado (Mercado Livre): {titulo}')
-                    
-                    # Extrair link - tentar múltiplos seletores
-                    link = ""
-                    link_elem = elemento.query_selector('a.poly-component__title')
-                    if not link_elem:
-                        link_elem = elemento.query_selector('a.ui-search-link')
-                    
-                    if link_elem:
-                        href = link_elem.get_attribute('href')
-                        if href:
-                            link = href
-                    
-                    # Deduplicação: verificar se o link já foi visto
-                    if link in vistos:
-                        continue
-                    vistos.add(link)
-                    
-                    # Extrair preço - Mercado Livre
-                    preco = 0
-                    
-                    # Método 1: Buscar container .andes-money-amount e pegar inteiro + centavos
-                    container_preco = elemento.query_selector('.andes-money-amount')
-                    if container_preco:
-                        # Parte inteira
-                        inteiro_elem = container_preco.query_selector('.andes-money-amount__fraction')
-                        # Centavos
-                        centavos_elem = container_preco.query_selector('.andes-money-amount__cents')
-                        
-                        if inteiro_elem:
-                            inteiro_texto = inteiro_elem.inner_text().replace('.', '').strip()
-                            try:
-                                inteiro = float(inteiro_texto)
-                                if centavos_elem:
-                                    centavos_texto = centavos_elem.inner_text().strip()
-                                    try:
-                                        centavos = float(centavos_texto)
-                                        preco = inteiro + (centavos / 100)
-                                    except ValueError:
-                                        preco = inteiro
-                                else:
-                                    preco = inteiro
-                            except ValueError:
-                                pass
-                    
-                    # Método 2 (alternativa): Buscar preço completo em outros seletores
-                    if preco == 0:
-                        preco_elem = elemento.query_selector('.poly-price__current')
-                        if not preco_elem:
-                            preco_elem = elemento.query_selector('.ui-search-price__part')
-                        
-                        if preco_elem:
-                            preco_texto = preco_elem.inner_text()
-                            preco = limpar_preco(preco_texto)
-                    
-                    # Extrair imagem - Mercado Livre
-                    imagem = ""
-                    img_elem = elemento.query_selector('img.ui-search-result-image__element')
-                    if not img_elem:
-                        # Fallback: buscar qualquer img dentro do card
-                        img_elem = elemento.query_selector('img')
-                    
-                    if img_elem:
-                        src = img_elem.get_attribute('src')
-                        if src:
-                            imagem = src
-                    
-                    # Posição baseada no número de produtos únicos já adicionados
-                    posicao = len(produtos) + 1
-                    
-                    produto = {
-                        "termo": termo,
-                        "marketplace": "Mercado Livre",
-                        "posicao": posicao,
-                        "titulo": titulo,
-                        "preco": preco,
-                        "link": link,
-                        "imagem": imagem
-                    }
-                    produtos.append(produto)
-                    
-                except Exception as e:
-                    logger.warning(f"Erro ao extrair produto {idx} do Mercado Livre: {e}")
-                    continue
-            
-            browser.close()
-            
-        logger.info(f"Mercado Livre - {termo}: {len(produtos)} produtos encontrados")
+    Args:
+        produtos: Produtos em qualquer iterável
         
-    except Exception as e:
-        logger.error(f"Erro ao buscar no Mercado Livre para '{termo}': {e}")
+    Returns:
+        Lista de dicionários com as colunas de COLUNAS_SAIDA
+    """
+    return [
+        {nome: getattr(produto, coluna) for coluna, nome in COLUNAS_SAIDA.items()}
+        for produto in produtos
+    ]
+
+
+def registrar_taxa_http(lotes: List[List[Produto]]):
+    """
+    Registra no log quantas buscas foram atendidas pela camada HTTP.
     
-    return produtos
+    Args:
+        lotes: Lista de resultados de cada busca (um lote por termo/marketplace)
+    """
+    # Lotes vindos do cache não passaram por nenhuma das camadas
+    com_resultado = [lote for lote in lotes if lote and lote[0].fonte != FONTE_CACHE]
+    if not com_resultado:
+        return
+    via_http = sum(1 for lote in com_resultado if lote[0].fonte == FONTE_HTTP)
+    logger.info(
+        f"Camada HTTP atendeu {via_http} de {len(com_resultado)} buscas "
+        f"({100 * via_http / len(com_resultado):.0f}%)"
+    )
 
 
-def buscar_amazon(termo: str, limite: int = 30) -> List[Dict]:
+def dominio_marketplace(marketplace: str) -> str:
     """
-    Busca produtos na Amazon BR usando Playwright para scraping.
+    Host consultado para o marketplace, chave do limitador de ritmo.
     
     Args:
-        termo: Termo de busca
-        limite: Número máximo de produtos a retornar
+        marketplace: Nome de um marketplace registrado (ex.: 'Amazon BR')
+    """
+    return obter_marketplace(marketplace).dominio
+
+
+def processar_termos(termos: List[str], max_usos_navegador: int = 50,
+                     usar_http: bool = True,
+                     cache: Optional[CacheResultados] = None,
+                     forcar_atualizacao: bool = False,
+                     pool: Optional[PoolNavegador] = None,
+                     ao_concluir_lote: Optional[Callable[[str, str, Optional[List[Produto]]], None]] = None,
+                     armazem: Optional[ArmazemResultados] = None,
+                     historico: Optional[HistoricoPrecos] = None,
+                     limite: int = LIMITE_PADRAO,
+                     limitador: Optional[LimitadorAdaptativo] = None,
+                     politica: Optional[PoliticaRetentativa] = None) -> List[Produto]:
+    """
+    Processa todos os termos de busca e coleta produtos dos dois marketplaces.
+    
+    Um único navegador é compartilhado por todas as buscas do job, e só é
+    lançado se alguma busca não puder ser atendida pelo cache ou pela
+    camada HTTP. O ritmo das requisições a cada domínio é controlado pelo
+    limitador; buscas que falham ou voltam vazias são refeitas mais tarde,
+    enquanto as demais seguem.
+    
+    Args:
+        termos: Lista de termos de busca
+        max_usos_navegador: Buscas atendidas pelo navegador antes de ser relançado
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        cache: Cache de resultados; se omitido, toda busca vai aos marketplaces
+        forcar_atualizacao: Ignora o cache na leitura (o resultado novo é gravado)
+        pool: Pool de navegador já aberto; se omitido, um é criado para o job
+        ao_concluir_lote: Chamada com (termo, marketplace, produtos) assim que
+            cada busca termina, para publicar resultados parciais; produtos
+            é None quando a busca desistiu depois das tentativas
+        armazem: Armazenamento incremental; pares já gravados nele são
+            reaproveitados (retomada) e cada busca nova é gravada ao terminar
+        historico: Histórico de preços; cada busca real vira uma observação
+        limite: Produtos por termo e marketplace (acima de uma página de
+            resultados, as páginas seguintes também são lidas)
+        limitador: Ritmo por domínio; compartilhe um entre chamadas para que
+            o ritmo aprendido valha para as buscas seguintes
+        politica: Tentativas e orçamento de retentativas
         
     Returns:
-        Lista de dicionários com informações dos produtos
+        Lista completa de produtos encontrados, na ordem dos termos
     """
-    produtos = []
+    if pool is None:
+        with PoolNavegador(max_usos=max_usos_navegador) as pool_do_job:
+            return processar_termos(termos, max_usos_navegador, usar_http, cache,
+                                    forcar_atualizacao, pool_do_job, ao_concluir_lote, armazem,
+                                    historico, limite, limitador, politica)
     
-    try:
-        with sync_playwright() as p:
-            # Iniciar navegador em modo headless
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            )
-            page = context.new_page()
-            
-            # URL de busca da Amazon BR
-            # Ordenação: Mais Vendidos (exact-aware-popularity-rank)
-            url_busca = f"https://www.amazon.com.br/s?k={termo.replace(' ', '+')}&s=exact-aware-popularity-rank"
-            
-            # Debug: mostrar URL final gerada
-            print(f'URL Amazon: {url_busca}')
-            
-            logger.info(f"Acessando Amazon BR para '{termo}'...")
-            page.goto(url_busca, wait_until="domcontentloaded", timeout=60000)
-            
-            # Aguardar carregamento dos produtos
-            page.wait_for_selector('div[data-component-type="s-search-result"]', timeout=10000)
-            
-            # Extrair produtos da página usando o container base
-            elementos_produtos = page.query_selector_all('div[data-component-type="s-search-result"]')
+    if limitador is None:
+        limitador = LimitadorAdaptativo()
+    if politica is None:
+        politica = PoliticaRetentativa()
+    
+    # (índice do termo, índice do marketplace) -> produtos
+    resultados: Dict[tuple, List[Produto]] = {}
+    lotes = []
+    execucao_historico = historico.iniciar_execucao() if historico is not None else None
+    
+    pares = [(i, j) for i in range(len(termos)) for j in range(len(BUSCADORES))]
+    proximo_par = 0
+    # Buscas adiadas após uma falha: (instante, desempate, i, j, tentativas feitas)
+    adiadas: List[tuple] = []
+    desempate = itertools.count()
+    
+    while proximo_par < len(pares) or adiadas:
+        agora = time.monotonic()
+        if adiadas and (proximo_par >= len(pares) or adiadas[0][0] <= agora):
+            instante, _, i, j, tentativas = heapq.heappop(adiadas)
+            if instante > agora:
+                time.sleep(instante - agora)
+            termo = termos[i]
+            marketplace, buscar = BUSCADORES[j]
+            logger.info(f"{marketplace} - {termo}: tentativa {tentativas + 1}")
+        else:
+            i, j = pares[proximo_par]
+            proximo_par += 1
+            tentativas = 0
+            termo = termos[i]
+            marketplace, buscar = BUSCADORES[j]
+            if j == 0:
+                logger.info(f"Processando termo {i + 1}/{len(termos)}: '{termo}'")
             
-            for idx, elemento in enumerate(elementos_produtos[:limite], 1):
-                try:
-                    # Extrair título usando h2 span dentro do container
-                    titulo_elem = elemento.query_selector('h2 span')
-                    titulo = titulo_elem.inner_text() if titulo_elem else "Título não disponível"
-                    
-                    # Debug: mostrar título encontrado
-                    print(f'Título encontrado (Amazon): {titulo}')
-                    
-                    # Extrair link - tentar múltiplos seletores
-                    link = ""
-                    link_elem = elemento.query_selector('a.a-link-normal.s-no-outline')
-                    if not link_elem:
-                        link_elem = elemento.query_selector('h2 a')
-                    
-                    if link_elem:
-                        href = link_elem.get_attribute('href')
-                        if href:
-                            # Se o link vier relativo (começando com /), concatenar com a URL base
-                            link = f"https://www.amazon.com.br{href}" if href.startswith('/') else href
-                    
-                    # Extrair preço - Amazon
-                    preco = 0
-                    
-                    # Método 1: Buscar span.a-offscreen (preço completo oculto)
-                    preco_offscreen = elemento.query_selector('span.a-offscreen')
-                    if preco_offscreen:
-                        preco_texto = preco_offscreen.inner_text()
-                        preco = limpar_preco(preco_texto)
-                    
-                    # Método 2 (alternativa): Reconstruir com parte inteira + centavos
-                    if preco == 0:
-                        inteiro_elem = elemento.query_selector('span.a-price-whole')
-                        centavos_elem = elemento.query_selector('span.a-price-fraction')
-                        
-                        if inteiro_elem:
-                            inteiro_texto = inteiro_elem.inner_text().replace('.', '').replace(',', '').strip()
-                            try:
-                                inteiro = float(inteiro_texto)
-                                if centavos_elem:
-                                    centavos_texto = centavos_elem.inner_text().strip()
-                                    try:
-                                        centavos = float(centavos_texto)
-                                        preco = inteiro + (centavos / 100)
-                                    except ValueError:
-                                        preco = inteiro
-                                else:
-                                    preco = inteiro
-                            except ValueError:
-                                pass
-                    
-                    # Extrair imagem - Amazon
-                    imagem = ""
-                    img_elem = elemento.query_selector('img.s-image')
-                    if not img_elem:
-                        # Fallback: buscar qualquer img dentro do container
-                        img_elem = elemento.query_selector('img')
-                    
-                    if img_elem:
-                        src = img_elem.get_attribute('src')
-                        if src:
-                            imagem = src
-                    
-                    produto = {
-                        "termo": termo,
-                        "marketplace": "Amazon BR",
-                        "posicao": idx,
-                        "titulo": titulo,
-                        "preco": preco,
-                        "link": link,
-                        "imagem": imagem
-                    }
-                    produtos.append(produto)
-                    
-                except Exception as e:
-                    logger.warning(f"Erro ao extrair produto {idx} da Amazon: {e}")
+            if armazem is not None:
+                produtos = armazem.obter(marketplace, termo)
+                if produtos is not None:
+                    logger.info(f"{marketplace} - {termo}: já gravado em {armazem.caminho}, retomando")
+                    resultados[(i, j)] = produtos
                     continue
             
-            browser.close()
+            produtos = None
+            if cache is not None and not forcar_atualizacao:
+                produtos = obter_do_cache(cache, marketplace, termo, limite)
+                if produtos is not None:
+                    logger.info(f"{marketplace} - {termo}: {len(produtos)} produtos vindos do cache")
+            
+            if produtos is not None:
+                # Respostas do cache não contam como requisição
+                resultados[(i, j)] = produtos
+                lotes.append(produtos)
+                if armazem is not None:
+                    armazem.gravar_lote(termo, marketplace, produtos)
+                if ao_concluir_lote is not None:
+                    ao_concluir_lote(termo, marketplace, produtos)
+                continue
             
-        logger.info(f"Amazon BR - {termo}: {len(produtos)} produtos encontrados")
+            politica.registrar_busca()
         
-    except Exception as e:
-        logger.error(f"Erro ao buscar na Amazon para '{termo}': {e}")
+        dominio = dominio_marketplace(marketplace)
+        espera = limitador.aguardar(dominio)
+        if espera > 0:
+            logger.info(f"Aguardou {espera:.2f} segundos antes da requisição a {dominio}")
+        
+        inicio = time.perf_counter()
+        with metricas.contexto_busca(termo, marketplace), metricas.medir('busca', marketplace):
+            try:
+                produtos = buscar(termo, limite=limite, pool=pool, usar_http=usar_http,
+                                  limitador=limitador)
+                resultado = RESULTADO_OK if produtos else RESULTADO_VAZIO
+                registrado = False
+            except ErroBusca as e:
+                logger.warning(str(e))
+                produtos = None
+                resultado = e.motivo
+                registrado = e.registrado
+        if not registrado:
+            limitador.registrar(dominio, resultado, time.perf_counter() - inicio)
+        metricas.registro.contar_busca(marketplace, resultado)
+        tentativas += 1
+        
+        if resultado != RESULTADO_OK and politica.pode_repetir(tentativas):
+            espera = politica.espera(tentativas)
+            logger.info(f"{marketplace} - {termo}: {resultado}, nova tentativa em {espera:.1f}s")
+            heapq.heappush(adiadas, (time.monotonic() + espera, next(desempate), i, j, tentativas))
+            continue
+        
+        falhou = produtos is None
+        if falhou:
+            logger.error(f"{marketplace} - {termo}: desistindo após {tentativas} tentativa(s)")
+            produtos = []
+        else:
+            if cache is not None:
+                cache.gravar(marketplace, termo, produtos, limite=limite)
+            if historico is not None:
+                historico.registrar(execucao_historico, produtos)
+        
+        resultados[(i, j)] = produtos
+        lotes.append(produtos)
+        
+        if armazem is not None:
+            with metricas.medir('gravacao', marketplace):
+                armazem.gravar_lote(termo, marketplace, produtos)
+        if ao_concluir_lote is not None:
+            ao_concluir_lote(termo, marketplace, None if falhou else produtos)
     
-    return produtos
+    registrar_taxa_http(lotes)
+    if cache is not None:
+        registrar_estatisticas_cache(cache)
+    return [produto for chave in sorted(resultados) for produto in resultados[chave]]
 
 
-def processar_termos(termos: List[str]) -> List[Dict]:
+def obter_do_cache(cache: CacheResultados, marketplace: str, termo: str,
+                   limite: int = LIMITE_PADRAO) -> Optional[List[Produto]]:
     """
-    Processa todos os termos de busca e coleta produtos dos dois marketplaces.
+    Busca o par no cache, considerando o limite pedido.
+    
+    Uma entrada com menos produtos que `limite` só é aceita se a busca que a
+    gravou esgotou as páginas do termo; senão conta como falha no cache, e as
+    páginas seguintes são lidas.
     
     Args:
-        termos: Lista de termos de busca
+        cache: Cache de resultados
+        marketplace: Marketplace da busca
+        termo: Termo de busca
+        limite: Produtos pedidos
         
     Returns:
-        Lista completa de produtos encontrados
+        Até `limite` produtos do cache, ou None se o cache não atende
     """
-    todos_produtos = []
-    
-    for idx, termo in enumerate(termos, 1):
-        logger.info(f"Processando termo {idx}/{len(termos)}: '{termo}'")
-        
-        # Buscar no Mercado Livre
-        produtos_ml = buscar_mercado_livre(termo)
-        todos_produtos.extend(produtos_ml)
-        
-        # Delay aleatório entre requisições (2 a 5 segundos)
-        delay = random.uniform(2, 5)
-        logger.info(f"Aguardando {delay:.2f} segundos antes da próxima requisição...")
-        time.sleep(delay)
-        
-        # Buscar na Amazon
-        produtos_amazon = buscar_amazon(termo)
-        todos_produtos.extend(produtos_amazon)
-        
-        # Delay aleatório entre requisições (2 a 5 segundos)
-        if idx < len(termos):  # Não esperar após o último termo
-            delay = random.uniform(2, 5)
-            logger.info(f"Aguardando {delay:.2f} segundos antes da próxima requisição...")
-            time.sleep(delay)
+    produtos = cache.obter(marketplace, termo, minimo=limite)
+    if produtos is None:
+        return None
+    return produtos[:limite]
+
+
+def registrar_estatisticas_cache(cache: CacheResultados):
+    """
+    Registra no log a taxa de acerto do cache por marketplace.
     
-    return todos_produtos
+    Args:
+        cache: Cache de resultados usado na execução
+    """
+    for marketplace, dados in cache.estatisticas()['marketplaces'].items():
+        logger.info(
+            f"Cache {marketplace}: {dados['acertos']} acertos, {dados['falhas']} falhas "
+            f"({dados['expirados']} expirados), taxa de acerto {100 * dados['taxa_acerto']:.0f}%"
+        )
 
 
-def salvar_excel(produtos: List[Dict], arquivo_saida: str):
+def salvar_json(produtos: Iterable[Produto], arquivo_json: str) -> int:
     """
-    Salva os produtos em arquivos Excel e JSON.
+    Grava o resultado.json produto a produto, sem montar a lista inteira.
+    
+    O arquivo é escrito em um temporário e renomeado no final, então quem
+    estiver lendo nunca vê um JSON pela metade.
     
     Args:
-        produtos: Lista de dicionários com informações dos produtos
-        arquivo_saida: Nome do arquivo Excel de saída
+        produtos: Produtos em qualquer iterável
+        arquivo_json: Nome do arquivo JSON de saída
+        
+    Returns:
+        Quantidade de produtos gravados
     """
-    if not produtos:
-        logger.warning("Nenhum produto para salvar")
-        return
+    temporario = arquivo_json + '.tmp'
+    quantidade = 0
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write('[')
+        for produto in produtos:
+            f.write(',\n' if quantidade else '\n')
+            f.write(json.dumps(formatar_para_saida([produto])[0], ensure_ascii=False))
+            quantidade += 1
+        f.write('\n]')
+    os.replace(temporario, arquivo_json)
+    logger.info(f"Arquivo {arquivo_json} salvo com {quantidade} produtos")
+    return quantidade
+
+
+def exportar_armazem(armazem: ArmazemResultados, arquivo_excel: Optional[str] = None,
+                     arquivo_json: Optional[str] = None,
+                     ordem_termos: Optional[List[str]] = None,
+                     arquivo_comparacao: Optional[str] = None) -> int:
+    """
+    Gera o Excel, o JSON e/ou a comparação entre marketplaces a partir do
+    armazenamento incremental.
     
-    df = pd.DataFrame(produtos)
+    Args:
+        armazem: Armazenamento com os lotes da execução
+        arquivo_excel: Excel de saída (omitido para não gerar)
+        arquivo_json: JSON de saída (omitido para não gerar); cada gravação
+            registra uma execução com as diferenças para a anterior
+        ordem_termos: Ordem dos termos na saída (a mesma da busca)
+        arquivo_comparacao: JSON com os pares do mesmo produto nos dois
+            marketplaces (omitido para não gerar)
+        
+    Returns:
+        Quantidade de produtos exportados
+    """
+    ordem_marketplaces = [marketplace for marketplace, _ in BUSCADORES]
+    quantidade = 0
     
-    # Reordenar colunas
-    colunas = ["termo", "marketplace", "posicao", "titulo", "preco", "link", "imagem"]
-    df = df[colunas]
+    if arquivo_json:
+        with metricas.medir('gravacao'):
+            # Diferenças para a execução anterior, para o /dados?since=
+            registro = RegistroExecucoes(arquivo_json)
+            quantidade = salvar_json(registro.acompanhar(armazem.produtos(ordem_termos, ordem_marketplaces)),
+                                     arquivo_json)
+            registro.registrar()
     
-    # Renomear colunas para português mais amigável
-    df.columns = ["Termo Pesquisado", "Marketplace", "Posição no Ranking", 
-                  "Título do Produto", "Preço", "Link do Produto", "Imagem"]
+    if arquivo_excel:
+        with metricas.medir('gravacao'):
+            # Lotes lidos do disco direto para as linhas da planilha
+            linhas = linhas_produtos(armazem.produtos(ordem_termos, ordem_marketplaces))
+            # Gravar em temporário para não expor um Excel incompleto no download
+            temporario = arquivo_excel + '.tmp.xlsx'
+            quantidade = escrever_xlsx(linhas, COLUNAS_SAIDA, temporario)
+            os.replace(temporario, arquivo_excel)
+        logger.info(f"Arquivo {arquivo_excel} salvo com {quantidade} produtos")
     
-    # Salvar Excel
-    df.to_excel(arquivo_saida, index=False, engine='openpyxl')
-    logger.info(f"Arquivo {arquivo_saida} salvo com {len(produtos)} produtos")
+    if arquivo_comparacao:
+        with metricas.medir('comparacao'):
+            pares = parear_produtos(armazem.produtos(ordem_termos, ordem_marketplaces))
+            salvar_comparacao(pares, arquivo_comparacao)
+        logger.info(f"Arquivo {arquivo_comparacao} salvo com {len(pares)} pares entre marketplaces")
     
-    # Salvar JSON (para uso no front-end)
-    df.to_json('resultado.json', orient='records', force_ascii=False, indent=4)
-    logger.info(f"Arquivo resultado.json salvo com {len(produtos)} produtos")
+    return quantidade
+
+
+def registrar_tempos_etapas():
+    """
+    Registra no log o tempo total e médio de cada etapa medida na execução.
+    """
+    for etapa, por_marketplace in metricas.registro.resumo().items():
+        for marketplace, tempos in por_marketplace.items():
+            logger.info(
+                f"Tempo {etapa} ({marketplace}): {tempos['soma']:.2f}s em "
+                f"{tempos['total']} medições (média {tempos['media']:.3f}s)"
+            )
 
 
 def main():
     """
     Função principal que orquestra todo o processo.
     """
+    parser = argparse.ArgumentParser(description="Busca produtos no Mercado Livre e na Amazon BR")
+    parser.add_argument('--concorrente', action='store_true',
+                        help='Usa o motor assíncrono com várias páginas em paralelo')
+    parser.add_argument('--concorrencia', type=int, default=6,
+                        help='Máximo de páginas abertas ao mesmo tempo (modo concorrente)')
+    parser.add_argument('--concorrencia-marketplace', type=int, default=3,
+                        help='Máximo de páginas abertas por marketplace (modo concorrente)')
+    parser.add_argument('--processos', type=int, default=1,
+                        help='Divide os termos entre N processos, cada um com seu navegador')
+    parser.add_argument('--sem-http', action='store_true',
+                        help='Desativa a camada HTTP e usa sempre o navegador')
+    parser.add_argument('--sem-cache', action='store_true',
+                        help='Não lê nem grava o cache de resultados')
+    parser.add_argument('--forcar-atualizacao', action='store_true',
+                        help='Ignora o cache e busca tudo de novo nos marketplaces')
+    parser.add_argument('--sem-historico', action='store_true',
+                        help='Não grava preços e posições no histórico')
+    parser.add_argument('--limite', type=int, default=LIMITE_PADRAO,
+                        help='Produtos por termo e marketplace (lê várias páginas se preciso)')
+    parser.add_argument('--retomar', action='store_true',
+                        help='Continua a execução anterior, pulando as buscas já gravadas')
+    parser.add_argument('--monitorar', action='store_true',
+                        help='Fica rodando e busca de novo cada termo quando o intervalo dele vence')
+    parser.add_argument('--uma-vez', action='store_true',
+                        help='Com --monitorar: roda um único ciclo (para chamar de um cron)')
+    parser.add_argument('--lista', default='monitoramento.json',
+                        help='Lista de monitoramento com intervalo e prioridade por termo')
+    parser.add_argument('--intervalo', type=float, default=60,
+                        help='Intervalo padrão de atualização de cada termo, em minutos (monitoramento)')
+    parser.add_argument('--ciclo', type=float, default=60,
+                        help='Segundos entre ciclos do monitoramento')
+    parser.add_argument('--por-ciclo', type=int,
+                        help='Máximo de termos buscados por ciclo (padrão: calculado pela lista)')
+    parser.add_argument('--servico', action='store_true',
+                        help='Fica aberto e atende lotes de termos, um por linha, da entrada padrão')
+    parser.add_argument('--porta', type=int,
+                        help='Com --servico: recebe os lotes em 127.0.0.1:PORTA em vez da entrada padrão')
+    parser.add_argument('--rastreio', metavar='ARQUIVO',
+                        help='Grava o tempo de cada etapa, por termo, em um JSON (chrome://tracing)')
+    parser.add_argument('--debug', action='store_true',
+                        help='Mostra no log cada título e URL processados')
+    args = parser.parse_args()
+    if args.processos > 1 and args.concorrente:
+        parser.error('--processos e --concorrente não podem ser usados juntos')
+    if args.monitorar and (args.processos > 1 or args.concorrente or args.retomar):
+        parser.error('--monitorar não pode ser usado com --processos, --concorrente ou --retomar')
+    if args.uma_vez and not args.monitorar:
+        parser.error('--uma-vez só vale com --monitorar')
+    if args.servico and (args.monitorar or args.processos > 1 or args.concorrente or args.retomar):
+        parser.error('--servico não pode ser usado com --monitorar, --processos, --concorrente ou --retomar')
+    if args.porta is not None and not args.servico:
+        parser.error('--porta só vale com --servico')
+    if args.debug:
+        logging.getLogger().setLevel(logging.DEBUG)
+    if args.rastreio:
+        metricas.iniciar_rastreio()
+    
     logger.info("Iniciando processamento...")
     
+    if args.servico:
+        from servico import ServicoBuscas, servir_entrada_padrao, servir_socket
+        with ServicoBuscas(usar_http=not args.sem_http, usar_cache=not args.sem_cache,
+                           usar_historico=not args.sem_historico, limite=args.limite) as servico:
+            try:
+                if args.porta is not None:
+                    servir_socket(servico, args.porta)
+                else:
+                    servir_entrada_padrao(servico)
+            except KeyboardInterrupt:
+                logger.info("Serviço interrompido")
+        registrar_tempos_etapas()
+        if args.rastreio:
+            trechos = metricas.finalizar_rastreio(args.rastreio)
+            logger.info(f"Rastreio com {trechos} trechos salvo em {args.rastreio}")
+        return
+    
+    if args.monitorar:
+        from monitoramento import ler_lista_monitoramento, monitorar
+        try:
+            lista = ler_lista_monitoramento(args.lista, "inputs.txt", args.intervalo)
+        except ValueError as e:
+            parser.error(str(e))
+        if not lista:
+            logger.error("Nenhum termo para monitorar. Encerrando.")
+            return
+        try:
+            monitorar(
+                lista,
+                ciclo=args.ciclo,
+                maximo_por_ciclo=args.por_ciclo,
+                uma_vez=args.uma_vez,
+                usar_http=not args.sem_http,
+                usar_cache=not args.sem_cache,
+                usar_historico=not args.sem_historico,
+                limite=args.limite
+            )
+        except KeyboardInterrupt:
+            logger.info("Monitoramento interrompido")
+        registrar_tempos_etapas()
+        if args.rastreio:
+            trechos = metricas.finalizar_rastreio(args.rastreio)
+            logger.info(f"Rastreio com {trechos} trechos salvo em {args.rastreio}")
+        return
+    
     # Ler termos de busca
     termos = ler_termos("inputs.txt")
     
@@ -473,11 +613,64 @@ def main():
         logger.error("Nenhum termo encontrado. Encerrando.")
         return
     
+    cache = None if args.sem_cache else CacheResultados()
+    historico = None if args.sem_historico else HistoricoPrecos()
+    
+    # Cada busca é gravada em resultado.jsonl assim que termina
+    armazem = ArmazemResultados()
+    if args.retomar:
+        logger.info(f"Retomando: {armazem.quantidade_lotes()} buscas já gravadas em {armazem.caminho}")
+    else:
+        armazem.limpar()
+        if args.processos > 1:
+            from execucao_particionada import descartar_fragmentos
+            descartar_fragmentos(armazem)
+    
     # Processar termos e coletar produtos
-    produtos = processar_termos(termos)
+    if args.processos > 1:
+        from execucao_particionada import processar_termos_particionado
+        processar_termos_particionado(
+            termos,
+            armazem,
+            processos=args.processos,
+            usar_http=not args.sem_http,
+            usar_cache=not args.sem_cache,
+            forcar_atualizacao=args.forcar_atualizacao,
+            historico=historico,
+            limite=args.limite
+        )
+    elif args.concorrente:
+        from busca_async import processar_termos_concorrente
+        processar_termos_concorrente(
+            termos,
+            concorrencia_global=args.concorrencia,
+            concorrencia_por_marketplace=args.concorrencia_marketplace,
+            usar_http=not args.sem_http,
+            cache=cache,
+            forcar_atualizacao=args.forcar_atualizacao,
+            armazem=armazem,
+            historico=historico,
+            limite=args.limite
+        )
+    else:
+        processar_termos(
+            termos,
+            usar_http=not args.sem_http,
+            cache=cache,
+            forcar_atualizacao=args.forcar_atualizacao,
+            armazem=armazem,
+            historico=historico,
+            limite=args.limite
+        )
+    
+    # Gerar Excel e JSON a partir do que foi gravado durante a execução
+    exportar_armazem(armazem, "resultado.xlsx", "resultado.json", ordem_termos=termos,
+                     arquivo_comparacao=ARQUIVO_COMPARACAO)
     
-    # Salvar resultados em Excel
-    salvar_excel(produtos, "resultado.xlsx")
+    registrar_tempos_etapas()
+    if args.rastreio:
+        trechos = metricas.finalizar_rastreio(args.rastreio)
+        logger.info(f"Rastreio com {trechos} trechos salvo em {args.rastreio}")
     
     logger.info("Processamento concluído!")
 
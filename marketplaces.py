@@ -0,0 +1,236 @@
+"""
+Registro dos marketplaces consultados.
+
+Cada marketplace é descrito só por dados: como montar a URL de busca e das
+páginas seguintes, o seletor dos cards, quais seletores esperar no
+navegador e a cadeia de seletores alternativos de cada campo. A extração
+(camada HTTP e navegador) e a normalização em Produto são as mesmas para
+todos, então um marketplace novo é um registrar_marketplace(Marketplace(...))
+sem código de busca próprio.
+
+Uso:
+    marketplace = obter_marketplace('Amazon BR')
+    url = marketplace.url_pagina('brigadeiro', 2)
+    cards = marketplace.extrator.extrair_html(html)
+    produtos = marketplace.normalizar(cards, 'brigadeiro', fonte=FONTE_HTTP)
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from precos import limpar_preco, preco_por_partes
+from produto import Produto
+from seletores import Campo, ExtratorCards
+
+logger = logging.getLogger(__name__)
+
+# Formas de obter o preço de um card, tentadas na ordem de Marketplace.ordem_preco
+PRECO_PARTES = 'partes'   # preco_inteiro + preco_centavos
+PRECO_TEXTO = 'texto'     # preco_texto completo (ex.: "R$ 1.299,90")
+
+
+@dataclass
+class Marketplace:
+    """
+    Especificação declarativa de um marketplace.
+
+    Os campos titulo e link são obrigatórios; preco_inteiro, preco_centavos,
+    preco_texto e imagem são usados quando existem.
+    """
+
+    nome: str
+    # URL base (pode ser trocada para rodar contra fixtures locais)
+    url_base: str
+    # Modelo da URL de busca, com {base} e {termo}
+    url_busca: str
+    # Caractere que substitui os espaços do termo na URL
+    separador_termo: str
+    # Acrescentado à URL a partir da página 2, com {pagina} e {desde}
+    # (posição do primeiro item da página)
+    sufixo_pagina: str
+    # Produtos por página (estimativa conservadora, também usada em {desde})
+    itens_por_pagina: int
+    seletor_cards: str
+    campos: Tuple[Campo, ...]
+    # Seletores esperados no navegador antes da extração, um após o outro
+    seletores_espera: Tuple[str, ...]
+    # Se nenhum seletor aparecer: True falha a página, False extrai assim mesmo
+    espera_obrigatoria: bool = True
+    ordem_preco: Tuple[str, ...] = (PRECO_PARTES, PRECO_TEXTO)
+    extrator: ExtratorCards = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.extrator = ExtratorCards(self.seletor_cards, self.campos)
+
+    @property
+    def dominio(self) -> str:
+        """
+        Host consultado, chave do limitador de ritmo.
+        """
+        return urlparse(self.url_base).netloc
+
+    def url_pagina(self, termo: str, pagina: int = 1) -> str:
+        """
+        Monta a URL de uma página de busca.
+
+        Args:
+            termo: Termo de busca
+            pagina: Página de resultados (a partir de 1)
+        """
+        url = self.url_busca.format(base=self.url_base, termo=termo.replace(' ', self.separador_termo))
+        if pagina > 1:
+            # Estimar itens_por_pagina para menos só gera sobreposição entre
+            # páginas, que a deduplicação por link descarta
+            url += self.sufixo_pagina.format(pagina=pagina, desde=(pagina - 1) * self.itens_por_pagina + 1)
+        return url
+
+    def _preco(self, card: Dict) -> float:
+        preco = 0
+        for forma in self.ordem_preco:
+            if forma == PRECO_PARTES:
+                inteiro_texto = card.get('preco_inteiro')
+                if inteiro_texto is not None:
+                    inteiro_texto = inteiro_texto.replace('.', '').replace(',', '').strip()
+                preco = preco_por_partes(inteiro_texto, card.get('preco_centavos'))
+            elif card.get('preco_texto'):
+                preco = limpar_preco(card['preco_texto'])
+            if preco != 0:
+                break
+        return preco
+
+    def normalizar(self, cards: List[Dict], termo: str, limite: int = 30, *,
+                   fonte: str, vistos: Optional[set] = None,
+                   posicao_inicial: int = 1) -> List[Produto]:
+        """
+        Converte o lote bruto devolvido pelo extrator em produtos.
+
+        Args:
+            cards: Lista de cards extraídos da página
+            termo: Termo de busca
+            limite: Número máximo de produtos a retornar
+            fonte: Camada que obteve a página (FONTE_HTTP ou FONTE_NAVEGADOR)
+            vistos: Links já coletados em páginas anteriores (atualizado aqui)
+            posicao_inicial: Posição no ranking do primeiro produto deste lote
+
+        Returns:
+            Lista de produtos
+        """
+        produtos = []
+
+        # Conjunto para rastrear links já vistos (deduplicação)
+        if vistos is None:
+            vistos = set()
+
+        for idx, card in enumerate(cards, 1):
+            # Parar quando tiver o limite de produtos únicos
+            if len(produtos) >= limite:
+                break
+
+            try:
+                titulo = card['titulo'] if card['titulo'] is not None else "Título não disponível"
+
+                # Debug: mostrar título encontrado (formatado só com o nível DEBUG ativo)
+                logger.debug('Título encontrado (%s): %s', self.nome, titulo)
+
+                link = ""
+                href = card['link']
+                if href:
+                    # Se o link vier relativo (começando com /), concatenar com a URL base
+                    link = f"{self.url_base}{href}" if href.startswith('/') else href
+
+                # Deduplicação: o mesmo produto pode aparecer em duas páginas,
+                # ou como patrocinado e orgânico
+                if link in vistos:
+                    continue
+                vistos.add(link)
+
+                produtos.append(Produto(
+                    termo=termo,
+                    marketplace=self.nome,
+                    # Posição baseada no número de produtos únicos já adicionados
+                    posicao=posicao_inicial + len(produtos),
+                    titulo=titulo,
+                    preco=self._preco(card),
+                    link=link,
+                    imagem=card.get('imagem') or "",
+                    fonte=fonte
+                ))
+
+            except Exception as e:
+                logger.warning(f"Erro ao extrair produto {idx} ({self.nome}): {e}")
+                continue
+
+        return produtos
+
+
+# Marketplaces registrados, na ordem dos resultados
+MARKETPLACES: Dict[str, Marketplace] = {}
+
+
+def registrar_marketplace(marketplace: Marketplace) -> Marketplace:
+    """
+    Acrescenta um marketplace às buscas (depois dos já registrados).
+    """
+    MARKETPLACES[marketplace.nome] = marketplace
+    return marketplace
+
+
+def obter_marketplace(nome: str) -> Marketplace:
+    """
+    Raises:
+        KeyError: Se o marketplace não estiver registrado
+    """
+    return MARKETPLACES[nome]
+
+
+# Nota: A URL padrão já traz os resultados ordenados por "Mais Relevantes",
+# que serve como proxy para "Mais Vendidos" conforme as regras do marketplace.
+# Qualquer discrepância entre o navegador do usuário e o script se deve à
+# personalização de cookies/região do navegador. O script captura o ranking neutro.
+MERCADO_LIVRE = registrar_marketplace(Marketplace(
+    nome='Mercado Livre',
+    url_base=os.environ.get('URL_MERCADO_LIVRE', 'https://lista.mercadolivre.com.br'),
+    url_busca='{base}/{termo}',
+    separador_termo='-',
+    # Páginas seguintes são indicadas pelo deslocamento do primeiro item
+    sufixo_pagina='_Desde_{desde}_NoIndex_True',
+    itens_por_pagina=48,
+    seletor_cards='div.poly-card, li.ui-search-layout__item',
+    campos=(
+        Campo('titulo', ('h2.poly-box', '.poly-component__title', '.ui-search-item__title')),
+        Campo('link', ('a.poly-component__title', 'a.ui-search-link'), atributo='href'),
+        Campo('preco_inteiro', ('.andes-money-amount__fraction',), escopo='.andes-money-amount'),
+        Campo('preco_centavos', ('.andes-money-amount__cents',), escopo='.andes-money-amount'),
+        Campo('preco_texto', ('.poly-price__current', '.ui-search-price__part')),
+        Campo('imagem', ('img.ui-search-result-image__element', 'img'), atributo='src'),
+    ),
+    # Layout antigo e novo: tentar os dois; sem nenhum, extrair o que houver
+    seletores_espera=('.ui-search-layout__item', 'div.poly-card'),
+    espera_obrigatoria=False,
+    ordem_preco=(PRECO_PARTES, PRECO_TEXTO),
+))
+
+AMAZON = registrar_marketplace(Marketplace(
+    nome='Amazon BR',
+    url_base=os.environ.get('URL_AMAZON', 'https://www.amazon.com.br'),
+    # Ordenação: Mais Vendidos (exact-aware-popularity-rank)
+    url_busca='{base}/s?k={termo}&s=exact-aware-popularity-rank',
+    separador_termo='+',
+    sufixo_pagina='&page={pagina}',
+    itens_por_pagina=16,
+    seletor_cards='div[data-component-type="s-search-result"]',
+    campos=(
+        Campo('titulo', ('h2 span',)),
+        Campo('link', ('a.a-link-normal.s-no-outline', 'h2 a'), atributo='href'),
+        # span.a-offscreen traz o preço completo oculto
+        Campo('preco_texto', ('span.a-offscreen',)),
+        Campo('preco_inteiro', ('span.a-price-whole',)),
+        Campo('preco_centavos', ('span.a-price-fraction',)),
+        Campo('imagem', ('img.s-image', 'img'), atributo='src'),
+    ),
+    seletores_espera=('div[data-component-type="s-search-result"]',),
+    ordem_preco=(PRECO_TEXTO, PRECO_PARTES),
+))
@@ -0,0 +1,263 @@
+"""
+Medição do tempo de cada etapa das buscas.
+
+Cada trecho instrumentado com `medir(etapa, marketplace)` vira uma
+observação em um histograma por (etapa, marketplace), exposto no formato
+do Prometheus pela rota /metrics do app.py. Etapas medidas:
+
+    lancamento      -> lançamento do Chromium
+    navegacao       -> page.goto
+    espera_seletor  -> wait_for_selector
+    extracao        -> page.evaluate dos extratores
+    download_http   -> download da página pela camada HTTP
+    parsing         -> extração dos cards com lxml e normalização dos produtos
+    gravacao        -> gravação dos lotes e exportação de Excel/JSON
+    comparacao      -> pareamento dos produtos entre marketplaces
+    busca           -> busca completa de um termo em um marketplace
+
+Opcionalmente (python main.py --rastreio arquivo.json), cada trecho também é
+registrado com o termo, a thread e o instante de início em um arquivo no
+formato Trace Event, que abre em chrome://tracing ou ui.perfetto.dev.
+"""
+
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Limites superiores dos buckets dos histogramas (segundos)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Termo e marketplace da busca em andamento (herdados pelos trechos internos)
+_termo_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('termo_atual', default=None)
+_marketplace_atual: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('marketplace_atual', default=None)
+
+
+class Histograma:
+    """
+    Contagens acumuladas por bucket, soma e total de observações.
+    """
+
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, segundos: float):
+        self.contagens[bisect.bisect_left(BUCKETS, segundos)] += 1
+        self.soma += segundos
+        self.total += 1
+
+
+class RegistroMetricas:
+    """
+    Histogramas de duração por etapa e contadores de resultado das buscas.
+
+    Uso:
+        registro = RegistroMetricas()
+        registro.observar('navegacao', 'Amazon BR', 1.3)
+        registro.contar_busca('Amazon BR', 'ok')
+        texto = registro.exportar_prometheus()
+    """
+
+    def __init__(self):
+        self._histogramas: Dict[Tuple[str, str], Histograma] = {}
+        self._buscas: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, etapa: str, marketplace: Optional[str], segundos: float):
+        chave = (etapa, marketplace or '')
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma()
+            histograma.observar(segundos)
+
+    def contar_busca(self, marketplace: str, resultado: str):
+        """
+        Conta uma tentativa de busca (resultado: ok, vazio, bloqueio ou erro).
+        """
+        chave = (marketplace, resultado)
+        with self._lock:
+            self._buscas[chave] = self._buscas.get(chave, 0) + 1
+
+    def estado(self) -> Dict:
+        """
+        Cópia serializável das medições, para somar as de outro processo.
+        """
+        with self._lock:
+            return {
+                'histogramas': [
+                    [etapa, marketplace, list(h.contagens), h.soma, h.total]
+                    for (etapa, marketplace), h in self._histogramas.items()
+                ],
+                'buscas': [[marketplace, resultado, total]
+                           for (marketplace, resultado), total in self._buscas.items()],
+            }
+
+    def incorporar(self, estado: Dict):
+        """
+        Soma as medições devolvidas por estado() em outro processo.
+        """
+        with self._lock:
+            for etapa, marketplace, contagens, soma, total in estado['histogramas']:
+                histograma = self._histogramas.get((etapa, marketplace))
+                if histograma is None:
+                    histograma = self._histogramas[(etapa, marketplace)] = Histograma()
+                histograma.contagens = [a + b for a, b in zip(histograma.contagens, contagens)]
+                histograma.soma += soma
+                histograma.total += total
+            for marketplace, resultado, total in estado['buscas']:
+                chave = (marketplace, resultado)
+                self._buscas[chave] = self._buscas.get(chave, 0) + total
+
+    def resumo(self) -> Dict[str, Dict[str, Dict]]:
+        """
+        {etapa: {marketplace: {'total', 'soma', 'media'}}}, para log e diagnóstico.
+        """
+        with self._lock:
+            resumo: Dict[str, Dict[str, Dict]] = {}
+            for (etapa, marketplace), h in sorted(self._histogramas.items()):
+                resumo.setdefault(etapa, {})[marketplace or '-'] = {
+                    'total': h.total,
+                    'soma': round(h.soma, 3),
+                    'media': round(h.soma / h.total, 3) if h.total else 0.0,
+                }
+            return resumo
+
+    def exportar_prometheus(self) -> str:
+        """
+        Texto no formato de exposição do Prometheus (versão 0.0.4).
+        """
+        linhas = [
+            '# HELP busca_etapa_segundos Duração de cada etapa das buscas',
+            '# TYPE busca_etapa_segundos histogram',
+        ]
+        with self._lock:
+            for (etapa, marketplace), h in sorted(self._histogramas.items()):
+                rotulos = f'etapa="{etapa}",marketplace="{marketplace}"'
+                acumulado = 0
+                for limite, contagem in zip(BUCKETS, h.contagens):
+                    acumulado += contagem
+                    linhas.append(f'busca_etapa_segundos_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+                linhas.append(f'busca_etapa_segundos_bucket{{{rotulos},le="+Inf"}} {h.total}')
+                linhas.append(f'busca_etapa_segundos_sum{{{rotulos}}} {h.soma:.6f}')
+                linhas.append(f'busca_etapa_segundos_count{{{rotulos}}} {h.total}')
+
+            linhas.append('# HELP busca_tentativas_total Tentativas de busca por marketplace e resultado')
+            linhas.append('# TYPE busca_tentativas_total counter')
+            for (marketplace, resultado), total in sorted(self._buscas.items()):
+                linhas.append(f'busca_tentativas_total{{marketplace="{marketplace}",resultado="{resultado}"}} {total}')
+        return '\n'.join(linhas) + '\n'
+
+
+class Rastreio:
+    """
+    Trechos medidos de uma execução, gravados no formato Trace Event.
+    """
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.eventos: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa: str, marketplace: Optional[str], termo: Optional[str],
+                  inicio: float, segundos: float):
+        evento = {
+            'name': etapa,
+            'cat': marketplace or 'geral',
+            'ph': 'X',
+            'ts': round((inicio - self.inicio) * 1e6),
+            'dur': round(segundos * 1e6),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {'termo': termo, 'marketplace': marketplace},
+        }
+        with self._lock:
+            self.eventos.append(evento)
+
+    def incorporar(self, eventos: List[Dict]):
+        """
+        Acrescenta trechos registrados em outro processo (o pid os distingue).
+        """
+        with self._lock:
+            self.eventos.extend(eventos)
+
+    def salvar(self, caminho: str):
+        with self._lock:
+            eventos = list(self.eventos)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+# Registro do processo (lido pela rota /metrics) e rastreio ativo, se houver
+registro = RegistroMetricas()
+_rastreio: Optional[Rastreio] = None
+
+
+def iniciar_rastreio() -> Rastreio:
+    """
+    Passa a registrar cada trecho medido, além dos histogramas.
+    """
+    global _rastreio
+    _rastreio = Rastreio()
+    return _rastreio
+
+
+def rastreio_ativo() -> Optional[Rastreio]:
+    return _rastreio
+
+
+def finalizar_rastreio(caminho: str) -> int:
+    """
+    Grava o rastreio ativo em `caminho` e o desativa.
+
+    Returns:
+        Quantidade de trechos gravados
+    """
+    global _rastreio
+    rastreio, _rastreio = _rastreio, None
+    if rastreio is None:
+        return 0
+    rastreio.salvar(caminho)
+    return len(rastreio.eventos)
+
+
+@contextmanager
+def contexto_busca(termo: str, marketplace: str) -> Iterator[None]:
+    """
+    Associa os trechos medidos dentro do bloco ao termo e ao marketplace.
+    """
+    token_termo = _termo_atual.set(termo)
+    token_marketplace = _marketplace_atual.set(marketplace)
+    try:
+        yield
+    finally:
+        _termo_atual.reset(token_termo)
+        _marketplace_atual.reset(token_marketplace)
+
+
+@contextmanager
+def medir(etapa: str, marketplace: Optional[str] = None) -> Iterator[None]:
+    """
+    Mede a duração do bloco e a registra na etapa.
+
+    Args:
+        etapa: Nome da etapa (ver docstring do módulo)
+        marketplace: Marketplace; se omitido, usa o da busca em andamento
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        if marketplace is None:
+            marketplace = _marketplace_atual.get()
+        registro.observar(etapa, marketplace, segundos)
+        rastreio = _rastreio
+        if rastreio is not None:
+            rastreio.registrar(etapa, marketplace, _termo_atual.get(), inicio, segundos)
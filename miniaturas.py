@@ -0,0 +1,293 @@
+"""
+Miniaturas das imagens dos produtos, servidas pelo próprio app.
+
+O tooltip do dashboard carregava a imagem original do marketplace a cada
+passagem do mouse, o que é lento e quebra quando o link da CDN expira.
+Cada imagem agora é baixada uma única vez, reduzida e gravada em disco
+(pasta miniaturas/); as próximas passagens, e os outros usuários, recebem
+o arquivo local. A pasta tem tamanho máximo: ao passar dele, as miniaturas
+usadas há mais tempo são apagadas (LRU).
+
+A imagem é pedida na variante menor que a própria CDN oferece
+(._AC_UL320_ -> ._AC_UL200_ na Amazon; sem o _2X no Mercado Livre), depois
+redimensionada com o Pillow (requirements.txt) para LADO_MINIATURA pixels e
+regravada em JPEG. Sem o Pillow instalado, fica só a variante da CDN.
+
+Uso:
+    miniaturas = CacheMiniaturas()
+    resultado = miniaturas.obter(url)    # (bytes, mimetype) ou None
+"""
+
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from http_rapido import TIMEOUT_HTTP, obter_sessao
+
+try:
+    from PIL import Image
+except ImportError:  # Instalação sem o requirements.txt: fica só a variante da CDN
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+PASTA_MINIATURAS = 'miniaturas'
+
+# Tamanho máximo da pasta de miniaturas (variável de ambiente em MB)
+LIMITE_CACHE_MINIATURAS = int(os.environ.get('CACHE_MINIATURAS_MB', '100')) * 1024 * 1024
+
+# Maior lado da miniatura, em pixels
+LADO_MINIATURA = 200
+
+# Imagens maiores que isso não são baixadas
+TAMANHO_MAXIMO_IMAGEM = 5 * 1024 * 1024
+
+# Só imagens das CDNs dos marketplaces (a rota não é um proxy aberto)
+HOSTS_PERMITIDOS = ('mlstatic.com', 'media-amazon.com', 'ssl-images-amazon.com', 'images-amazon.com')
+
+EXTENSOES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'image/avif': '.avif',
+}
+MIMETYPES = {extensao: mimetype for mimetype, extensao in EXTENSOES.items()}
+
+_AMAZON_TAMANHO = re.compile(r'\._[A-Z0-9_,]+_\.(jpg|jpeg|png|webp)$', re.IGNORECASE)
+_ML_RETINA = re.compile(r'(/D_(?:[A-Z]+_)*NP_)2X_')
+
+
+def chave_miniatura(url: str) -> str:
+    """
+    Identificador da miniatura de uma imagem (também usado como ETag).
+    """
+    modo = 'pillow' if Image is not None else 'cdn'
+    return hashlib.sha1(f'{url}|{LADO_MINIATURA}|{modo}'.encode('utf-8')).hexdigest()
+
+
+def validar_url(url: str):
+    """
+    Raises:
+        ValueError: Se a URL não for de uma imagem das CDNs dos marketplaces
+    """
+    partes = urlsplit(url)
+    host = (partes.hostname or '').lower()
+    if partes.scheme not in ('http', 'https') or not any(
+        host == permitido or host.endswith('.' + permitido) for permitido in HOSTS_PERMITIDOS
+    ):
+        raise ValueError('URL de imagem não permitida')
+
+
+def url_reduzida(url: str) -> str:
+    """
+    Pede à CDN do marketplace uma variante menor da mesma imagem.
+    """
+    url = _AMAZON_TAMANHO.sub(rf'._AC_UL{LADO_MINIATURA}_.\1', url)
+    return _ML_RETINA.sub(r'\1', url)
+
+
+def reduzir(dados: bytes) -> Optional[bytes]:
+    """
+    Redimensiona a imagem para LADO_MINIATURA com o Pillow.
+
+    Returns:
+        JPEG da miniatura, ou None sem o Pillow ou se a imagem não abrir
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(dados)) as imagem:
+            imagem = imagem.convert('RGB')
+            imagem.thumbnail((LADO_MINIATURA, LADO_MINIATURA))
+            saida = io.BytesIO()
+            imagem.save(saida, 'JPEG', quality=80, optimize=True)
+            return saida.getvalue()
+    except Exception as e:
+        logger.debug(f"Não foi possível reduzir a imagem: {e}")
+        return None
+
+
+class CacheMiniaturas:
+    """
+    Miniaturas gravadas em disco, com tamanho total limitado (LRU).
+
+    A ordem de uso fica em memória e é reconstruída pela data de modificação
+    dos arquivos, atualizada a cada acerto, ao reabrir a pasta.
+    """
+
+    def __init__(self, pasta: str = PASTA_MINIATURAS, limite_bytes: int = LIMITE_CACHE_MINIATURAS):
+        self.pasta = pasta
+        self.limite_bytes = limite_bytes
+        os.makedirs(pasta, exist_ok=True)
+
+        # chave -> (nome do arquivo, tamanho), do menos para o mais usado
+        self._arquivos: 'OrderedDict[str, Tuple[str, int]]' = OrderedDict()
+        self._tamanho_total = 0
+        self._lock = threading.Lock()
+        # Downloads em andamento, para pedidos simultâneos da mesma imagem
+        self._baixando: Dict[str, threading.Event] = {}
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+        entradas = []
+        for nome in os.listdir(pasta):
+            chave, extensao = os.path.splitext(nome)
+            if extensao not in MIMETYPES:
+                continue
+            info = os.stat(os.path.join(pasta, nome))
+            entradas.append((info.st_mtime, chave, nome, info.st_size))
+        for _, chave, nome, tamanho in sorted(entradas):
+            self._arquivos[chave] = (nome, tamanho)
+            self._tamanho_total += tamanho
+        with self._lock:
+            self._remover_excedente()
+
+    def _ler(self, chave: str) -> Optional[Tuple[bytes, str]]:
+        with self._lock:
+            entrada = self._arquivos.get(chave)
+            if entrada is None:
+                return None
+            self._arquivos.move_to_end(chave)
+        nome, _ = entrada
+        caminho = os.path.join(self.pasta, nome)
+        try:
+            with open(caminho, 'rb') as f:
+                dados = f.read()
+            os.utime(caminho)
+        except OSError:
+            # Removido por fora ou pela expulsão de outra thread
+            with self._lock:
+                if self._arquivos.get(chave) == entrada:
+                    del self._arquivos[chave]
+                    self._tamanho_total -= entrada[1]
+            return None
+        return dados, MIMETYPES[os.path.splitext(nome)[1]]
+
+    def _baixar(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Baixa a variante menor da imagem (ou a original, se ela não existir).
+        """
+        for endereco in dict.fromkeys((url_reduzida(url), url)):
+            try:
+                with obter_sessao().get(endereco, timeout=TIMEOUT_HTTP, stream=True,
+                                        headers={'Accept': 'image/avif,image/webp,image/*;q=0.8'}) as resposta:
+                    mimetype = resposta.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if resposta.status_code != 200 or mimetype not in EXTENSOES:
+                        logger.debug(f"Imagem indisponível ({resposta.status_code}, {mimetype}): {endereco}")
+                        continue
+                    dados = resposta.raw.read(TAMANHO_MAXIMO_IMAGEM + 1, decode_content=True)
+            except requests.RequestException as e:
+                logger.debug(f"Erro ao baixar a imagem {endereco}: {e}")
+                continue
+            if len(dados) > TAMANHO_MAXIMO_IMAGEM:
+                logger.debug(f"Imagem grande demais: {endereco}")
+                return None
+            return dados, mimetype
+        return None
+
+    def _gravar(self, chave: str, dados: bytes, mimetype: str):
+        nome = chave + EXTENSOES[mimetype]
+        caminho = os.path.join(self.pasta, nome)
+        temporario = f'{caminho}.{threading.get_ident()}.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+
+        with self._lock:
+            anterior = self._arquivos.pop(chave, None)
+            if anterior is not None:
+                self._tamanho_total -= anterior[1]
+            self._arquivos[chave] = (nome, len(dados))
+            self._tamanho_total += len(dados)
+            self._remover_excedente()
+
+    def _remover_excedente(self):
+        """
+        Apaga as miniaturas usadas há mais tempo até caber no limite.
+        Chamado com o lock adquirido.
+        """
+        while self._tamanho_total > self.limite_bytes and len(self._arquivos) > 1:
+            _, (nome, tamanho) = self._arquivos.popitem(last=False)
+            self._tamanho_total -= tamanho
+            self.remocoes += 1
+            try:
+                os.remove(os.path.join(self.pasta, nome))
+            except OSError:
+                pass
+
+    def obter(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """
+        Retorna a miniatura da imagem, baixando-a na primeira vez.
+
+        Args:
+            url: Link da imagem como veio da busca
+
+        Returns:
+            Tupla (bytes, mimetype), ou None se a imagem não pôde ser baixada
+
+        Raises:
+            ValueError: Se a URL não for de uma CDN dos marketplaces
+        """
+        validar_url(url)
+        chave = chave_miniatura(url)
+
+        while True:
+            encontrado = self._ler(chave)
+            if encontrado is not None:
+                with self._lock:
+                    self.acertos += 1
+                return encontrado
+
+            with self._lock:
+                evento = self._baixando.get(chave)
+                if evento is None:
+                    evento = self._baixando[chave] = threading.Event()
+                    break
+            # Outra thread já está baixando a mesma imagem: esperar e reler
+            evento.wait(TIMEOUT_HTTP * 2)
+            if chave not in self._arquivos:
+                return None
+
+        try:
+            with self._lock:
+                self.falhas += 1
+            baixado = self._baixar(url)
+            if baixado is None:
+                return None
+            dados, mimetype = baixado
+            reduzido = reduzir(dados)
+            if reduzido is not None:
+                dados, mimetype = reduzido, 'image/jpeg'
+            self._gravar(chave, dados, mimetype)
+            return dados, mimetype
+        finally:
+            with self._lock:
+                del self._baixando[chave]
+            evento.set()
+
+    def estatisticas(self) -> Dict:
+        """
+        Acertos, falhas, remoções e ocupação da pasta de miniaturas.
+        """
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'remocoes': self.remocoes,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+                'entradas': len(self._arquivos),
+                'tamanho_bytes': self._tamanho_total,
+                'limite_bytes': self.limite_bytes,
+                'redimensiona': Image is not None,
+            }
@@ -0,0 +1,386 @@
+"""
+Monitoramento contínuo: busca de novo só os termos cujo intervalo venceu.
+
+Cada termo da lista de monitoramento (monitoramento.json) tem seu próprio
+intervalo de atualização e uma prioridade:
+
+    [
+        {"termo": "brigadeiro", "intervalo_minutos": 30, "prioridade": 2},
+        {"termo": "chocolate em pó", "intervalo_minutos": 240},
+        "granulado"
+    ]
+
+Sem o arquivo, todos os termos de inputs.txt entram com o intervalo padrão.
+
+O tempo de cada termo é dividido em janelas do tamanho do intervalo, e o
+início das janelas é deslocado por um valor fixo derivado do próprio termo,
+então termos com o mesmo intervalo vencem espalhados ao longo dele e não
+todos no mesmo instante. A cada ciclo (1 minuto por padrão) o agendador
+pega os termos vencidos, por prioridade e depois pelo atraso, até o máximo
+por ciclo necessário para dar conta da lista (com folga): uma fila
+acumulada, como a de um servidor que ficou parado, é esvaziada aos poucos.
+
+O estado fica em monitoramento.sqlite3. Um termo é reservado antes da
+busca e marcado como concluído só quando todos os marketplaces terminam,
+então rodar o ciclo de novo (ou dois processos ao mesmo tempo) não repete
+um termo já atualizado na janela. Uma busca que desiste (bloqueio,
+captcha) não substitui o último resultado bom do termo, e o termo é
+liberado para o ciclo seguinte. Janelas perdidas enquanto nada rodava
+viram uma única busca.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import main
+from armazem_resultados import ArmazemResultados
+from cache_resultados import CacheResultados, normalizar_termo
+from comparacao import ARQUIVO_COMPARACAO
+from historico_precos import HistoricoPrecos
+from limitador import LimitadorAdaptativo, PoliticaRetentativa
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_MONITORAMENTO = 'monitoramento.json'
+CAMINHO_ESTADO = 'monitoramento.sqlite3'
+
+INTERVALO_PADRAO_MINUTOS = 60
+
+# Segundos entre ciclos do agendador
+CICLO_PADRAO = 60
+
+# Quantas vezes a vazão necessária o agendador pode buscar por ciclo
+FOLGA_VAZAO = 2
+
+# Intervalo mínimo entre duas buscas do mesmo termo, como fração do intervalo
+# (uma busca atrasada não é seguida logo depois pela da janela seguinte)
+FRACAO_MINIMA_ENTRE_BUSCAS = 0.5
+
+# Tempo máximo de uma reserva; depois disso outro processo pode assumir o termo
+DURACAO_RESERVA = 30 * 60
+
+
+@dataclass(frozen=True)
+class TermoMonitorado:
+    """
+    Um termo da lista de monitoramento.
+    """
+
+    termo: str
+    # Intervalo de atualização (segundos)
+    intervalo: float
+    # Maior primeiro quando há mais termos vencidos que vagas no ciclo
+    prioridade: int = 0
+
+    @property
+    def chave(self) -> str:
+        return normalizar_termo(self.termo)
+
+    @property
+    def fase(self) -> float:
+        """
+        Deslocamento fixo das janelas do termo, entre 0 e o intervalo.
+        """
+        resumo = hashlib.sha1(self.chave.encode('utf-8')).digest()
+        return int.from_bytes(resumo[:8], 'big') / 2 ** 64 * self.intervalo
+
+    def inicio_janela(self, agora: float) -> float:
+        """
+        Início da janela em andamento em `agora` (epoch).
+        """
+        return agora - (agora - self.fase) % self.intervalo
+
+    def vencido(self, ultima_busca: Optional[float], agora: float) -> bool:
+        """
+        Se o termo precisa ser buscado: nunca foi, ou a última busca é de
+        uma janela anterior (várias janelas perdidas contam como uma).
+        """
+        if ultima_busca is None:
+            return True
+        return (ultima_busca < self.inicio_janela(agora)
+                and agora - ultima_busca >= self.intervalo * FRACAO_MINIMA_ENTRE_BUSCAS)
+
+
+def ler_lista_monitoramento(arquivo: str = ARQUIVO_MONITORAMENTO,
+                            arquivo_termos: str = 'inputs.txt',
+                            intervalo_padrao_minutos: float = INTERVALO_PADRAO_MINUTOS) -> List[TermoMonitorado]:
+    """
+    Lê a lista de monitoramento (ou usa os termos de inputs.txt).
+
+    Args:
+        arquivo: JSON com a lista (ver docstring do módulo)
+        arquivo_termos: Termos usados quando `arquivo` não existe
+        intervalo_padrao_minutos: Intervalo dos termos que não informam o seu
+
+    Returns:
+        Termos sem repetição (vale a primeira ocorrência)
+
+    Raises:
+        ValueError: Se alguma entrada da lista for inválida
+    """
+    if os.path.exists(arquivo):
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            entradas = json.load(f)
+        logger.info(f"Lista de monitoramento lida de {arquivo}")
+    else:
+        entradas = main.ler_termos(arquivo_termos)
+
+    termos: Dict[str, TermoMonitorado] = {}
+    for entrada in entradas:
+        if isinstance(entrada, str):
+            entrada = {'termo': entrada}
+        try:
+            termo = TermoMonitorado(
+                termo=entrada['termo'].strip(),
+                intervalo=float(entrada.get('intervalo_minutos', intervalo_padrao_minutos)) * 60,
+                prioridade=int(entrada.get('prioridade', 0)),
+            )
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f'Entrada inválida na lista de monitoramento: {entrada!r}') from e
+        if not termo.termo or termo.intervalo <= 0:
+            raise ValueError(f'Entrada inválida na lista de monitoramento: {entrada!r}')
+        termos.setdefault(termo.chave, termo)
+    return list(termos.values())
+
+
+class EstadoMonitoramento:
+    """
+    Última busca concluída e reserva em andamento de cada termo (SQLite).
+
+    Uso:
+        estado = EstadoMonitoramento()
+        if estado.reservar(termo, agora):
+            ...  # buscar
+            estado.concluir(termo.chave, time.time())
+    """
+
+    def __init__(self, caminho: str = CAMINHO_ESTADO):
+        self.caminho = caminho
+        with self._conectar() as conexao:
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('''
+                CREATE TABLE IF NOT EXISTS termos (
+                    chave TEXT PRIMARY KEY,
+                    termo TEXT NOT NULL,
+                    ultima_busca REAL,
+                    reservado_ate REAL,
+                    buscas INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """
+        Abre uma conexão, faz commit ao final do bloco e a fecha.
+        """
+        conexao = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def ultimas_buscas(self) -> Dict[str, float]:
+        """
+        Chave do termo -> instante (epoch) da última busca concluída.
+        """
+        with self._conectar() as conexao:
+            return dict(conexao.execute(
+                'SELECT chave, ultima_busca FROM termos WHERE ultima_busca IS NOT NULL'
+            ))
+
+    def reservar(self, termo: TermoMonitorado, agora: float) -> bool:
+        """
+        Reserva o termo para busca se ele ainda estiver vencido e livre.
+
+        Returns:
+            True se a reserva foi feita por esta chamada
+        """
+        with self._conectar() as conexao:
+            conexao.execute('INSERT OR IGNORE INTO termos (chave, termo) VALUES (?, ?)',
+                            (termo.chave, termo.termo))
+            ultima, reservado_ate = conexao.execute(
+                'SELECT ultima_busca, reservado_ate FROM termos WHERE chave = ?', (termo.chave,)
+            ).fetchone()
+            if not termo.vencido(ultima, agora) or (reservado_ate is not None and reservado_ate > agora):
+                return False
+            # Condicional ao valor lido: duas reservas simultâneas não passam as duas
+            cursor = conexao.execute(
+                'UPDATE termos SET reservado_ate = ?, termo = ? WHERE chave = ? '
+                'AND ultima_busca IS ? AND reservado_ate IS ?',
+                (agora + DURACAO_RESERVA, termo.termo, termo.chave, ultima, reservado_ate)
+            )
+            return cursor.rowcount == 1
+
+    def concluir(self, chave: str, agora: float):
+        with self._conectar() as conexao:
+            conexao.execute(
+                'UPDATE termos SET ultima_busca = ?, reservado_ate = NULL, buscas = buscas + 1 '
+                'WHERE chave = ?', (agora, chave)
+            )
+
+    def liberar(self, chave: str):
+        """
+        Desfaz a reserva de um termo que não terminou (ele continua vencido).
+        """
+        with self._conectar() as conexao:
+            conexao.execute('UPDATE termos SET reservado_ate = NULL WHERE chave = ?', (chave,))
+
+
+class AgendadorMonitoramento:
+    """
+    Escolhe, a cada ciclo, os termos vencidos a buscar.
+
+    Uso:
+        agendador = AgendadorMonitoramento(ler_lista_monitoramento(), EstadoMonitoramento())
+        termos = agendador.reservar_vencidos(time.time())
+    """
+
+    def __init__(self, termos: List[TermoMonitorado], estado: EstadoMonitoramento,
+                 ciclo: float = CICLO_PADRAO, maximo_por_ciclo: Optional[int] = None):
+        """
+        Args:
+            termos: Lista de monitoramento
+            estado: Estado persistente das buscas
+            ciclo: Segundos entre ciclos
+            maximo_por_ciclo: Termos por ciclo; se omitido, FOLGA_VAZAO vezes
+                a média necessária para atualizar todos no seu intervalo
+        """
+        self.termos = termos
+        self.estado = estado
+        self.ciclo = ciclo
+        if maximo_por_ciclo is None:
+            vazao = sum(ciclo / termo.intervalo for termo in termos)
+            maximo_por_ciclo = max(1, math.ceil(FOLGA_VAZAO * vazao))
+        self.maximo_por_ciclo = maximo_por_ciclo
+
+    def vencidos(self, agora: float) -> List[TermoMonitorado]:
+        """
+        Termos vencidos em ordem de atendimento: maior prioridade primeiro e,
+        entre iguais, o atualizado há mais tempo (os nunca buscados antes).
+        """
+        ultimas = self.estado.ultimas_buscas()
+        vencidos = [termo for termo in self.termos if termo.vencido(ultimas.get(termo.chave), agora)]
+        vencidos.sort(key=lambda termo: (-termo.prioridade, ultimas.get(termo.chave, float('-inf'))))
+        return vencidos
+
+    def reservar_vencidos(self, agora: float) -> List[TermoMonitorado]:
+        """
+        Reserva até maximo_por_ciclo termos vencidos.
+        """
+        reservados = []
+        for termo in self.vencidos(agora):
+            if len(reservados) >= self.maximo_por_ciclo:
+                break
+            if self.estado.reservar(termo, agora):
+                reservados.append(termo)
+        return reservados
+
+
+def executar_ciclo(agendador: AgendadorMonitoramento, armazem: ArmazemResultados,
+                   usar_http: bool = True, cache: Optional[CacheResultados] = None,
+                   historico: Optional[HistoricoPrecos] = None,
+                   limite: int = main.LIMITE_PADRAO,
+                   limitador: Optional[LimitadorAdaptativo] = None,
+                   politica: Optional[PoliticaRetentativa] = None) -> int:
+    """
+    Busca os termos vencidos agora e atualiza os arquivos de resultado.
+
+    Cada lote substitui o anterior do mesmo par no armazém (vale o mais
+    recente); o resultado.json, o Excel e a comparação são regerados com
+    todos os termos monitorados.
+
+    Returns:
+        Quantidade de termos buscados
+    """
+    termos = agendador.reservar_vencidos(time.time())
+    if not termos:
+        return 0
+
+    logger.info(f"Monitoramento: {len(termos)} termo(s) vencido(s): {', '.join(t.termo for t in termos)}")
+    marketplaces_por_termo = len(main.BUSCADORES)
+    concluidos: Dict[str, int] = {}
+    pendentes = {termo.chave for termo in termos}
+
+    def ao_concluir_lote(termo: str, marketplace: str, produtos: Optional[List]):
+        if produtos is None:
+            # Busca que desistiu: o último lote bom do par continua no armazém
+            # e o termo é liberado no finally, para ser tentado de novo
+            return
+        armazem.gravar_lote(termo, marketplace, produtos)
+        chave = normalizar_termo(termo)
+        concluidos[chave] = concluidos.get(chave, 0) + 1
+        if concluidos[chave] == marketplaces_por_termo:
+            agendador.estado.concluir(chave, time.time())
+            pendentes.discard(chave)
+
+    try:
+        # O monitoramento quer o preço de agora: o cache só recebe o resultado
+        main.processar_termos(
+            [termo.termo for termo in termos],
+            usar_http=usar_http,
+            cache=cache,
+            forcar_atualizacao=True,
+            ao_concluir_lote=ao_concluir_lote,
+            historico=historico,
+            limite=limite,
+            limitador=limitador,
+            politica=politica,
+        )
+    finally:
+        for chave in pendentes:
+            agendador.estado.liberar(chave)
+
+    if armazem.precisa_compactar():
+        armazem.compactar()
+    main.exportar_armazem(armazem, "resultado.xlsx", "resultado.json",
+                          ordem_termos=[termo.termo for termo in agendador.termos],
+                          arquivo_comparacao=ARQUIVO_COMPARACAO)
+    return len(termos)
+
+
+def monitorar(termos: List[TermoMonitorado], ciclo: float = CICLO_PADRAO,
+              maximo_por_ciclo: Optional[int] = None, uma_vez: bool = False,
+              usar_http: bool = True, usar_cache: bool = True, usar_historico: bool = True,
+              limite: int = main.LIMITE_PADRAO, caminho_estado: str = CAMINHO_ESTADO):
+    """
+    Roda o agendador até ser interrompido (Ctrl+C), ou um único ciclo.
+
+    Args:
+        termos: Lista de monitoramento
+        ciclo: Segundos entre ciclos
+        maximo_por_ciclo: Termos por ciclo (ver AgendadorMonitoramento)
+        uma_vez: Roda um ciclo e retorna (para chamar de um cron)
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        usar_cache: Se os resultados devem ser gravados no cache
+        usar_historico: Se preços e posições devem ir para o histórico
+        limite: Produtos por termo e marketplace
+        caminho_estado: Arquivo SQLite do estado do monitoramento
+    """
+    agendador = AgendadorMonitoramento(termos, EstadoMonitoramento(caminho_estado), ciclo, maximo_por_ciclo)
+    armazem = ArmazemResultados()
+    cache = CacheResultados() if usar_cache else None
+    historico = HistoricoPrecos() if usar_historico else None
+    # O ritmo aprendido por domínio vale para os ciclos seguintes
+    limitador = LimitadorAdaptativo()
+    politica = PoliticaRetentativa()
+
+    logger.info(
+        f"Monitorando {len(termos)} termo(s), ciclo de {ciclo:.0f}s, "
+        f"até {agendador.maximo_por_ciclo} termo(s) por ciclo"
+    )
+    while True:
+        inicio = time.time()
+        executar_ciclo(agendador, armazem, usar_http=usar_http, cache=cache, historico=historico,
+                       limite=limite, limitador=limitador, politica=politica)
+        if uma_vez:
+            return
+        time.sleep(max(0.0, inicio + ciclo - time.time()))
@@ -0,0 +1,269 @@
+"""
+Pool de navegador Chromium compartilhado entre todas as buscas de uma execução.
+
+Abrir um Chromium por chamada custa mais do que o próprio scraping em lotes
+grandes de termos. O pool mantém um único navegador vivo durante o job e
+entrega um contexto novo (cookies e cache isolados) para cada busca.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager, asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator
+
+from metricas import medir
+
+if TYPE_CHECKING:
+    # O Playwright só é importado quando um navegador é lançado: buscas
+    # atendidas pelo cache ou pela camada HTTP não pagam a importação
+    from playwright.sync_api import Page
+    from playwright.async_api import Page as PageAsync
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class PoolNavegador:
+    """
+    Mantém um Chromium aberto e entrega páginas em contextos descartáveis.
+
+    O navegador é reciclado (fechado e relançado) depois de `max_usos`
+    contextos entregues ou quando uma página/navegador cai.
+
+    Uso:
+        with PoolNavegador(max_usos=50) as pool:
+            with pool.pagina() as page:
+                page.goto(...)
+    """
+
+    def __init__(self, max_usos: int = 50, headless: bool = True):
+        """
+        Args:
+            max_usos: Quantidade de contextos entregues antes de relançar o navegador
+            headless: Se o Chromium deve rodar sem interface
+        """
+        self.max_usos = max_usos
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._usos = 0
+        self._falhou = False
+        self.lancamentos = 0
+
+    def __enter__(self) -> "PoolNavegador":
+        # O navegador só é lançado na primeira página pedida, para que falhas de
+        # lançamento caiam no tratamento de erro de quem fez a busca
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
+
+    def iniciar(self):
+        """
+        Inicia o Playwright e lança o navegador.
+        """
+        if self._playwright is None:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+        self._lancar()
+
+    def fechar(self):
+        """
+        Fecha o navegador e encerra o Playwright.
+        """
+        self._fechar_navegador()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"Erro ao encerrar o Playwright: {e}")
+            self._playwright = None
+
+    def _lancar(self):
+        with medir('lancamento'):
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+        self._browser.on("disconnected", self._marcar_falha)
+        self._usos = 0
+        self._falhou = False
+        self.lancamentos += 1
+        logger.info(f"Navegador iniciado (lançamento {self.lancamentos})")
+
+    def _fechar_navegador(self):
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception as e:
+                logger.warning(f"Erro ao fechar o navegador: {e}")
+            self._browser = None
+
+    def _marcar_falha(self, *_):
+        self._falhou = True
+
+    def _precisa_reciclar(self) -> bool:
+        return (
+            self._browser is None
+            or self._falhou
+            or not self._browser.is_connected()
+            or self._usos >= self.max_usos
+        )
+
+    @contextmanager
+    def pagina(self) -> Iterator['Page']:
+        """
+        Entrega uma página em um contexto novo e fecha o contexto ao final.
+
+        Se o navegador atingiu o limite de usos ou caiu, ele é relançado antes
+        de criar o contexto.
+
+        Yields:
+            Página do Playwright pronta para navegação
+        """
+        if self._playwright is None:
+            self.iniciar()
+        elif self._precisa_reciclar():
+            logger.info("Reciclando navegador...")
+            self._fechar_navegador()
+            self._lancar()
+
+        self._usos += 1
+        context = self._browser.new_context(user_agent=USER_AGENT)
+        page = context.new_page()
+        page.on("crash", self._marcar_falha)
+
+        try:
+            yield page
+        finally:
+            try:
+                context.close()
+            except Exception:
+                # Contexto inacessível: o navegador provavelmente caiu
+                self._marcar_falha()
+
+
+class PoolNavegadorAsync:
+    """
+    Versão assíncrona do PoolNavegador, para o motor concorrente.
+
+    Várias páginas podem estar abertas ao mesmo tempo. Quando o navegador
+    precisa ser reciclado, um novo é lançado para os próximos pedidos e o
+    antigo só é fechado depois que seus contextos em uso terminam.
+
+    Uso:
+        async with PoolNavegadorAsync(max_usos=50) as pool:
+            async with pool.pagina() as page:
+                await page.goto(...)
+    """
+
+    def __init__(self, max_usos: int = 50, headless: bool = True):
+        """
+        Args:
+            max_usos: Quantidade de contextos entregues antes de relançar o navegador
+            headless: Se o Chromium deve rodar sem interface
+        """
+        self.max_usos = max_usos
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._usos = 0
+        self._falhou = False
+        self._ativos: Dict = {}
+        self._lock = asyncio.Lock()
+        self.lancamentos = 0
+
+    async def __aenter__(self) -> "PoolNavegadorAsync":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.fechar()
+
+    async def fechar(self):
+        """
+        Fecha todos os navegadores abertos e encerra o Playwright.
+        """
+        for browser in list(self._ativos):
+            await self._fechar_navegador(browser)
+        self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"Erro ao encerrar o Playwright: {e}")
+            self._playwright = None
+
+    async def _lancar(self):
+        with medir('lancamento'):
+            browser = await self._playwright.chromium.launch(headless=self.headless)
+        browser.on("disconnected", lambda *_: self._marcar_falha(browser))
+        self._browser = browser
+        self._ativos[browser] = 0
+        self._usos = 0
+        self._falhou = False
+        self.lancamentos += 1
+        logger.info(f"Navegador iniciado (lançamento {self.lancamentos})")
+
+    async def _fechar_navegador(self, browser):
+        self._ativos.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.warning(f"Erro ao fechar o navegador: {e}")
+
+    def _marcar_falha(self, browser):
+        # Falhas de um navegador já substituído não afetam o atual
+        if browser is self._browser:
+            self._falhou = True
+
+    def _precisa_reciclar(self) -> bool:
+        return (
+            self._browser is None
+            or self._falhou
+            or not self._browser.is_connected()
+            or self._usos >= self.max_usos
+        )
+
+    @asynccontextmanager
+    async def pagina(self) -> AsyncIterator['PageAsync']:
+        """
+        Entrega uma página em um contexto novo e fecha o contexto ao final.
+
+        Yields:
+            Página assíncrona do Playwright pronta para navegação
+        """
+        async with self._lock:
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            if self._precisa_reciclar():
+                antigo = self._browser
+                await self._lancar()
+                if antigo is not None and self._ativos.get(antigo) == 0:
+                    await self._fechar_navegador(antigo)
+            browser = self._browser
+            self._usos += 1
+            self._ativos[browser] += 1
+
+        try:
+            context = await browser.new_context(user_agent=USER_AGENT)
+        except Exception:
+            self._ativos[browser] -= 1
+            self._marcar_falha(browser)
+            raise
+
+        try:
+            page = await context.new_page()
+            page.on("crash", lambda *_: self._marcar_falha(browser))
+            yield page
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                self._marcar_falha(browser)
+            if browser in self._ativos:
+                self._ativos[browser] -= 1
+                # Navegador substituído que não tem mais contextos em uso
+                if browser is not self._browser and self._ativos[browser] == 0:
+                    await self._fechar_navegador(browser)
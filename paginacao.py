@@ -0,0 +1,231 @@
+"""
+Coleta de várias páginas de resultado de uma mesma busca.
+
+Quando o `limite` pedido passa do que cabe na primeira página, as páginas
+seguintes são lidas até juntar `limite` produtos únicos. O conjunto de links
+já vistos é compartilhado entre as páginas, então um anúncio repetido na
+página 2 não ocupa posição de novo.
+
+Enquanto a página atual é carregada/processada, a próxima já é baixada em
+segundo plano pela camada HTTP, mas só quando ela certamente (ou
+provavelmente) será necessária; a coleta para assim que o limite é atingido,
+quando uma página não traz nenhum produto novo ou quando ela é curta (menos
+cards que Marketplace.itens_por_pagina, a última dos resultados). Se a
+primeira página veio da camada HTTP, uma página seguinte sem cards também é
+o fim dos resultados: o navegador não é lançado só para confirmar isso.
+
+O ritmo da primeira página é controlado por quem chama (processar_termos);
+as seguintes, inclusive as baixadas em segundo plano, reservam a própria vez
+no mesmo limitador, e um bloqueio nelas é informado a ele na hora.
+
+Se o site bloquear qualquer página (status 429/503) ou o navegador falhar
+na primeira, ErroBusca é levantado para que a busca seja reagendada; erros
+do navegador em páginas seguintes só encerram a coleta com o que já foi
+obtido.
+"""
+
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Optional
+
+from http_rapido import buscar_cards_http, BloqueioHttp, FONTE_HTTP, FONTE_NAVEGADOR
+from limitador import LimitadorAdaptativo, RESULTADO_BLOQUEIO, RESULTADO_ERRO
+from marketplaces import obter_marketplace
+from metricas import medir
+from navegador import PoolNavegador
+from produto import Produto
+
+logger = logging.getLogger(__name__)
+
+# Teto de páginas por busca, para termos com limite muito alto
+MAX_PAGINAS = 10
+
+
+class ErroBusca(Exception):
+    """
+    A busca não pôde ser concluída e deve ser refeita mais tarde.
+    """
+
+    def __init__(self, marketplace: str, termo: str, motivo: str, mensagem: str,
+                 registrado: bool = False):
+        """
+        Args:
+            marketplace: Marketplace da busca
+            termo: Termo de busca
+            motivo: RESULTADO_BLOQUEIO ou RESULTADO_ERRO (ver limitador.py)
+            mensagem: Descrição da falha
+            registrado: True se a falha já foi informada ao limitador
+        """
+        super().__init__(f"{marketplace} - {termo}: {mensagem}")
+        self.marketplace = marketplace
+        self.termo = termo
+        self.motivo = motivo
+        self.registrado = registrado
+
+
+def precisa_proxima_pagina(marketplace: str, coletados: int, limite: int,
+                           cards_pagina_atual: Optional[int] = None) -> bool:
+    """
+    Decide se vale buscar a próxima página antes de terminar a atual.
+
+    Args:
+        marketplace: Marketplace da busca
+        coletados: Produtos únicos já coletados nas páginas anteriores
+        limite: Total de produtos pedido
+        cards_pagina_atual: Cards da página atual, se já conhecidos; senão
+            usa a estimativa Marketplace.itens_por_pagina
+
+    Returns:
+        True se a página atual não deve bastar para chegar ao limite e
+        ainda não é a última dos resultados
+    """
+    itens_por_pagina = obter_marketplace(marketplace).itens_por_pagina
+    if cards_pagina_atual is None:
+        esperados = itens_por_pagina
+    elif cards_pagina_atual < itens_por_pagina:
+        # Página curta: não há próxima
+        return False
+    else:
+        esperados = cards_pagina_atual
+    return coletados + esperados < limite
+
+
+def baixar_pagina(marketplace: str, url: str,
+                  limitador: Optional[LimitadorAdaptativo] = None) -> Optional[List[Dict]]:
+    """
+    buscar_cards_http() de uma página seguinte, na vez do domínio no limitador.
+
+    Args:
+        marketplace: Nome de um marketplace registrado (ex.: 'Amazon BR')
+        url: URL da página
+        limitador: Ritmo por domínio (sem ele, a página é baixada na hora)
+
+    Returns:
+        Lote de cards, ou None se o HTML não trouxer os cards
+
+    Raises:
+        BloqueioHttp: Status 429/503, já registrado no limitador
+    """
+    if limitador is None:
+        return buscar_cards_http(marketplace, url)
+    dominio = obter_marketplace(marketplace).dominio
+    limitador.aguardar(dominio)
+    try:
+        return buscar_cards_http(marketplace, url)
+    except BloqueioHttp:
+        limitador.registrar(dominio, RESULTADO_BLOQUEIO)
+        raise
+
+
+def coletar_paginas(marketplace: str, termo: str, limite: int,
+                    url_pagina: Callable[[int], str],
+                    normalizar: Callable[..., List[Produto]],
+                    cards_navegador: Callable[[PoolNavegador, str, str], List[Dict]],
+                    pool: Optional[PoolNavegador] = None,
+                    usar_http: bool = True,
+                    limitador: Optional[LimitadorAdaptativo] = None) -> List[Produto]:
+    """
+    Percorre as páginas de uma busca até juntar `limite` produtos únicos.
+
+    Cada página tenta primeiro a camada HTTP (possivelmente já baixada em
+    segundo plano) e, se o HTML não trouxer os cards, usa o navegador (só
+    na primeira página, quando ela veio da camada HTTP).
+
+    Args:
+        marketplace: Nome de um marketplace registrado (ex.: 'Amazon BR')
+        termo: Termo de busca
+        limite: Número máximo de produtos a retornar
+        url_pagina: Monta a URL da página n (a partir de 1)
+        normalizar: Marketplace.normalizar do marketplace
+        cards_navegador: Carrega uma URL no navegador e devolve os cards
+        pool: Pool de navegador compartilhado; se omitido, um temporário é
+            lançado só se alguma página precisar do navegador
+        usar_http: Se a camada HTTP deve ser tentada antes do navegador
+        limitador: Ritmo por domínio, respeitado a partir da página 2
+
+    Returns:
+        Lista de produtos com posições contínuas entre as páginas
+
+    Raises:
+        ErroBusca: Em bloqueio do site ou se a primeira página não puder ser obtida
+    """
+    produtos: List[Produto] = []
+    vistos = set()
+    fontes = set()
+    paginas_lidas = 0
+    itens_por_pagina = obter_marketplace(marketplace).itens_por_pagina
+    dominio = obter_marketplace(marketplace).dominio
+    # Só o download HTTP roda em segundo plano: a API síncrona do Playwright
+    # precisa ser usada sempre pela mesma thread
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch-pagina')
+    proxima: Optional[Future] = None
+
+    with ExitStack() as recursos:
+        try:
+            for pagina in range(1, MAX_PAGINAS + 1):
+                url = url_pagina(pagina)
+
+                cards = None
+                if usar_http:
+                    try:
+                        if proxima is not None:
+                            cards = proxima.result()
+                        elif pagina == 1:
+                            cards = buscar_cards_http(marketplace, url)
+                        else:
+                            cards = baixar_pagina(marketplace, url, limitador)
+                    except BloqueioHttp as e:
+                        # Bloqueio em qualquer página: refazer a busca inteira mais tarde
+                        raise ErroBusca(marketplace, termo, RESULTADO_BLOQUEIO, f"{e} (página {pagina})",
+                                        registrado=pagina > 1 and limitador is not None) from e
+                proxima = None
+
+                # Pedir a próxima página já, se esta não deve bastar
+                if usar_http and pagina < MAX_PAGINAS and precisa_proxima_pagina(
+                        marketplace, len(produtos), limite, len(cards) if cards is not None else None):
+                    # Copiar o contexto para que as medições do download fiquem
+                    # associadas ao termo em andamento
+                    proxima = executor.submit(contextvars.copy_context().run, baixar_pagina,
+                                              marketplace, url_pagina(pagina + 1), limitador)
+
+                fonte = FONTE_HTTP
+                if cards is None and pagina > 1 and fontes == {FONTE_HTTP}:
+                    # A camada HTTP atendeu a primeira página: sem cards aqui
+                    # é o fim dos resultados, não um HTML que precise do navegador
+                    break
+                if cards is None:
+                    if pool is None:
+                        pool = recursos.enter_context(PoolNavegador())
+                    if pagina > 1 and limitador is not None:
+                        limitador.aguardar(dominio)
+                    try:
+                        cards = cards_navegador(pool, url, termo)
+                    except Exception as e:
+                        if pagina == 1:
+                            raise ErroBusca(marketplace, termo, RESULTADO_ERRO, str(e)) from e
+                        logger.error(f"Erro ao buscar no {marketplace} para '{termo}' (página {pagina}): {e}")
+                        break
+                    fonte = FONTE_NAVEGADOR
+
+                with medir('parsing', marketplace):
+                    novos = normalizar(cards, termo, limite - len(produtos), fonte=fonte,
+                                       vistos=vistos, posicao_inicial=len(produtos) + 1)
+                produtos.extend(novos)
+                fontes.add(fonte)
+                paginas_lidas = pagina
+
+                # Fim dos resultados: página curta ou sem nenhum produto novo
+                if len(produtos) >= limite or not novos or len(cards) < itens_por_pagina:
+                    break
+        finally:
+            # Uma página pedida à toa é descartada sem esperar o download
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    camadas = ' + '.join(sorted('camada HTTP' if f == FONTE_HTTP else 'navegador' for f in fontes))
+    logger.info(
+        f"{marketplace} - {termo}: {len(produtos)} produtos encontrados "
+        f"({paginas_lidas} página(s), {camadas or 'nenhuma camada'})"
+    )
+    return produtos
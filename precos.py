@@ -0,0 +1,150 @@
+"""
+Conversão de textos de preço para float, um a um ou em lote.
+
+As regras são as mesmas do limpar_preco original (valor logo após "R$",
+senão o último número do texto; vírgula decimal no formato brasileiro),
+mas com os padrões compilados uma única vez. Para reprocessar arquivos
+grandes há duas versões em lote que convertem cada texto distinto uma só
+vez: limpar_precos, para listas, e limpar_precos_series, para colunas do
+pandas (fatoração + indexação vetorizada do numpy).
+benchmarks/bench_precos.py confere as três contra o corpus de referência
+(benchmarks/fixtures/precos_golden.json) e mede a vazão de cada uma.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Sequências de números, pontos e vírgulas
+_NUMERO = re.compile(r'[\d\.,]+')
+# Padrão numérico logo após 'R$'
+_APOS_RS = re.compile(r'R\$\s*([\d\.,]+)')
+
+
+def _converter_numero(valor_preco: str) -> float:
+    """
+    Converte o trecho numérico escolhido (ex.: '1.234,56') em float.
+    """
+    # Se tem vírgula, assume formato brasileiro: vírgula é decimal, pontos são milhar
+    if ',' in valor_preco:
+        parte_inteira, _, resto = valor_preco.partition(',')
+        parte_decimal = resto.split(',', 1)[0]
+        return float(f"{parte_inteira.replace('.', '')}.{parte_decimal}")
+
+    # Sem vírgula: um único ponto com 1-2 dígitos depois é decimal (ex: 10.80),
+    # qualquer outro ponto é separador de milhar
+    if '.' in valor_preco:
+        parte_inteira, _, resto = valor_preco.partition('.')
+        if '.' not in resto and len(resto) <= 2:
+            return float(valor_preco)
+        return float(valor_preco.replace('.', ''))
+
+    return float(valor_preco)
+
+
+def limpar_preco(texto: str) -> float:
+    """
+    Limpa e converte texto de preço para float usando regex para ser mais robusta.
+
+    Lida com strings sujas como 'ou R$ 232,19' ou '10x de R$ 50,00'.
+    Busca padrões numéricos e extrai o valor após 'R$' ou o último da string.
+
+    Args:
+        texto: Texto do preço a ser limpo (pode conter texto extra)
+
+    Returns:
+        Valor float do preço, ou 0.0 se não conseguir converter
+    """
+    if not texto:
+        return 0.0
+
+    valor_preco = None
+    if 'R$' in texto:
+        match_rs = _APOS_RS.search(texto)
+        if match_rs:
+            valor_preco = match_rs.group(1)
+
+    if valor_preco is None:
+        # Último padrão numérico (geralmente o valor total/à vista)
+        matches = _NUMERO.findall(texto)
+        if not matches:
+            return 0.0
+        valor_preco = matches[-1]
+
+    try:
+        return _converter_numero(valor_preco)
+    except ValueError:
+        return 0.0
+
+
+def limpar_precos(textos: Iterable[Optional[str]]) -> List[float]:
+    """
+    Converte vários textos de preço de uma vez.
+
+    Textos repetidos (muito comuns em históricos) são convertidos uma vez só.
+
+    Args:
+        textos: Textos de preço (None vira 0.0)
+
+    Returns:
+        Lista de preços na mesma ordem
+    """
+    convertidos: Dict[Optional[str], float] = {}
+    precos = []
+    for texto in textos:
+        preco = convertidos.get(texto)
+        if preco is None:
+            preco = convertidos[texto] = limpar_preco(texto)
+        precos.append(preco)
+    return precos
+
+
+def limpar_precos_series(serie):
+    """
+    Versão de limpar_preco para uma pandas.Series de textos.
+
+    Os textos distintos são fatorados (pd.factorize) e convertidos uma única
+    vez; o resultado é espalhado de volta por indexação do numpy. Em
+    históricos, onde o mesmo preço se repete milhares de vezes, isso evita
+    quase todo o trabalho com regex. Valores ausentes (None/NaN) viram 0.0.
+
+    Args:
+        serie: pandas.Series com os textos de preço
+
+    Returns:
+        pandas.Series de float com o mesmo índice
+    """
+    import numpy as np
+    import pandas as pd
+
+    codigos, distintos = pd.factorize(serie)
+    # Posição extra no fim para os ausentes (código -1)
+    precos_distintos = np.fromiter(
+        (limpar_preco(texto) for texto in distintos), dtype=float, count=len(distintos)
+    )
+    precos_distintos = np.append(precos_distintos, 0.0)
+    return pd.Series(precos_distintos[codigos], index=serie.index, dtype=float)
+
+
+def preco_por_partes(inteiro_texto: Optional[str], centavos_texto: Optional[str]) -> float:
+    """
+    Monta o preço a partir da parte inteira e dos centavos exibidos separadamente.
+
+    Args:
+        inteiro_texto: Parte inteira já sem separadores de milhar (ou None)
+        centavos_texto: Centavos (ou None se o card não exibe centavos)
+
+    Returns:
+        Preço em float, ou 0 se a parte inteira não for numérica
+    """
+    if inteiro_texto is None:
+        return 0
+    try:
+        inteiro = float(inteiro_texto)
+    except ValueError:
+        return 0
+    if centavos_texto is None:
+        return inteiro
+    try:
+        return inteiro + (float(centavos_texto.strip()) / 100)
+    except ValueError:
+        return inteiro
@@ -0,0 +1,148 @@
+"""
+Registro compacto de um produto encontrado e conversão em tabela.
+
+Cada produto era um dicionário de 8 chaves, com o termo e o marketplace
+repetidos em todos. Produto guarda os mesmos campos em slots (sem o
+__dict__ por instância), e termo, marketplace e fonte são internados, então
+todas as linhas de um lote apontam para a mesma string.
+
+O pandas e o numpy só são importados ao montar a tabela: quem só busca e
+grava lotes não paga a importação.
+
+Para exportar, tabela_produtos monta o DataFrame coluna a coluna em uma
+única passada, com termo e marketplace como colunas categóricas (um código
+inteiro por linha), sem a lista intermediária de dicionários.
+"""
+
+import sys
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Colunas de saída (Excel/JSON) e seus nomes amigáveis em português
+COLUNAS_SAIDA = {
+    "termo": "Termo Pesquisado",
+    "marketplace": "Marketplace",
+    "posicao": "Posição no Ranking",
+    "titulo": "Título do Produto",
+    "preco": "Preço",
+    "link": "Link do Produto",
+    "imagem": "Imagem",
+}
+
+
+@dataclass
+class Produto:
+    """
+    Um produto de uma busca (termo, marketplace).
+
+    Uso:
+        produto = Produto('brigadeiro', 'Amazon BR', 1, 'Título', 19.9, link, imagem, FONTE_HTTP)
+        produto.como_dict()          # para gravar em JSON
+        Produto.de_dict(dados)       # ao ler de volta
+    """
+
+    __slots__ = ('termo', 'marketplace', 'posicao', 'titulo', 'preco', 'link', 'imagem', 'fonte')
+
+    termo: str
+    marketplace: str
+    posicao: int
+    titulo: str
+    preco: float
+    link: str
+    imagem: str
+    # Camada que obteve o produto (FONTE_HTTP, FONTE_NAVEGADOR ou FONTE_CACHE)
+    fonte: str
+
+    def __post_init__(self):
+        # Valores repetidos em todas as linhas: uma única cópia de cada
+        self.termo = sys.intern(self.termo)
+        self.marketplace = sys.intern(self.marketplace)
+        self.fonte = sys.intern(self.fonte)
+
+    @classmethod
+    def de_dict(cls, dados: Dict, **alteracoes) -> 'Produto':
+        """
+        Reconstrói um produto gravado com como_dict().
+
+        Args:
+            dados: Dicionário lido do JSON
+            **alteracoes: Campos a substituir (ex.: termo=..., fonte=...)
+        """
+        if alteracoes:
+            dados = {**dados, **alteracoes}
+        return cls(
+            dados['termo'], dados['marketplace'], dados['posicao'], dados['titulo'],
+            dados['preco'], dados['link'], dados.get('imagem') or "", dados.get('fonte') or ""
+        )
+
+    def como_dict(self) -> Dict:
+        """
+        Dicionário com os campos, no formato gravado em JSON (cache e resultado.jsonl).
+        """
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def com_termo(self, termo: str) -> 'Produto':
+        """
+        Cópia do produto com o termo como digitado em outra busca.
+        """
+        return replace(self, termo=termo)
+
+
+def como_dicts(produtos: Iterable[Produto]) -> List[Dict]:
+    """
+    Converte um lote para gravação em JSON.
+    """
+    return [produto.como_dict() for produto in produtos]
+
+
+def _categorica(valores: List[str]) -> 'pd.Categorical':
+    import pandas as pd
+
+    # Categorias na ordem de aparição, a mesma das buscas
+    return pd.Categorical(valores, categories=list(dict.fromkeys(valores)))
+
+
+def tabela_produtos(produtos: Iterable[Produto]) -> 'pd.DataFrame':
+    """
+    Monta a tabela de saída (colunas de COLUNAS_SAIDA) em uma única passada.
+
+    Args:
+        produtos: Produtos em qualquer iterável (uma lista ou um gerador
+            que lê os lotes do disco)
+
+    Returns:
+        DataFrame com termo e marketplace categóricos, posição inteira e
+        preço em ponto flutuante
+    """
+    import numpy as np
+    import pandas as pd
+
+    termos: List[str] = []
+    marketplaces: List[str] = []
+    posicoes: List[int] = []
+    titulos: List[str] = []
+    precos: List[float] = []
+    links: List[str] = []
+    imagens: List[str] = []
+
+    for produto in produtos:
+        termos.append(produto.termo)
+        marketplaces.append(produto.marketplace)
+        posicoes.append(produto.posicao)
+        titulos.append(produto.titulo)
+        precos.append(produto.preco)
+        links.append(produto.link)
+        imagens.append(produto.imagem)
+
+    return pd.DataFrame({
+        'termo': _categorica(termos),
+        'marketplace': _categorica(marketplaces),
+        'posicao': np.array(posicoes, dtype=np.int64),
+        'titulo': titulos,
+        'preco': np.array(precos, dtype=np.float64),
+        'link': links,
+        'imagem': imagens,
+    })
@@ -0,0 +1,296 @@
+"""
+Extração dos cards de uma página de busca a partir de uma especificação
+declarativa de seletores.
+
+Cada campo do card (título, link, preço, imagem...) é uma cadeia de
+seletores CSS alternativos: vale o primeiro que encontrar algo no card. A
+mesma especificação é compilada uma vez para os dois caminhos:
+
+    extrair_html       -> lxml (camada HTTP). Cada seletor da cadeia vira um
+                          único XPath avaliado no documento inteiro, e os
+                          elementos encontrados são distribuídos entre os
+                          cards, em vez de uma consulta por card e seletor.
+    extrair_navegador  -> um único page.evaluate com um script genérico que
+                          recebe a especificação como argumento.
+
+Os dois caminhos contam qual seletor de cada cadeia resolveu o campo.
+Seletores que deixam de acertar (layout antigo do site) saem da frente da
+cadeia: só são tentados nos cards que os seletores vivos não resolveram, e
+voltam para a frente assim que acertam de novo. As contagens são reduzidas
+à metade a cada JANELA_PODA páginas, então um seletor que parou de acertar
+é considerado morto depois de algumas janelas.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cssselect import GenericTranslator
+from lxml import etree
+
+# Páginas entre cada redução das contagens de acertos
+JANELA_PODA = 20
+
+# Parser sem as classes de lxml.html: cada elemento visitado não passa pela
+# busca de classe em Python
+_PARSER_HTML = etree.HTMLParser()
+
+# Script executado no navegador: todos os cards e campos em uma única ida
+SCRIPT_NAVEGADOR = """
+({cards, campos}) => {
+    const elementos = Array.from(document.querySelectorAll(cards));
+    const resultado = elementos.map(() => ({}));
+    const acertos = {};
+    for (const campo of campos) {
+        const contagem = acertos[campo.nome] = {};
+        elementos.forEach((card, i) => {
+            const raiz = campo.escopo ? card.querySelector(campo.escopo) : card;
+            let encontrado = null;
+            if (raiz) {
+                for (const [indice, seletor] of campo.seletores) {
+                    encontrado = raiz.querySelector(seletor);
+                    if (encontrado) {
+                        contagem[indice] = (contagem[indice] || 0) + 1;
+                        break;
+                    }
+                }
+            }
+            resultado[i][campo.nome] = !encontrado ? null
+                : campo.atributo ? encontrado.getAttribute(campo.atributo) : encontrado.innerText;
+        });
+    }
+    return {cards: resultado, acertos};
+}
+"""
+
+
+@dataclass(frozen=True)
+class Campo:
+    """
+    Um campo do card e sua cadeia de seletores alternativos.
+
+    Uso:
+        Campo('link', ('a.poly-component__title', 'a.ui-search-link'), atributo='href')
+        Campo('preco_inteiro', ('.andes-money-amount__fraction',), escopo='.andes-money-amount')
+    """
+
+    nome: str
+    seletores: Tuple[str, ...]
+    # Atributo lido do elemento; None lê o texto (como o innerText do navegador)
+    atributo: Optional[str] = None
+    # Seletor do elemento do card dentro do qual a cadeia é procurada
+    escopo: Optional[str] = None
+
+
+def _xpath_documento(seletor: str) -> etree.XPath:
+    return etree.XPath(GenericTranslator().css_to_xpath(seletor, prefix='descendant-or-self::'))
+
+
+def _texto(elemento) -> Optional[str]:
+    """
+    Aproxima o innerText do navegador: os textos dos descendentes são
+    concatenados como estão (R$<span>10</span> vira "R$10", como no
+    navegador) e os espaços, colapsados.
+    """
+    return ' '.join(''.join(elemento.itertext()).split())
+
+
+def _exteriores(cards: List) -> set:
+    """
+    Ancestrais dos cards que não estão dentro de nenhum card: subindo a
+    partir de um elemento, chegar a um deles significa que não há mais card
+    acima.
+    """
+    cartoes = set(cards)
+    exteriores = set()
+    for card in cards:
+        for ancestral in card.iterancestors():
+            if ancestral in cartoes:
+                break
+            if ancestral in exteriores:
+                break
+            exteriores.add(ancestral)
+    return exteriores
+
+
+def _primeiros_por_raiz(encontrados: Iterable, raizes: Dict, pendentes: set,
+                        exteriores: set) -> Dict[int, object]:
+    """
+    Distribui os elementos encontrados no documento entre os cards.
+
+    Args:
+        encontrados: Elementos em ordem de documento
+        raizes: Elemento raiz -> índices dos cards (um card dentro de outro
+            faz o mesmo elemento pertencer aos dois)
+        pendentes: Cards que ainda não têm o campo
+        exteriores: Elementos fora dos cards, onde a subida para (ver _exteriores)
+
+    Returns:
+        Índice do card -> primeiro elemento encontrado dentro dele
+    """
+    primeiros: Dict[int, object] = {}
+    for elemento in encontrados:
+        for ancestral in elemento.iterancestors():
+            if ancestral in exteriores:
+                break
+            indices = raizes.get(ancestral)
+            if indices is None:
+                continue
+            for indice in indices:
+                if indice in pendentes and indice not in primeiros:
+                    primeiros[indice] = elemento
+    return primeiros
+
+
+class ExtratorCards:
+    """
+    Especificação de cards compilada, com a contagem de acertos por seletor.
+
+    Uso:
+        extrator = ExtratorCards('div.card', [Campo('titulo', ('h2', '.titulo'))])
+        cards = extrator.extrair_html(html)      # [{'titulo': ...}, ...]
+        cards = extrator.extrair_navegador(page)
+    """
+
+    def __init__(self, seletor_cards: str, campos: Iterable[Campo]):
+        self.seletor_cards = seletor_cards
+        self.campos = tuple(campos)
+        self._xpath_cards = _xpath_documento(seletor_cards)
+        self._xpaths = {campo.nome: [_xpath_documento(s) for s in campo.seletores] for campo in self.campos}
+        self._xpaths_escopo = {
+            campo.escopo: _xpath_documento(campo.escopo) for campo in self.campos if campo.escopo
+        }
+
+        # Acertos recentes (reduzidos a cada janela) e totais de cada seletor
+        self._recentes = {campo.nome: [0] * len(campo.seletores) for campo in self.campos}
+        self._totais = {campo.nome: [0] * len(campo.seletores) for campo in self.campos}
+        self._paginas = 0
+        self._lock = threading.Lock()
+
+    def ordem(self, campo: Campo) -> List[int]:
+        """
+        Índices da cadeia na ordem de tentativa: primeiro os seletores que
+        acertaram nas últimas janelas, depois os mortos.
+        """
+        with self._lock:
+            recentes = self._recentes[campo.nome]
+            if self._paginas < JANELA_PODA or not any(recentes):
+                return list(range(len(campo.seletores)))
+            vivos = [i for i, acertos in enumerate(recentes) if acertos]
+            mortos = [i for i, acertos in enumerate(recentes) if not acertos]
+        return vivos + mortos
+
+    def _registrar(self, acertos: Dict[str, Dict[int, int]]):
+        with self._lock:
+            self._paginas += 1
+            reduzir = self._paginas % JANELA_PODA == 0
+            for nome, contagem in acertos.items():
+                recentes, totais = self._recentes[nome], self._totais[nome]
+                for indice, quantidade in contagem.items():
+                    recentes[indice] += quantidade
+                    totais[indice] += quantidade
+                if reduzir:
+                    self._recentes[nome] = [quantidade // 2 for quantidade in recentes]
+
+    def extrair_html(self, html: str) -> List[Dict]:
+        """
+        Extrai os cards de uma página com lxml.
+
+        Args:
+            html: HTML da página de resultados
+
+        Returns:
+            Um dicionário por card, com um valor (ou None) por campo
+        """
+        documento = etree.fromstring(html, _PARSER_HTML)
+        elementos = self._xpath_cards(documento)
+        cards = [dict.fromkeys(self._xpaths) for _ in elementos]
+        raizes_cards: Dict = {}
+        for indice, elemento in enumerate(elementos):
+            raizes_cards.setdefault(elemento, []).append(indice)
+        todos = set(range(len(elementos)))
+        exteriores = _exteriores(elementos)
+
+        # Elemento de escopo de cada card (ex.: o container do preço)
+        raizes_escopo: Dict[str, Dict] = {}
+        for escopo, xpath in self._xpaths_escopo.items():
+            raizes: Dict = {}
+            for indice, elemento in _primeiros_por_raiz(xpath(documento), raizes_cards, todos, exteriores).items():
+                raizes.setdefault(elemento, []).append(indice)
+            raizes_escopo[escopo] = raizes
+
+        acertos: Dict[str, Dict[int, int]] = {}
+        for campo in self.campos:
+            raizes = raizes_escopo[campo.escopo] if campo.escopo else raizes_cards
+            pendentes = {indice for indices in raizes.values() for indice in indices}
+            contagem = acertos[campo.nome] = {}
+            xpaths = self._xpaths[campo.nome]
+            for posicao in self.ordem(campo):
+                if not pendentes:
+                    break
+                primeiros = _primeiros_por_raiz(xpaths[posicao](documento), raizes, pendentes, exteriores)
+                if not primeiros:
+                    continue
+                contagem[posicao] = len(primeiros)
+                for indice, elemento in primeiros.items():
+                    cards[indice][campo.nome] = (
+                        elemento.get(campo.atributo) if campo.atributo else _texto(elemento)
+                    )
+                pendentes.difference_update(primeiros)
+
+        self._registrar(acertos)
+        return cards
+
+    def argumento_navegador(self) -> Dict:
+        """
+        Especificação passada ao SCRIPT_NAVEGADOR, na ordem de tentativa atual.
+        """
+        return {
+            'cards': self.seletor_cards,
+            'campos': [
+                {
+                    'nome': campo.nome,
+                    'seletores': [[i, campo.seletores[i]] for i in self.ordem(campo)],
+                    'atributo': campo.atributo,
+                    'escopo': campo.escopo,
+                }
+                for campo in self.campos
+            ],
+        }
+
+    def concluir_navegador(self, resultado: Dict) -> List[Dict]:
+        """
+        Registra os acertos devolvidos pelo SCRIPT_NAVEGADOR e devolve os cards.
+        """
+        self._registrar({
+            nome: {int(indice): quantidade for indice, quantidade in contagem.items()}
+            for nome, contagem in resultado['acertos'].items()
+        })
+        return resultado['cards']
+
+    def extrair_navegador(self, page) -> List[Dict]:
+        """
+        Extrai os cards da página aberta no navegador (API síncrona).
+        """
+        return self.concluir_navegador(page.evaluate(SCRIPT_NAVEGADOR, self.argumento_navegador()))
+
+    def estatisticas(self) -> Dict:
+        """
+        Acertos de cada seletor por campo e se ele ainda está vivo.
+        """
+        with self._lock:
+            paginas = self._paginas
+            recentes = {nome: list(contagem) for nome, contagem in self._recentes.items()}
+            totais = {nome: list(contagem) for nome, contagem in self._totais.items()}
+        campos = {}
+        for campo in self.campos:
+            podado = paginas >= JANELA_PODA and any(recentes[campo.nome])
+            campos[campo.nome] = [
+                {
+                    'seletor': seletor,
+                    'acertos': totais[campo.nome][i],
+                    'vivo': not podado or bool(recentes[campo.nome][i]),
+                }
+                for i, seletor in enumerate(campo.seletores)
+            ]
+        return {'paginas': paginas, 'campos': campos}
@@ -0,0 +1,250 @@
+"""
+Modo serviço: um processo de longa duração que recebe lotes de termos.
+
+Cada `python main.py` paga a inicialização do Python, as importações e o
+lançamento do navegador antes da primeira busca. No modo serviço
+(python main.py --servico) o processo fica aberto e atende um lote atrás do
+outro, lidos da entrada padrão ou, com --porta, de um socket TCP local
+(127.0.0.1). O navegador, o cache, o histórico e o ritmo aprendido por
+domínio são reaproveitados entre os lotes.
+
+Protocolo: uma linha por lote, em texto ("brigadeiro, granulado") ou em JSON:
+
+    {"termos": ["brigadeiro"], "forcar_atualizacao": false, "limite": 30,
+     "exportar": true, "incluir_produtos": false}
+
+e uma linha JSON de resposta por lote:
+
+    {"status": "ok", "termos": 1, "produtos": 60, "segundos": 4.2, ...}
+    {"status": "erro", "mensagem": "..."}
+
+O log vai para a saída de erro; na entrada padrão, a saída padrão só traz
+as respostas.
+
+Uso:
+    echo "brigadeiro, granulado" | python main.py --servico
+    python main.py --servico --porta 8765
+    enviar_lote(['brigadeiro'], porta=8765)
+"""
+
+import io
+import json
+import logging
+import socket
+import socketserver
+import sys
+import time
+from typing import Dict, List, Optional, TextIO
+
+import main
+from armazem_resultados import ArmazemResultados
+from cache_resultados import CacheResultados
+from comparacao import ARQUIVO_COMPARACAO
+from historico_precos import HistoricoPrecos
+from limitador import LimitadorAdaptativo, PoliticaRetentativa
+from navegador import PoolNavegador
+
+logger = logging.getLogger(__name__)
+
+PORTA_PADRAO = 8765
+
+# Só conexões da própria máquina
+HOST_SERVICO = '127.0.0.1'
+
+
+def ler_pedido(linha: str) -> Dict:
+    """
+    Interpreta uma linha do protocolo.
+
+    Returns:
+        Dicionário com termos, forcar_atualizacao, limite (None para o
+        padrão do serviço), exportar e incluir_produtos
+
+    Raises:
+        ValueError: Se a linha não trouxer nenhum termo ou tiver campos inválidos
+    """
+    linha = linha.strip()
+    if linha.startswith('{'):
+        dados = json.loads(linha)
+        termos = dados.get('termos')
+        if isinstance(termos, str):
+            termos = termos.split(',')
+    else:
+        dados = {}
+        termos = linha.split(',')
+
+    if not isinstance(termos, list) or not all(isinstance(termo, str) for termo in termos):
+        raise ValueError('"termos" deve ser uma lista de textos')
+    termos = [termo.strip() for termo in termos if termo.strip()]
+    if not termos:
+        raise ValueError('Nenhum termo informado')
+
+    limite = dados.get('limite')
+    if limite is not None and (not isinstance(limite, int) or limite < 1):
+        raise ValueError('"limite" deve ser um inteiro positivo')
+
+    return {
+        'termos': termos,
+        'forcar_atualizacao': bool(dados.get('forcar_atualizacao')),
+        'limite': limite,
+        'exportar': bool(dados.get('exportar', True)),
+        'incluir_produtos': bool(dados.get('incluir_produtos')),
+    }
+
+
+class ServicoBuscas:
+    """
+    Estado reaproveitado entre os lotes: navegador, cache, histórico e ritmo.
+
+    Uso:
+        with ServicoBuscas() as servico:
+            resposta = servico.atender_linha('brigadeiro, granulado')
+    """
+
+    def __init__(self, usar_http: bool = True, usar_cache: bool = True, usar_historico: bool = True,
+                 limite: int = main.LIMITE_PADRAO):
+        self.usar_http = usar_http
+        self.limite = limite
+        self.cache = CacheResultados() if usar_cache else None
+        self.historico = HistoricoPrecos() if usar_historico else None
+        self.armazem = ArmazemResultados()
+        self.limitador = LimitadorAdaptativo()
+        self.politica = PoliticaRetentativa()
+        # Lançado só quando alguma busca precisar do navegador
+        self.pool = PoolNavegador()
+        self.lotes_atendidos = 0
+
+    def __enter__(self) -> 'ServicoBuscas':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
+
+    def fechar(self):
+        self.pool.fechar()
+
+    def atender(self, pedido: Dict) -> Dict:
+        """
+        Busca um lote e gera os arquivos de resultado, como uma execução do main.py.
+
+        Args:
+            pedido: Dicionário devolvido por ler_pedido()
+
+        Returns:
+            Resposta do lote
+        """
+        inicio = time.perf_counter()
+        termos = pedido['termos']
+        self.armazem.limpar()
+        produtos = main.processar_termos(
+            termos,
+            usar_http=self.usar_http,
+            cache=self.cache,
+            forcar_atualizacao=pedido['forcar_atualizacao'],
+            pool=self.pool,
+            armazem=self.armazem,
+            historico=self.historico,
+            limite=pedido['limite'] or self.limite,
+            limitador=self.limitador,
+            politica=self.politica,
+        )
+
+        resposta = {'status': 'ok', 'termos': len(termos), 'produtos': len(produtos)}
+        if pedido['exportar']:
+            main.exportar_armazem(self.armazem, "resultado.xlsx", "resultado.json", ordem_termos=termos,
+                                  arquivo_comparacao=ARQUIVO_COMPARACAO)
+            resposta.update(arquivo_excel='resultado.xlsx', arquivo_json='resultado.json',
+                            arquivo_comparacao=ARQUIVO_COMPARACAO)
+        if pedido['incluir_produtos']:
+            resposta['resultado'] = main.formatar_para_saida(produtos)
+
+        self.lotes_atendidos += 1
+        resposta['segundos'] = round(time.perf_counter() - inicio, 3)
+        logger.info(f"Lote {self.lotes_atendidos}: {len(termos)} termo(s), "
+                    f"{len(produtos)} produtos em {resposta['segundos']:.1f}s")
+        return resposta
+
+    def atender_linha(self, linha: str) -> Dict:
+        """
+        Interpreta e atende uma linha do protocolo; erros viram uma resposta de erro.
+        """
+        try:
+            pedido = ler_pedido(linha)
+        except ValueError as e:
+            return {'status': 'erro', 'mensagem': str(e)}
+        try:
+            return self.atender(pedido)
+        except Exception as e:
+            logger.exception("Erro ao atender o lote")
+            return {'status': 'erro', 'mensagem': f'Erro interno: {str(e)}'}
+
+    def atender_fluxo(self, entrada: TextIO, saida: TextIO):
+        """
+        Atende as linhas de `entrada` até o fim, respondendo em `saida`.
+        """
+        for linha in entrada:
+            if not linha.strip():
+                continue
+            saida.write(json.dumps(self.atender_linha(linha), ensure_ascii=False) + '\n')
+            saida.flush()
+
+
+class _ServidorServico(socketserver.TCPServer):
+    # Reiniciar o serviço não espera a porta anterior ser liberada
+    allow_reuse_address = True
+
+
+class _ManipuladorConexao(socketserver.StreamRequestHandler):
+    def handle(self):
+        entrada = io.TextIOWrapper(self.rfile, encoding='utf-8')
+        saida = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+        try:
+            self.server.servico.atender_fluxo(entrada, saida)
+        except (ConnectionError, UnicodeDecodeError) as e:
+            logger.warning(f"Conexão encerrada: {e}")
+        finally:
+            entrada.detach()
+            saida.detach()
+
+
+def servir_entrada_padrao(servico: ServicoBuscas):
+    """
+    Atende os lotes da entrada padrão até o fim dela.
+    """
+    logger.info("Serviço pronto: um lote de termos por linha na entrada padrão")
+    servico.atender_fluxo(sys.stdin, sys.stdout)
+
+
+def servir_socket(servico: ServicoBuscas, porta: int = PORTA_PADRAO):
+    """
+    Atende conexões em 127.0.0.1:`porta` até ser interrompido (Ctrl+C).
+
+    As conexões são atendidas uma de cada vez, na thread que chamou: o
+    navegador do Playwright síncrono só pode ser usado pela thread que o
+    lançou.
+    """
+    with _ServidorServico((HOST_SERVICO, porta), _ManipuladorConexao) as servidor:
+        servidor.servico = servico
+        logger.info(f"Serviço pronto em {HOST_SERVICO}:{porta}: um lote de termos por linha")
+        servidor.serve_forever()
+
+
+def enviar_lote(termos: List[str], porta: int = PORTA_PADRAO, timeout: Optional[float] = None,
+                **opcoes) -> Dict:
+    """
+    Envia um lote a um serviço rodando com --porta e aguarda a resposta.
+
+    Args:
+        termos: Termos de busca
+        porta: Porta do serviço
+        timeout: Segundos máximos de espera (None espera o lote terminar)
+        **opcoes: forcar_atualizacao, limite, exportar, incluir_produtos
+
+    Returns:
+        Resposta do serviço
+    """
+    with socket.create_connection((HOST_SERVICO, porta), timeout=timeout) as conexao:
+        conexao.sendall((json.dumps(dict(opcoes, termos=termos), ensure_ascii=False) + '\n').encode('utf-8'))
+        conexao.shutdown(socket.SHUT_WR)
+        with conexao.makefile('r', encoding='utf-8') as resposta:
+            return json.loads(resposta.readline())
@@ -0,0 +1,75 @@
+"""
+Motor concorrente contra o marketplace falso de
+benchmarks/servidor_fixtures.py (sem internet e sem navegador).
+
+Uso:
+    python -m pytest -q tests/test_busca_async.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+PASTA_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_REPOSITORIO)
+sys.path.insert(0, os.path.join(PASTA_REPOSITORIO, 'benchmarks'))
+
+import main  # noqa: E402
+from armazem_resultados import ArmazemResultados  # noqa: E402
+from busca_async import processar_termos_concorrente  # noqa: E402
+from cache_resultados import CacheResultados  # noqa: E402
+from limitador import LimitadorAdaptativo  # noqa: E402
+from servidor_fixtures import apontar_para_fixtures, iniciar_servidor  # noqa: E402
+
+# Produtos por busca: cabe na primeira página, uma requisição por busca
+LIMITE = 5
+
+# Intervalo do limitador nos testes (segundos)
+INTERVALO = 0.01
+
+TERMOS = ['brigadeiro', 'granulado']
+
+
+@pytest.fixture
+def servidor_fixtures():
+    """
+    Sobe o marketplace falso e aponta os marketplaces para ele; as URLs
+    originais voltam ao final.
+    """
+    urls_originais = {nome: main.obter_marketplace(nome).url_base for nome in ('Mercado Livre', 'Amazon BR')}
+    servidor, url = iniciar_servidor()
+    apontar_para_fixtures(main, url)
+
+    yield servidor
+
+    servidor.shutdown()
+    servidor.server_close()
+    for nome, url_original in urls_originais.items():
+        main.obter_marketplace(nome).url_base = url_original
+
+
+def buscar(cache, armazem):
+    limitador = LimitadorAdaptativo(INTERVALO, INTERVALO, intervalo_piso=INTERVALO, jitter=0)
+    return processar_termos_concorrente(TERMOS, cache=cache, armazem=armazem, limite=LIMITE,
+                                        limitador=limitador)
+
+
+def test_cache_quente_chega_a_exportacao(servidor_fixtures, tmp_path):
+    cache = CacheResultados(str(tmp_path / 'cache.sqlite'))
+    produtos = buscar(cache, ArmazemResultados(str(tmp_path / 'fria.jsonl')))
+    assert len(produtos) == len(TERMOS) * len(main.BUSCADORES) * LIMITE
+
+    # Segunda execução com o cache quente: nenhuma busca vai ao marketplace
+    servidor_fixtures.shutdown()
+    armazem = ArmazemResultados(str(tmp_path / 'quente.jsonl'))
+    quentes = buscar(cache, armazem)
+    assert [produto.link for produto in quentes] == [produto.link for produto in produtos]
+
+    arquivo_json = str(tmp_path / 'resultado.json')
+    arquivo_excel = str(tmp_path / 'resultado.xlsx')
+    quantidade = main.exportar_armazem(armazem, arquivo_excel, arquivo_json, ordem_termos=TERMOS)
+    assert quantidade == len(produtos)
+    with open(arquivo_json, 'r', encoding='utf-8') as f:
+        assert len(json.load(f)) == len(produtos)
@@ -0,0 +1,176 @@
+"""
+Limitador de ritmo e retentativas contra o marketplace falso de
+benchmarks/servidor_limitado.py (sem internet e sem navegador).
+
+Uso:
+    python -m pytest -q tests/test_limitador.py
+"""
+
+import os
+import sys
+
+import pytest
+
+PASTA_REPOSITORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_REPOSITORIO)
+sys.path.insert(0, os.path.join(PASTA_REPOSITORIO, 'benchmarks'))
+
+import main  # noqa: E402
+from http_rapido import buscar_cards_http  # noqa: E402
+from limitador import LimitadorAdaptativo, PoliticaRetentativa  # noqa: E402
+from servidor_limitado import apontar_para_fixtures, iniciar_servidor_limitado  # noqa: E402
+
+# Produtos por busca: cabe na primeira página, uma requisição por busca
+LIMITE = 5
+
+# Intervalo inicial do limitador nos testes (segundos)
+INTERVALO = 0.01
+
+
+class PoolAusente:
+    """
+    Substitui o navegador: a busca que precisar dele falha na hora.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        return False
+
+    def pagina(self):
+        raise RuntimeError('navegador desativado nos testes')
+
+
+@pytest.fixture
+def servidor_limitado():
+    """
+    Sobe o marketplace falso com os parâmetros pedidos e aponta os
+    marketplaces para ele; as URLs originais voltam ao final.
+    """
+    urls_originais = {nome: main.obter_marketplace(nome).url_base for nome in ('Mercado Livre', 'Amazon BR')}
+    servidores = []
+
+    def iniciar(**parametros):
+        servidor, url = iniciar_servidor_limitado(**parametros)
+        servidores.append(servidor)
+        apontar_para_fixtures(main, url)
+        return servidor, url
+
+    yield iniciar
+
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
+    for nome, url in urls_originais.items():
+        main.obter_marketplace(nome).url_base = url
+
+
+def buscar(termos, limitador, politica):
+    lotes = []
+    main.processar_termos(
+        termos, pool=PoolAusente(), limite=LIMITE, limitador=limitador, politica=politica,
+        ao_concluir_lote=lambda termo, marketplace, produtos: lotes.append(produtos)
+    )
+    return lotes
+
+
+def barradas(servidor) -> int:
+    return sum(contagem['barradas'] for contagem in servidor.RequestHandlerClass.estatisticas().values())
+
+
+def test_limitador_alarga_intervalo_depois_de_429(servidor_limitado):
+    # Uma requisição por marketplace passa; a seguinte recebe 429
+    servidor, _ = servidor_limitado(intervalo=60, rajada=1, modo='429')
+    limitador = LimitadorAdaptativo(INTERVALO, INTERVALO, intervalo_piso=INTERVALO, jitter=0)
+    dominio = main.dominio_marketplace('Mercado Livre')
+
+    lotes = buscar(['brigadeiro'], limitador, PoliticaRetentativa(tentativas_max=1))
+    assert all(lotes)
+    intervalo_sem_bloqueio = limitador.intervalos()[dominio]
+
+    lotes = buscar(['granulado'], limitador, PoliticaRetentativa(tentativas_max=1))
+    assert barradas(servidor) == 2
+    assert not any(lotes)
+    assert limitador.intervalos()[dominio] > intervalo_sem_bloqueio
+    assert limitador.intervalos()[dominio] > INTERVALO
+
+
+def test_politica_para_no_orcamento(servidor_limitado):
+    # Todas as requisições recebem 429
+    servidor, _ = servidor_limitado(intervalo=3600, rajada=0, modo='429')
+    limitador = LimitadorAdaptativo(INTERVALO, INTERVALO, intervalo_piso=INTERVALO,
+                                    intervalo_teto=2 * INTERVALO, jitter=0)
+    politica = PoliticaRetentativa(tentativas_max=5, espera_base=INTERVALO, espera_maxima=INTERVALO,
+                                   fracao_orcamento=0, minimo_orcamento=2)
+    termos = ['brigadeiro', 'granulado', 'leite condensado']
+
+    lotes = buscar(termos, limitador, politica)
+
+    buscas = len(termos) * len(main.BUSCADORES)
+    assert politica.buscas == buscas
+    assert politica.retentativas == 2
+    # Uma requisição por busca mais as retentativas do orçamento, nenhuma além
+    assert barradas(servidor) == buscas + 2
+    assert len(lotes) == buscas and not any(lotes)
+
+
+def test_paginas_seguintes_respeitam_o_limitador(servidor_limitado):
+    # Uma requisição por marketplace a cada 0,2 s; o limite pede duas páginas
+    servidor, _ = servidor_limitado(intervalo=0.2, rajada=1, modo='429')
+    limitador = LimitadorAdaptativo(0.3, 0.3, intervalo_piso=0.3, jitter=0)
+
+    lotes = []
+    main.processar_termos(['brigadeiro'], pool=PoolAusente(), limite=40, limitador=limitador,
+                          politica=PoliticaRetentativa(tentativas_max=1),
+                          ao_concluir_lote=lambda termo, marketplace, produtos: lotes.append(produtos))
+
+    assert barradas(servidor) == 0
+    assert [len(lote) for lote in lotes] == [40] * len(main.BUSCADORES)
+
+
+def test_bloqueio_em_pagina_seguinte_conta_uma_vez(servidor_limitado):
+    # A primeira página de cada marketplace passa, a segunda recebe 429
+    servidor, _ = servidor_limitado(intervalo=3600, rajada=1, modo='429')
+    limitador = LimitadorAdaptativo(INTERVALO, INTERVALO, intervalo_piso=INTERVALO, jitter=0)
+
+    lotes = []
+    main.processar_termos(['brigadeiro'], pool=PoolAusente(), limite=40, limitador=limitador,
+                          politica=PoliticaRetentativa(tentativas_max=1),
+                          ao_concluir_lote=lambda termo, marketplace, produtos: lotes.append(produtos))
+
+    assert barradas(servidor) == len(main.BUSCADORES)
+    assert not any(lotes)
+    # Os marketplaces do servidor falso dividem o domínio: um dobro por busca
+    dominio = main.dominio_marketplace('Mercado Livre')
+    assert limitador.intervalos()[dominio] == pytest.approx(INTERVALO * 2 ** len(main.BUSCADORES))
+
+
+@pytest.mark.parametrize('intervalos', [
+    {'intervalo_min': 0, 'intervalo_max': 0},
+    {'intervalo_min': 0},
+    {'intervalo_piso': 0},
+    {'intervalo_max': -1},
+])
+def test_intervalo_nao_positivo_e_recusado(intervalos):
+    # Um piso zero levaria a uma divisão por zero na primeira requisição
+    with pytest.raises(ValueError):
+        LimitadorAdaptativo(**intervalos)
+
+
+def test_captcha_conta_como_falha(servidor_limitado):
+    # Acima do ritmo o servidor responde 200 com uma página de captcha
+    servidor, url = servidor_limitado(intervalo=3600, rajada=0, modo='captcha')
+
+    # Não é um lote vazio de produtos: a camada HTTP não aceita a página
+    assert buscar_cards_http('Mercado Livre', f'{url}/ml/brigadeiro') is None
+
+    limitador = LimitadorAdaptativo(INTERVALO, INTERVALO, intervalo_piso=INTERVALO, jitter=0)
+    politica = PoliticaRetentativa(tentativas_max=2, espera_base=INTERVALO, espera_maxima=INTERVALO)
+    lotes = buscar(['brigadeiro'], limitador, politica)
+
+    # Cada busca falhou, foi repetida e desacelerou o domínio
+    assert politica.retentativas == len(main.BUSCADORES)
+    assert not any(lotes)
+    assert limitador.intervalos()[main.dominio_marketplace('Mercado Livre')] > INTERVALO
+    assert barradas(servidor) == 1 + 2 * len(main.BUSCADORES)